@@ -11,4 +11,23 @@ ENABLE_FIGURE_CONTENT_CHECK = True  # 启用图片内容检测
 SAVE_EXTRACTED_IMAGES = True  # 永久保存提取的图片
 EXTRACTED_IMAGES_DIR = "extracted_figures"  # 保存图片的目录
 
+# 图片API录制/回放配置
+FIGURE_API_CASSETTE_MODE = "off"  # off / record / replay
+FIGURE_API_CASSETTE_PATH = "api_results/figure_api_cassette.jsonl"  # cassette文件（JSON Lines，密钥脱敏）
 
+# 本地图表预分类（有把握时跳过 is_chart API 调用，需要 numpy）
+FIGURE_PRECLASSIFY_ENABLED = True
+FIGURE_PRECLASSIFY_THRESHOLDS = {}  # 覆盖默认阈值，如 {"photo_entropy_min": 4.5}
+
+# 多图批量请求（同一文档的多张图片打包到一条消息中）
+FIGURE_API_BATCH_SIZE = 1  # 每个请求最多打包的图片数，1 表示逐张调用
+FIGURE_API_MAX_BATCH_BYTES = 8 * 1024 * 1024  # 每个请求中图片base64总字节上限
+
+# 模型级联：先用小模型检查，JSON无法解析、报告违规或置信度低时再交给 SILICONFLOW_MODEL
+SILICONFLOW_CASCADE_MODEL = ""  # 例如 "Qwen/Qwen3-VL-8B-Instruct"，留空表示不使用级联
+FIGURE_CASCADE_MIN_CONFIDENCE = 0.8
+
+# 单个文档的图片API预算（0 表示不限）；用尽后剩余图片检查标记为跳过
+FIGURE_API_MAX_CALLS = 0
+FIGURE_API_MAX_TOKENS = 0
+FIGURE_API_MAX_SECONDS = 0
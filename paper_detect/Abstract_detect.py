@@ -323,13 +323,14 @@ def check_abstract_paragraphs(doc, tpl):
     # 方案2：查找单独的Abstract段落（错误格式）
     abstract_alone = None
     next_paragraph = None
-    for i, paragraph in enumerate(doc.paragraphs):
+    paragraphs = doc.paragraphs
+    for i, paragraph in enumerate(paragraphs):
         if paragraph.text and re.match(r'^\s*Abstract\s*$', paragraph.text.strip(), re.IGNORECASE):
             abstract_alone = paragraph
             # 查找下一个非空段落作为摘要内容
-            for j in range(i+1, min(i+3, len(doc.paragraphs))):
-                if doc.paragraphs[j].text and doc.paragraphs[j].text.strip():
-                    next_paragraph = doc.paragraphs[j]
+            for j in range(i+1, min(i+3, len(paragraphs))):
+                if paragraphs[j].text and paragraphs[j].text.strip():
+                    next_paragraph = paragraphs[j]
                     break
             break
     
@@ -501,20 +502,21 @@ def check_abstract_with_template(doc_path, template_identifier):
         abstract_text = paragraphs_report['abstract_paragraph'].text.strip()
     else:
         # 如果没找到段落，尝试查找单独的Abstract标题
-        for i, paragraph in enumerate(doc.paragraphs):
+        paragraphs = doc.paragraphs
+        for i, paragraph in enumerate(paragraphs):
             if paragraph.text and re.match(r'^\s*Abstract\s*$', paragraph.text.strip(), re.IGNORECASE):
                 # 找到Abstract单独一行，使用它作为文本（用于结构检查）
                 abstract_text = paragraph.text.strip()
                 # 如果下一段是内容，也包含它
-                for j in range(i+1, min(i+2, len(doc.paragraphs))):
-                    if doc.paragraphs[j].text and doc.paragraphs[j].text.strip():
-                        abstract_text = "Abstract\n" + doc.paragraphs[j].text.strip()
+                for j in range(i+1, min(i+2, len(paragraphs))):
+                    if paragraphs[j].text and paragraphs[j].text.strip():
+                        abstract_text = "Abstract\n" + paragraphs[j].text.strip()
                         break
                 break
         
         # 如果还是没找到，最后尝试查找包含Abstract:的段落
         if not abstract_text:
-            for paragraph in doc.paragraphs:
+            for paragraph in paragraphs:
                 if paragraph.text and re.search(r'\bAbstract\s*:', paragraph.text, re.IGNORECASE):
                     abstract_text = paragraph.text.strip()
                     break
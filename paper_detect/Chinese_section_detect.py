@@ -226,9 +226,10 @@ def find_chinese_section(doc):
         'keywords_index': None
     }
     
-    # 从参考文献后开始查找中文部分
-    for idx in range(references_idx + 1, len(doc.paragraphs)):
-        paragraph = doc.paragraphs[idx]
+    # 从参考文献后开始查找中文部分（段落列表只构建一次）
+    paragraphs = doc.paragraphs
+    for idx in range(references_idx + 1, len(paragraphs)):
+        paragraph = paragraphs[idx]
         text = paragraph.text.strip()
         
         if not text:
@@ -529,8 +530,9 @@ def check_chinese_affiliation(doc, chinese_section, authors_data, tpl):
     doc_affiliations = {}  # {编号: 单位文本}
     stop_keywords = ['摘要', '关键词', '关键字', 'Abstract', 'Keywords']
     
-    for idx in range(affiliation_start_idx, min(affiliation_start_idx + 10, len(doc.paragraphs))):
-        para = doc.paragraphs[idx]
+    paragraphs = doc.paragraphs
+    for idx in range(affiliation_start_idx, min(affiliation_start_idx + 10, len(paragraphs))):
+        para = paragraphs[idx]
         text = para.text.strip()
         
         if not text:
@@ -5,10 +5,25 @@ import os
 import sys
 import json
 import re
+import string
+from functools import lru_cache
 from docx import Document
 from docx.shared import Pt
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 from docx.oxml.ns import qn
+from lxml import etree
+
+# 芝加哥格式大小写检查与Title模块共用spaCy模型和词性缓存（可选）
+try:
+    from paper_detect.Title_detect import apply_chicago_title_case, prime_title_case_tags, nlp, SPACY_AVAILABLE
+except ImportError:
+    nlp = None
+    SPACY_AVAILABLE = False
+
+try:
+    from paper_detect.numbering_resolver import get_numbering_resolver
+except ImportError:
+    from numbering_resolver import get_numbering_resolver
 
 # 全局检测配置（由 run_all_detections 在导入时注入）
 GLOBAL_DETECTION_CONFIG = {'skip_checks': set()}
@@ -132,6 +147,124 @@ def detect_font_for_run(run, paragraph=None):
 
     return font_size, font_name, is_bold, is_italic, line_spacing
 
+# run 级检查默认只比较字号和字体：正文中的变量斜体、强调加粗属于正常排版
+DEFAULT_RUN_LEVEL_PROPERTIES = ('font_size', 'font_name')
+
+
+def compare_run_font(actual, format_rules, tpl):
+    """
+    将 detect_font_for_run 的结果与模板比较
+
+    参数:
+        actual: (font_size_pt, font_name, is_bold, is_italic)
+        format_rules: 模板中的格式规则
+        tpl: 模板
+
+    返回:
+        {属性名: 问题描述}，按 字号、字体、加粗、斜体 的顺序
+    """
+    actual_size_pt, actual_font_name, actual_bold, actual_italic = actual
+    issues = {}
+
+    # 字体大小检查
+    if not should_skip_check('font_size') and 'font_size_pt' in format_rules:
+        expected_size_pt = float(format_rules['font_size_pt'])
+        if abs(actual_size_pt - expected_size_pt) > 0.5:
+            actual_size_name = get_font_size(actual_size_pt, tpl)
+            expected_size_name = get_font_size(expected_size_pt, tpl)
+            issues['font_size'] = f"字体大小应为{expected_size_name}（{expected_size_pt}pt），实际为{actual_size_name}（{actual_size_pt}pt）"
+
+    # 字体名称检查
+    if not should_skip_check('font_name') and 'font_name' in format_rules:
+        expected_font_name = str(format_rules['font_name'])
+        if expected_font_name.lower() not in actual_font_name.lower():
+            issues['font_name'] = f"字体应为{expected_font_name}，实际为{actual_font_name}"
+
+    # 加粗检查
+    if not should_skip_check('bold') and 'bold' in format_rules:
+        expected_bold = bool(format_rules['bold'])
+        if actual_bold != expected_bold:
+            bold_status = "加粗" if expected_bold else "不加粗"
+            actual_status = "加粗" if actual_bold else "不加粗"
+            issues['bold'] = f"应为{bold_status}，实际为{actual_status}"
+
+    # 斜体检查
+    if not should_skip_check('italic') and 'italic' in format_rules:
+        expected_italic = bool(format_rules['italic'])
+        if actual_italic != expected_italic:
+            italic_status = "斜体" if expected_italic else "正体"
+            actual_status = "斜体" if actual_italic else "正体"
+            issues['italic'] = f"应为{italic_status}，实际为{actual_status}"
+
+    return issues
+
+
+class RunFormatChecker:
+    """
+    run 级字体格式检查
+
+    run 的字体结果只取决于它的 w:rPr 和所在段落的样式，
+    因此以 (段落样式ID, rPr序列化) 作为签名：每种签名只解析样式链、与模板比较一次，
+    之后相同格式的 run 直接复用结论，代价与文档中不同格式的数量成正比。
+    """
+
+    def __init__(self, format_rules, tpl):
+        self.format_rules = format_rules
+        self.tpl = tpl
+        self.verdicts = {}
+        self.runs_checked = 0
+
+    @staticmethod
+    def signature(run, paragraph):
+        rpr = run._r.rPr
+        return paragraph._p.style, etree.tostring(rpr) if rpr is not None else b''
+
+    def check(self, run, paragraph):
+        """
+        检查一个 run 的字体格式
+
+        参数:
+            run: Run对象
+            paragraph: run 所在的段落
+
+        返回:
+            {属性名: 问题描述}（与其他同格式 run 共享，调用方不要修改）
+        """
+        self.runs_checked += 1
+        key = self.signature(run, paragraph)
+        verdict = self.verdicts.get(key)
+        if verdict is None:
+            actual = detect_font_for_run(run, paragraph)[:4]
+            verdict = compare_run_font(actual, self.format_rules, self.tpl)
+            self.verdicts[key] = verdict
+        return verdict
+
+
+def paragraph_line_spacing(paragraph, style_cache):
+    """
+    段落行距（与 detect_font_for_run 的规则一致，段落样式按样式ID缓存）
+
+    参数:
+        paragraph: Paragraph对象
+        style_cache: {样式ID: 样式行距}，在同一文档内共享
+
+    返回:
+        行距（倍数）
+    """
+    try:
+        direct = paragraph.paragraph_format.line_spacing
+        if direct:
+            return float(direct)
+        style_id = paragraph._p.style
+        if style_id not in style_cache:
+            style = paragraph.style
+            style_cache[style_id] = style.paragraph_format.line_spacing if style else None
+        if style_cache[style_id]:
+            return float(style_cache[style_id])
+    except Exception:
+        pass
+    return 1.0
+
 def get_font_size(pt_size, tpl=None):
     """字体大小转换为中文字号"""
     if tpl and 'check_rules' in tpl and 'font_size_mapping' in tpl['check_rules']:
@@ -256,33 +389,216 @@ def detect_paragraph_indent(paragraph):
 
 # ---------- 正文检测逻辑 ----------
 
-def get_paragraph_numbering_info(paragraph):
+def get_heading_numbering_label(paragraph, numbering):
     """
-    获取段落的 Word 自动编号信息
-    返回: (是否有编号, 编号级别)
+    获取可能作为标题的段落的 Word 自动编号
+
+    参数:
+        paragraph: Paragraph 对象
+        numbering: 文档的 NumberingResolver（包含样式继承的编号）
+
+    返回:
+        NumberingLabel；段落没有编号，或是非一级的项目符号/无数字编号时返回None
+        （各级数字编号如 "3.1" 都可能是标题，层级由 heading_level_from_label() 从显示编号得到）
     """
-    try:
-        if paragraph._p.pPr is None:
-            return False, None
-        
-        numPr = paragraph._p.pPr.find(qn('w:numPr'))
-        if numPr is None:
-            return False, None
-        
-        # 获取编号级别
-        ilvl = numPr.find(qn('w:ilvl'))
-        level = int(ilvl.get(qn('w:val'))) if ilvl is not None else 0
-        
-        # 获取编号ID
-        numId = numPr.find(qn('w:numId'))
-        num_id = numId.get(qn('w:val')) if numId is not None else None
-        
-        if num_id is None or num_id == '0':
-            return False, None
-        
-        return True, level
-    except:
-        return False, None
+    label = numbering.label_for(paragraph)
+    if label is None or (not label.number and label.ilvl != 0):
+        return None
+    return label
+
+
+def heading_level_from_label(label):
+    """由 Word 实际显示的编号得到标题层级（"3" 为一级、"3.1" 为二级，最多三级；无数字编号时按一级处理）"""
+    return min(label.number.count('.') + 1, 3) if label.number else 1
+
+# 单位段落关键词（"1 College of ..." 这类段落与一级标题格式相同，需要排除）
+HEADING_AFFILIATION_KEYWORDS = [
+    'college', 'university', 'school', 'institute', 'department',
+    'laboratory', 'center', 'centre', 'academy', 'ministry', 'association',
+    'research', 'engineering', 'science', 'technology',
+    '学院', '大学', '研究所', '实验室', '中心', '部门', '协会'
+]
+# 缺少编号的疑似标题检测使用的单位关键词
+AFFILIATION_KEYWORDS = [
+    'college', 'university', 'school', 'institute', 'department',
+    'laboratory', 'center', 'academy', 'ministry', 'association',
+    'research', 'engineering', 'science', 'technology',
+    '学院', '大学', '研究所', '实验室', '中心', '部门'
+]
+# 关键词预先编译为一个忽略大小写的多选正则，一次扫描即可判断是否包含任一关键词
+HEADING_AFFILIATION_RE = re.compile('|'.join(map(re.escape, HEADING_AFFILIATION_KEYWORDS)), re.IGNORECASE)
+AFFILIATION_RE = re.compile('|'.join(map(re.escape, AFFILIATION_KEYWORDS)), re.IGNORECASE)
+
+# 模板之外的固定标题形式
+INTRODUCTION_PATTERN = r'^\s*Introduction\s*$'
+LEVEL0_SPACING_PATTERN = r'^\s*0\s+Introduction\s*$'
+LEVEL1_SPACING_PATTERN = r'^\s*(\d+)\s+(.+)$'
+
+
+# 正则中的转义序列或字符组（其中的 | ( ) 不是语法字符）
+_REGEX_ATOM_RE = re.compile(r'\\.|\[(?:\\.|[^\]])*\]')
+# 使前一项可以不出现的量词
+_OPTIONAL_QUANTIFIER_RE = re.compile(r'[?*]|\{0|\{,')
+
+
+def _pattern_first_chars(pattern, ignorecase):
+    """
+    推断标题正则匹配文本（已去除首尾空白）的首字符集合
+
+    只处理开头为单个字面字符或 \\d、且该项必须出现的正则；
+    含分支（|）、开头项或其所在分组可省略（?、*、{0,n}）等情况一律不推断。
+
+    参数:
+        pattern: 标题正则
+        ignorecase: 是否忽略大小写
+
+    返回:
+        首字符集合；无法推断时返回None（不做预过滤）
+    """
+    # 任一分支都可能决定首字符
+    if '|' in _REGEX_ATOM_RE.sub('', pattern):
+        return None
+
+    body = re.sub(r'^\^(?:\\s\*)?', '', pattern)
+    open_groups = 0
+    while True:
+        group = re.match(r'\((?:\?:)?', body)
+        if group is None:
+            break
+        body = body[group.end():]
+        open_groups += 1
+
+    if body.startswith('\\d'):
+        chars = set(string.digits)
+        rest = body[2:]
+    elif body[:1].isalnum():
+        ch = body[0]
+        chars = {ch.lower(), ch.upper()} if ignorecase else {ch}
+        rest = body[1:]
+    else:
+        return None
+    if _OPTIONAL_QUANTIFIER_RE.match(rest):
+        return None
+
+    # 包含开头项的分组整体可省略时同样无法推断
+    depth = 0
+    position = 0
+    while open_groups and position < len(rest):
+        atom = _REGEX_ATOM_RE.match(rest, position)
+        if atom is not None:
+            position = atom.end()
+            continue
+        ch = rest[position]
+        position += 1
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            if depth:
+                depth -= 1
+                continue
+            open_groups -= 1
+            if _OPTIONAL_QUANTIFIER_RE.match(rest, position):
+                return None
+    return chars
+
+
+class HeadingClassifier:
+    """
+    标题分类器：按模板编译一次，每个段落只做一次匹配
+
+    各标题正则按原有判断顺序合并为一个带命名分组的正则，
+    正则的分支按顺序尝试，结果与逐个 re.match 的 if/elif 链一致。
+    """
+
+    KINDS = ('level0', 'introduction', 'level0_spacing',
+             'level1', 'level1_spacing', 'level2', 'level3')
+
+    def __init__(self, level0_pattern, level1_pattern, level2_pattern, level3_pattern):
+        patterns = [
+            (level0_pattern, True),
+            (INTRODUCTION_PATTERN, True),
+            (LEVEL0_SPACING_PATTERN, True),
+            (level1_pattern, False),
+            (LEVEL1_SPACING_PATTERN, False),
+            (level2_pattern, False),
+            (level3_pattern, False),
+        ]
+        self.compiled = [re.compile(p, re.IGNORECASE if ic else 0) for p, ic in patterns]
+
+        # 合并正则：记录每个分支内部分组在整体中的起始编号
+        parts = []
+        self.group_bases = []
+        offset = 0
+        for kind, (p, ic), compiled in zip(self.KINDS, patterns, self.compiled):
+            self.group_bases.append(offset + 1)
+            parts.append(f"(?P<{kind}>{'(?i:' if ic else '(?:'}{p}))")
+            offset += 1 + compiled.groups
+        try:
+            self.combined = re.compile('|'.join(parts))
+        except re.error:
+            # 模板正则含全局内联标志等无法合并的写法时，退回逐个匹配
+            self.combined = None
+
+        # 首字符预过滤：大多数正文段落无需进入正则
+        first_chars = set()
+        for p, ic in patterns:
+            chars = _pattern_first_chars(p, ic)
+            if chars is None:
+                first_chars = None
+                break
+            first_chars |= chars
+        self.first_chars = first_chars
+
+    def _match_from(self, text, start, allow_introduction):
+        """从第 start 个分支开始逐个匹配"""
+        for i in range(start, len(self.KINDS)):
+            kind = self.KINDS[i]
+            if kind == 'introduction' and not allow_introduction:
+                continue
+            match = self.compiled[i].match(text)
+            if match:
+                return kind, match.groups()
+        return None, ()
+
+    def classify(self, text, allow_introduction=True):
+        """
+        判断段落文本属于哪一类标题
+
+        参数:
+            text: 去除首尾空白后的段落文本
+            allow_introduction: 是否识别无编号的 Introduction（已找到Introduction后为False）
+
+        返回:
+            (kind, groups)：kind 为 KINDS 之一或None，groups 为该标题正则的分组
+        """
+        if not text or (self.first_chars is not None and text[0] not in self.first_chars):
+            return None, ()
+        if self.combined is None:
+            return self._match_from(text, 0, allow_introduction)
+
+        match = self.combined.match(text)
+        if match is None:
+            return None, ()
+        kind = match.lastgroup
+        index = self.KINDS.index(kind)
+        if kind == 'introduction' and not allow_introduction:
+            return self._match_from(text, index + 1, allow_introduction)
+        base = self.group_bases[index]
+        return kind, match.groups()[base:base + self.compiled[index].groups]
+
+
+@lru_cache(maxsize=8)
+def get_heading_classifier(level0_pattern, level1_pattern, level2_pattern, level3_pattern):
+    """
+    获取（按模板正则缓存的）标题分类器
+
+    参数:
+        level0_pattern ~ level3_pattern: 模板中的各级标题正则
+
+    返回:
+        HeadingClassifier 对象
+    """
+    return HeadingClassifier(level0_pattern, level1_pattern, level2_pattern, level3_pattern)
 
 def identify_title_hierarchy(doc, tpl):
     """
@@ -300,19 +616,21 @@ def identify_title_hierarchy(doc, tpl):
     
     found_introduction = False
     title_sequence = []
+    classifier = get_heading_classifier(level0_pattern, level1_pattern, level2_pattern, level3_pattern)
+    numbering = get_numbering_resolver(doc)
+    paragraphs = doc.paragraphs
     
-    # 扫描所有段落，识别标题
-    for para_idx, paragraph in enumerate(doc.paragraphs):
-        if not paragraph.text or not paragraph.text.strip():
+    # 扫描所有段落，识别标题（每个段落只做一次合并正则匹配）
+    for para_idx, paragraph in enumerate(paragraphs):
+        text = paragraph.text
+        if not text or not text.strip():
             continue
             
-        text = paragraph.text.strip()
-        
-        # 检查段落是否有 Word 自动编号
-        has_auto_num, auto_num_level = get_paragraph_numbering_info(paragraph)
+        text = text.strip()
+        kind, groups = classifier.classify(text, allow_introduction=not found_introduction)
         
         # 检查0 Introduction（带编号的格式）
-        if re.match(level0_pattern, text, re.IGNORECASE):
+        if kind == 'level0':
             found_introduction = True
             
             report['titles'].append({
@@ -329,11 +647,12 @@ def identify_title_hierarchy(doc, tpl):
             print(f"找到Introduction: {text} (索引: {para_idx})")
         
         # 检查单独的 Introduction（没有编号的格式，但可能有 Word 自动编号）
-        elif re.match(r'^\s*Introduction\s*$', text, re.IGNORECASE) and not found_introduction:
+        elif kind == 'introduction':
             found_introduction = True
             
             # 检查是否使用了 Word 自动编号
-            if has_auto_num and auto_num_level == 0:
+            auto_label = get_heading_numbering_label(paragraph, numbering)
+            if auto_label is not None:
                 # 有 Word 自动编号，视为有编号（但格式仍不正确，应该是文本形式的 "0 Introduction"）
                 report['titles'].append({
                     'level': 0,
@@ -343,7 +662,8 @@ def identify_title_hierarchy(doc, tpl):
                     'paragraph_index': para_idx,
                     'full_text': text,
                     'has_number': False,  # 虽然有自动编号，但格式不对
-                    'has_auto_numbering': True
+                    'has_auto_numbering': True,
+                    'rendered_label': auto_label.label
                 })
                 print(f"找到Introduction: {text} (索引: {para_idx}, 使用Word自动编号)")
             else:
@@ -362,7 +682,7 @@ def identify_title_hierarchy(doc, tpl):
             title_sequence.append('0')
         
         # 检查是否是空格数量错误的Introduction
-        elif re.match(r'^\s*0\s+Introduction\s*$', text, re.IGNORECASE):
+        elif kind == 'level0_spacing':
             print(f"发现Introduction但空格数量不正确: '{text}'")
             # 分析空格数量
             space_match = re.search(r'0(\s+)Introduction', text)
@@ -372,20 +692,12 @@ def identify_title_hierarchy(doc, tpl):
                 print(f"0后有{space_count}个空格，应为1个空格")
         
         # 检查一级标题（排除单位段落）
-        elif re.match(level1_pattern, text):
-            match = re.match(level1_pattern, text)
-            number = match.group(1)
-            title_text = match.group(2).strip()
+        elif kind == 'level1':
+            number = groups[0]
+            title_text = groups[1].strip()
             
             # 判断是否是单位段落
-            affiliation_keywords = [
-                'college', 'university', 'school', 'institute', 'department',
-                'laboratory', 'center', 'centre', 'academy', 'ministry', 'association',
-                'research', 'engineering', 'science', 'technology',
-                '学院', '大学', '研究所', '实验室', '中心', '部门', '协会'
-            ]
-            text_lower = text.lower()
-            is_affiliation = any(keyword in text_lower for keyword in affiliation_keywords)
+            is_affiliation = HEADING_AFFILIATION_RE.search(text) is not None
             
             # 如果不是单位段落，才添加为标题
             if not is_affiliation:
@@ -403,7 +715,7 @@ def identify_title_hierarchy(doc, tpl):
                 print(f"跳过单位段落（非标题）: {text[:60]}...")
         
         # 检查是否是空格数量错误的一级标题
-        elif re.match(r'^\s*(\d+)\s+(.+)$', text) and not re.match(level1_pattern, text):
+        elif kind == 'level1_spacing':
             space_match = re.search(r'(\d+)(\s+)(.+)', text)
             if space_match:
                 number = space_match.group(1)
@@ -412,13 +724,13 @@ def identify_title_hierarchy(doc, tpl):
                 title_text = space_match.group(3)
                 print(f"发现一级标题但空格数量不正确: '{number}' 后有{space_count}个空格，应为1个空格")
         
-        # 检查二级标题
-        elif re.match(level2_pattern, text):
-            match = re.match(level2_pattern, text)
-            number = match.group(1)
-            title_text = match.group(2).strip()
+        # 检查二级、三级标题
+        elif kind in ('level2', 'level3'):
+            level = 2 if kind == 'level2' else 3
+            number = groups[0]
+            title_text = groups[1].strip()
             report['titles'].append({
-                'level': 2,
+                'level': level,
                 'number': number,
                 'text': title_text,
                 'paragraph': paragraph,
@@ -426,23 +738,7 @@ def identify_title_hierarchy(doc, tpl):
                 'full_text': text
             })
             title_sequence.append(number)
-            print(f"找到二级标题: {number} {title_text}")
-        
-        # 检查三级标题
-        elif re.match(level3_pattern, text):
-            match = re.match(level3_pattern, text)
-            number = match.group(1)
-            title_text = match.group(2).strip()
-            report['titles'].append({
-                'level': 3,
-                'number': number,
-                'text': title_text,
-                'paragraph': paragraph,
-                'paragraph_index': para_idx,
-                'full_text': text
-            })
-            title_sequence.append(number)
-            print(f"找到三级标题: {number} {title_text}")
+            print(f"找到{'二' if level == 2 else '三'}级标题: {number} {title_text}")
     
     # 检测疑似标题但缺少编号的段落（基于格式特征）
     # 只检测 Introduction 之后的内容，避免误报 Title、Authors、Keywords 等
@@ -457,30 +753,24 @@ def identify_title_hierarchy(doc, tpl):
     
     # 只在 Introduction 之后检测
     if introduction_index is not None:
-        for para_idx, paragraph in enumerate(doc.paragraphs):
-            # 只检测 Introduction 之后的段落
-            if para_idx <= introduction_index:
-                continue
-                
-            if not paragraph.text or not paragraph.text.strip():
+        identified_indices = {title.get('paragraph_index') for title in report['titles']}
+        for para_idx in range(introduction_index + 1, len(paragraphs)):
+            paragraph = paragraphs[para_idx]
+            text = paragraph.text
+            if not text or not text.strip():
                 continue
             
-            text = paragraph.text.strip()
+            text = text.strip()
             
             # 跳过已识别的标题
-            already_identified = False
-            for title in report['titles']:
-                if title.get('paragraph_index') == para_idx:
-                    already_identified = True
-                    break
-            if already_identified:
+            if para_idx in identified_indices:
                 continue
             
             # 检查是否有 Word 自动编号
-            has_auto_num, auto_num_level = get_paragraph_numbering_info(paragraph)
+            label = get_heading_numbering_label(paragraph, numbering)
             
-            # 如果有 Word 自动编号且级别为 0（一级编号）
-            if has_auto_num and auto_num_level == 0:
+            # 如果有 Word 自动编号（任意级别的数字编号，或一级编号）
+            if label is not None:
                 # 排除图表、参考文献等
                 text_lower = text.lower()
                 # 判断是否是参考文献：通常包含作者名、期刊名、年份等特征
@@ -507,13 +797,7 @@ def identify_title_hierarchy(doc, tpl):
                 )
                 
                 # 判断是否是单位段落（包含单位关键词）
-                affiliation_keywords = [
-                    'college', 'university', 'school', 'institute', 'department',
-                    'laboratory', 'center', 'academy', 'ministry', 'association',
-                    'research', 'engineering', 'science', 'technology',
-                    '学院', '大学', '研究所', '实验室', '中心', '部门'
-                ]
-                is_affiliation = any(keyword in text_lower for keyword in affiliation_keywords)
+                is_affiliation = AFFILIATION_RE.search(text) is not None
                 
                 if not (text_lower.startswith('table ') or 
                        text_lower.startswith('figure ') or 
@@ -530,21 +814,24 @@ def identify_title_hierarchy(doc, tpl):
                         'paragraph_index': para_idx,
                         'text': text,
                         'font_size': None,
-                        'has_word_numbering': True
+                        'has_word_numbering': True,
+                        'rendered_label': label.label.strip()
                     })
-                    print(f"警告: 发现使用Word自动编号的标题 (索引 {para_idx}): '{text[:60]}...'")
+                    print(f"警告: 发现使用Word自动编号的标题 (索引 {para_idx}, 显示为 '{label.label.strip()}'): '{text[:60]}...'")
                     
                     # 也将此标题添加到 report['titles'] 中，以便进行格式检查
-                    # 标记为一级标题（level=1），因为使用了Word一级编号
+                    # 层级与编号取 Word 实际显示的编号（如 "3.1" 为二级标题），无法得到数字编号时按一级标题处理
+                    level = heading_level_from_label(label)
                     report['titles'].append({
-                        'level': 1,
-                        'number': '[Word自动编号]',
+                        'level': level,
+                        'number': label.number or '[Word自动编号]',
                         'text': text,
                         'paragraph': paragraph,
                         'paragraph_index': para_idx,
                         'full_text': text,
                         'has_number': False,
-                        'has_auto_numbering': True  # 标记使用了Word自动编号
+                        'has_auto_numbering': True,  # 标记使用了Word自动编号
+                        'rendered_label': label.label.strip()
                     })
             # 否则，检测格式特征：加粗 + 较大字体 + 长度适中
             elif paragraph.runs and len(text) > 10 and len(text) < 150:
@@ -565,13 +852,7 @@ def identify_title_hierarchy(doc, tpl):
                     text_lower = text.lower()
                     
                     # 判断是否是单位段落（包含单位关键词）
-                    affiliation_keywords = [
-                        'college', 'university', 'school', 'institute', 'department',
-                        'laboratory', 'center', 'academy', 'ministry', 'association',
-                        'research', 'engineering', 'science', 'technology',
-                        '学院', '大学', '研究所', '实验室', '中心', '部门'
-                    ]
-                    is_affiliation = any(keyword in text_lower for keyword in affiliation_keywords)
+                    is_affiliation = AFFILIATION_RE.search(text) is not None
                     
                     # 判断是否是单数字开头的单位（如 "1 College of..."）
                     is_numbered_affiliation = (
@@ -608,7 +889,7 @@ def identify_title_hierarchy(doc, tpl):
         if word_numbered_count > 0:
             report['messages'].append(f"发现 {word_numbered_count} 个使用Word自动编号的标题，应改为文本形式的编号（如 '1 Title'，而非使用Word编号库）")
             for item in [x for x in missing_number_titles if x.get('has_word_numbering', False)][:5]:
-                report['messages'].append(f"  - 段落 {item['paragraph_index']}: '{item['text'][:60]}...'")
+                report['messages'].append(f"  - 段落 {item['paragraph_index']}（Word编号显示为 '{item['rendered_label']}'）: '{item['text'][:60]}...'")
         
         if no_number_count > 0:
             report['messages'].append(f"发现 {no_number_count} 个疑似标题但完全缺少编号，标题应有编号格式（如 '1 Title', '1.1 Subtitle'）")
@@ -841,6 +1122,11 @@ def check_title_case(titles, tpl):
     case_rules = tpl.get('title_case_rules', {})
     minor_words = case_rules.get('minor_words', ['and', 'or', 'of', 'in', 'on', 'at', 'to', 'for', 'with', 'by', 'from', 'the', 'a', 'an'])
     
+    # 启用芝加哥格式时，一级标题按spaCy词性判断虚词：所有一级标题在一次 nlp.pipe 调用中标注
+    use_chicago_style = case_rules.get('chicago_style', False) and SPACY_AVAILABLE and nlp
+    if use_chicago_style:
+        prime_title_case_tags([t['text'] for t in titles if t['level'] == 1], nlp)
+    
     issues = []
     
     for title_info in titles:
@@ -855,7 +1141,10 @@ def check_title_case(titles, tpl):
             if title_text != 'Introduction':
                 issues.append(f"{title_prefix}Introduction标题应为'Introduction'，实际为'{title_text}'")
         elif level == 1:  # 一级标题：实词首字母大写
-            corrected = apply_title_case(title_text, minor_words)
+            if use_chicago_style:
+                corrected = apply_chicago_title_case(title_text, nlp)
+            else:
+                corrected = apply_title_case(title_text, minor_words)
             if title_text != corrected:
                 issues.append(f"{title_prefix}一级标题 '{title_text}' 大小写不正确，应为 '{corrected}'")
         elif level in [2, 3]:  # 二三级标题：仅首词大写
@@ -937,9 +1226,11 @@ def check_content_text_format(doc, titles, tpl):
     consecutive_references = 0  # 连续的参考文献段落计数
     
     if introduction_index is not None:
-        # 从Introduction段落的下一个段落开始检查
-        for i in range(introduction_index + 1, len(doc.paragraphs)):
-            paragraph = doc.paragraphs[i]
+        # 从Introduction段落的下一个段落开始检查（段落列表只构建一次）
+        paragraphs = doc.paragraphs
+        numbering = get_numbering_resolver(doc)
+        for i in range(introduction_index + 1, len(paragraphs)):
+            paragraph = paragraphs[i]
             
             # 排除标题段落
             if i in title_paragraph_indices:
@@ -975,9 +1266,8 @@ def check_content_text_format(doc, titles, tpl):
                 consecutive_references = 0  # 重置计数
             
             # 检查是否有 Word 自动编号（可能是标题）
-            has_auto_num, auto_num_level = get_paragraph_numbering_info(paragraph)
-            if has_auto_num and auto_num_level == 0:
-                # 有一级自动编号，很可能是标题，排除
+            if get_heading_numbering_label(paragraph, numbering) is not None:
+                # 有标题式的自动编号，很可能是标题，排除
                 # 但要排除参考文献等非标题内容
                 text_lower = text.lower()
                 is_likely_title = not (
@@ -1034,50 +1324,41 @@ def check_content_text_format(doc, titles, tpl):
     issues = []
     paragraphs_with_issues = []
     
+    # run 级检查：第一个 run 检查全部字体属性（与段落主体格式一致），
+    # 其余 run 只检查模板 run_level_properties 中的属性；相同格式的 run 共享同一结论
+    run_checker = RunFormatChecker(format_rules, tpl)
+    run_level_properties = tpl.get('check_rules', {}).get('run_level_properties', DEFAULT_RUN_LEVEL_PROPERTIES)
+    style_line_spacing = {}
+    
     # 检查所有正文段落的格式
     for i, paragraph in enumerate(content_paragraphs):
-        if not paragraph.runs:
+        runs = paragraph.runs
+        if not runs:
             continue
         
-        # 检查第一个run的格式
-        main_run = paragraph.runs[0]
-        actual_size_pt, actual_font_name, actual_bold, actual_italic, actual_line_spacing = detect_font_for_run(main_run, paragraph)
-        
-        paragraph_preview = paragraph.text[:40] + "..." if len(paragraph.text) > 40 else paragraph.text
-        paragraph_issues = []
+        paragraph_text = paragraph.text
+        paragraph_preview = paragraph_text[:40] + "..." if len(paragraph_text) > 40 else paragraph_text
         
-        # 字体大小检查
-        if not should_skip_check('font_size') and 'font_size_pt' in format_rules:
-            expected_size_pt = float(format_rules['font_size_pt'])
-            if abs(actual_size_pt - expected_size_pt) > 0.5:
-                actual_size_name = get_font_size(actual_size_pt, tpl)
-                expected_size_name = get_font_size(expected_size_pt, tpl)
-                paragraph_issues.append(f"字体大小应为{expected_size_name}（{expected_size_pt}pt），实际为{actual_size_name}（{actual_size_pt}pt）")
-        
-        # 字体名称检查
-        if not should_skip_check('font_name') and 'font_name' in format_rules:
-            expected_font_name = str(format_rules['font_name'])
-            if expected_font_name.lower() not in actual_font_name.lower():
-                paragraph_issues.append(f"字体应为{expected_font_name}，实际为{actual_font_name}")
-        
-        # 加粗检查
-        if not should_skip_check('bold') and 'bold' in format_rules:
-            expected_bold = bool(format_rules['bold'])
-            if actual_bold != expected_bold:
-                bold_status = "加粗" if expected_bold else "不加粗"
-                actual_status = "加粗" if actual_bold else "不加粗"
-                paragraph_issues.append(f"应为{bold_status}，实际为{actual_status}")
+        # 检查第一个run的格式
+        paragraph_issues = list(run_checker.check(runs[0], paragraph).values())
         
-        # 斜体检查
-        if not should_skip_check('italic') and 'italic' in format_rules:
-            expected_italic = bool(format_rules['italic'])
-            if actual_italic != expected_italic:
-                italic_status = "斜体" if expected_italic else "正体"
-                actual_status = "斜体" if actual_italic else "正体"
-                paragraph_issues.append(f"应为{italic_status}，实际为{actual_status}")
+        # 检查其余run的格式（同一段落中相同的问题只报告一次）
+        for run in runs[1:]:
+            verdict = run_checker.check(run, paragraph)
+            if not verdict:
+                continue
+            run_text = run.text
+            if not run_text.strip():
+                continue
+            for prop in run_level_properties:
+                issue = verdict.get(prop)
+                if issue and not any(existing.startswith(issue) for existing in paragraph_issues):
+                    run_preview = run_text.strip()[:15]
+                    paragraph_issues.append(f"{issue}（文本 '{run_preview}'）")
         
         # 行间距检查
         if not should_skip_check('spacing') and 'line_spacing' in format_rules:
+            actual_line_spacing = paragraph_line_spacing(paragraph, style_line_spacing)
             expected_line_spacing = float(format_rules['line_spacing'])
             if abs(actual_line_spacing - expected_line_spacing) > 0.1:
                 actual_spacing_name = get_line_spacing_name(actual_line_spacing, tpl)
@@ -1113,6 +1394,7 @@ def check_content_text_format(doc, titles, tpl):
     
     # 输出有问题的段落（简洁格式）
     print(f"\n=== 正文段落格式检查结果 ===")
+    print(f"共检查 {run_checker.runs_checked} 个文本片段（run），其中 {len(run_checker.verdicts)} 种不同格式")
     if paragraphs_with_issues:
         print(f"发现 {len(paragraphs_with_issues)} 个段落有格式问题（共检查 {len(content_paragraphs)} 个段落）")
         print("\n有问题的段落（简洁显示）：")
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import re
+from docx import Document
+
+# 全局检测配置（由 run_all_detections 在导入时注入）
+GLOBAL_DETECTION_CONFIG = {'skip_checks': set()}
+
+def should_skip_check(check_name):
+    """
+    判断是否应该跳过某个检测项
+    """
+    return check_name in GLOBAL_DETECTION_CONFIG.get('skip_checks', set())
+
+"""
+=== 论文格式检测系统 - 交叉引用检测器 ===
+
+【交叉引用检测 (Cross-Reference Detection)】
+
+1. 【悬空引用检测】
+   - 正文中的 Fig. n / Table n / Eq. (n) 引用必须有对应的图、表、公式
+   - 支持列表与范围写法：Figs. 2 and 3、Figs. 2-4、Tables 1, 2、式(1)~(3)
+   - 列表写法只在复数前缀与中文前缀后展开；中文前缀须位于词首或引导字之后（排除"发表"、"方式"等词）
+
+2. 【未引用检测】
+   - 每个图、表都应在正文中至少被引用一次（公式可在模板中开启）
+
+3. 【引用顺序检测】
+   - 图、表应按编号顺序首次引用（Fig. 2 的首次引用不能早于 Fig. 1）
+   - 图、表应先引用后出现（首次引用位于图表之前）
+
+4. 【技术特性】
+   - 对正文做一次遍历，同时建立"定义"（图表标题、公式编号）与"引用"的倒排索引
+   - 所有引用类型合并为一个预编译正则，每个段落只匹配一次
+   - 图、表标题须紧邻图片/表格才视为定义，以 Fig./Table 开头的正文句子按引用处理
+   - 所有检查均基于索引完成，耗时与文档长度成线性关系
+"""
+
+try:
+    from paper_detect.citation_checks import expand_number_list, iter_first_mention_order, section_result
+    from paper_detect.ooxml import W_P, W_TBL, w_tag
+except ImportError:
+    from citation_checks import expand_number_list, iter_first_mention_order, section_result
+    from ooxml import W_P, W_TBL, w_tag
+
+W_DRAWING = w_tag('drawing')
+W_PICT = w_tag('pict')
+
+DEFAULT_NUMBER_LIST_PATTERN = r'\(?\s*\d+\s*\)?(?:\s*(?:[-–~,、]|and|to)\s*\(?\s*\d+\s*\)?)*'
+# 中文前缀须位于词首（前面不是汉字）或引导字之后，避免 "发表3篇"、"代表2个"、"方式1" 误识别为引用
+DEFAULT_CJK_PREFIX_BOUNDARY = r'(?:(?<![\u4e00-\u9fff])|(?<=[如见由据和与及入用]))'
+
+# ---------- 模板加载 ----------
+def resolve_template_path(identifier):
+    if os.path.isfile(identifier):
+        return identifier
+    candidate = os.path.join("templates", identifier + ".json")
+    if os.path.isfile(candidate):
+        return candidate
+    raise FileNotFoundError(f"Template not found: '{identifier}' (tried file path and {candidate})")
+
+def load_template(identifier):
+    tpl_path = resolve_template_path(identifier)
+    with open(tpl_path, 'r', encoding='utf-8') as f:
+        tpl = json.load(f)
+    return tpl
+
+# ---------- 引用模式 ----------
+class CrossReferencePatterns:
+    """按模板预编译的定义与引用正则（所有引用类型合并为一个正则）"""
+
+    def __init__(self, tpl):
+        self.item_types = tpl.get('item_types', {})
+        number_list = tpl.get('number_list_pattern', DEFAULT_NUMBER_LIST_PATTERN)
+        cjk_boundary = tpl.get('cjk_prefix_boundary', DEFAULT_CJK_PREFIX_BOUNDARY)
+        self.max_list_gap = tpl.get('max_list_gap')
+
+        alternatives = []
+        self.list_prefix_res = {}
+        for kind, cfg in self.item_types.items():
+            prefix = rf"(?<![A-Za-z]){cfg['mention_prefix']}"
+            if cfg.get('mention_prefix_cjk'):
+                prefix = rf"(?:{prefix}|{cjk_boundary}{cfg['mention_prefix_cjk']})"
+            alternatives.append(rf"(?P<{kind}>{prefix})\s*(?P<{kind}_numbers>{number_list})")
+            # 只有复数前缀（Figs.、Tables）与中文前缀后才按列表展开，"Fig. 3, 40 samples" 只引用 Fig. 3
+            if cfg.get('list_prefix'):
+                self.list_prefix_res[kind] = re.compile(cfg['list_prefix'], re.IGNORECASE)
+        self.mention_re = re.compile('|'.join(alternatives), re.IGNORECASE) if alternatives else None
+        self.definition_res = {kind: re.compile(cfg['definition_pattern'])
+                               for kind, cfg in self.item_types.items()}
+        stop_pattern = tpl.get('stop_pattern')
+        self.stop_re = re.compile(stop_pattern, re.IGNORECASE) if stop_pattern else None
+
+    def display(self, kind, number):
+        """图表编号的显示名称，如 Fig. 3、Table 2、Eq. (5)"""
+        return self.item_types[kind].get('display', kind + ' {number}').format(number=number)
+
+    def iter_definitions(self, text):
+        """
+        在一段文本中查找所有定义（同一行可有多个公式编号，如 "(12)\t\t(13)"）
+
+        返回:
+            生成 (类型, 匹配对象)
+        """
+        for kind, definition_re in self.definition_res.items():
+            for match in definition_re.finditer(text):
+                yield kind, match
+
+    def iter_mentions(self, text):
+        """
+        在一段文本中查找所有引用
+
+        返回:
+            生成 (类型, 起始位置, 编号列表)
+        """
+        if self.mention_re is None:
+            return
+        for match in self.mention_re.finditer(text):
+            kind = match.lastgroup[:-len('_numbers')]
+            list_prefix_re = self.list_prefix_res.get(kind)
+            allow_list = list_prefix_re is None or list_prefix_re.fullmatch(match.group(kind)) is not None
+            numbers = expand_number_list(match.group(match.lastgroup),
+                                         allow_list=allow_list, max_list_gap=self.max_list_gap)
+            if numbers:
+                yield kind, match.start(), numbers
+
+# ---------- 交叉引用索引 ----------
+class CrossReferenceIndex:
+    """图、表、公式的定义位置与引用位置倒排索引"""
+
+    def __init__(self, kinds):
+        self.definitions = {kind: {} for kind in kinds}        # 编号 -> 定义所在段落索引（首次出现）
+        self.duplicate_definitions = {kind: [] for kind in kinds}  # [(编号, 段落索引)]
+        self.first_mentions = {kind: {} for kind in kinds}     # 编号 -> (段落索引, 字符位置)
+        self.mention_counts = {kind: {} for kind in kinds}     # 编号 -> 引用次数
+        self.paragraphs_scanned = 0
+
+    def add_definition(self, kind, number, paragraph_index):
+        if number in self.definitions[kind]:
+            self.duplicate_definitions[kind].append((number, paragraph_index))
+        else:
+            self.definitions[kind][number] = paragraph_index
+
+    def add_mention(self, kind, number, paragraph_index, offset):
+        counts = self.mention_counts[kind]
+        counts[number] = counts.get(number, 0) + 1
+        self.first_mentions[kind].setdefault(number, (paragraph_index, offset))
+
+def build_cross_reference_index(doc, tpl, patterns=None):
+    """
+    对正文做一次遍历，建立交叉引用索引
+
+    参数:
+        doc: Document对象
+        tpl: 模板配置
+        patterns: 预编译的 CrossReferencePatterns（可选）
+
+    返回:
+        CrossReferenceIndex 对象
+    """
+    patterns = patterns or CrossReferencePatterns(tpl)
+    item_types = patterns.item_types
+    index = CrossReferenceIndex(item_types)
+    paragraphs = doc.paragraphs  # 与 body 下的 w:p 子元素一一对应
+
+    last_picture_index = None
+    pending_tables = []     # 等待后续表格确认的表格标题候选：(类型, 编号, 段落索引, 标题范围)
+    # 段落索引 -> [(类型, 标题匹配起点, 标题匹配终点)]，标题本身的 "Fig. n" 不计为引用
+    definition_spans = {}
+    paragraph_mentions = []  # (段落索引, 类型, 起始位置, 编号列表)
+
+    paragraph_index = -1
+    for child in doc.element.body.iterchildren():
+        if child.tag == W_TBL:
+            for kind, number, caption_index, span in pending_tables:
+                if paragraph_index - caption_index < item_types[kind].get('anchor_distance', 2):
+                    index.add_definition(kind, number, caption_index)
+                    definition_spans.setdefault(caption_index, []).append(span)
+            pending_tables = []
+            continue
+        if child.tag != W_P:
+            continue
+
+        paragraph_index += 1
+        text = paragraphs[paragraph_index].text
+        if patterns.stop_re is not None and patterns.stop_re.match(text):
+            break
+        index.paragraphs_scanned += 1
+
+        if next(child.iter(W_DRAWING, W_PICT), None) is not None:
+            last_picture_index = paragraph_index
+
+        # 定义（图表标题、公式编号）
+        for kind, match in patterns.iter_definitions(text):
+            cfg = item_types[kind]
+            anchor = cfg.get('anchor', 'none')
+            distance = cfg.get('anchor_distance', 2)
+            number = int(match.group(1))
+            span = (kind, match.start(), match.end())
+            if anchor == 'table_below':
+                # 标题在表格之前，需等遇到表格后才能确认；未紧邻表格的候选按正文引用处理
+                pending_tables = [item for item in pending_tables
+                                  if paragraph_index - item[2] < item_types[item[0]].get('anchor_distance', 2)]
+                pending_tables.append((kind, number, paragraph_index, span))
+                continue
+            if anchor == 'picture_above':
+                if last_picture_index is None or paragraph_index - last_picture_index > distance:
+                    continue
+                last_picture_index = None  # 一张图片只对应一个标题
+            index.add_definition(kind, number, paragraph_index)
+            definition_spans.setdefault(paragraph_index, []).append(span)
+
+        # 引用
+        for kind, offset, numbers in patterns.iter_mentions(text):
+            paragraph_mentions.append((paragraph_index, kind, offset, numbers))
+
+    for paragraph_index, kind, offset, numbers in paragraph_mentions:
+        spans = definition_spans.get(paragraph_index)
+        if spans and any(span_kind == kind and start <= offset < end for span_kind, start, end in spans):
+            continue
+        for number in numbers:
+            index.add_mention(kind, number, paragraph_index, offset)
+
+    return index
+
+# ---------- 检查 ----------
+def check_dangling_references(index, patterns, tpl):
+    """检查正文引用的图、表、公式是否存在"""
+    messages = tpl.get('messages', {})
+    items = []
+    for kind in patterns.item_types:
+        definitions = index.definitions[kind]
+        if not definitions:
+            continue  # 未识别到任何定义（如公式未编号），无法判断引用是否悬空
+        for number, (paragraph_index, _) in sorted(index.first_mentions[kind].items()):
+            if number in definitions:
+                continue
+            items.append({
+                'message': messages.get('dangling_error', '正文引用了不存在的{item}（段落 {paragraph}）').format(
+                    item=patterns.display(kind, number), paragraph=paragraph_index + 1),
+                'paragraph_index': paragraph_index,
+            })
+    return section_result(items, messages.get('dangling_ok', '正文中引用的图、表、公式均存在'))
+
+def check_uncited_items(index, patterns, tpl):
+    """检查每个图、表是否在正文中被引用"""
+    messages = tpl.get('messages', {})
+    items = []
+    for kind, cfg in patterns.item_types.items():
+        if not cfg.get('require_citation', True):
+            continue
+        mentions = index.first_mentions[kind]
+        for number, paragraph_index in sorted(index.definitions[kind].items()):
+            if number in mentions:
+                continue
+            items.append({
+                'message': messages.get('uncited_error', '{item} 未在正文中引用').format(
+                    item=patterns.display(kind, number)),
+                'paragraph_index': paragraph_index,
+            })
+    return section_result(items, messages.get('uncited_ok', '所有图、表均在正文中被引用'))
+
+def check_citation_order(index, patterns, tpl):
+    """检查图、表是否按编号顺序首次引用，以及是否先引用后出现"""
+    messages = tpl.get('messages', {})
+    items = []
+    for kind, cfg in patterns.item_types.items():
+        if not cfg.get('cite_before_definition', True):
+            continue
+        definitions = index.definitions[kind]
+        first_mentions = index.first_mentions[kind]
+
+        # 按编号递增，首次引用位置也应递增
+        for number, position, latest in iter_first_mention_order(definitions, first_mentions):
+            if latest is not None:
+                items.append({
+                    'message': messages.get(
+                        'order_sequence_error',
+                        '{item} 的首次引用（段落 {paragraph}）早于 {previous}（段落 {previous_paragraph}），应按编号顺序首次引用'
+                    ).format(item=patterns.display(kind, number), paragraph=position[0] + 1,
+                             previous=patterns.display(kind, latest[1]), previous_paragraph=latest[0][0] + 1),
+                    'paragraph_index': position[0],
+                })
+
+            # 首次引用应在图表之前（同一段落内的引用视为先引用）
+            definition_index = definitions[number]
+            if position[0] > definition_index:
+                items.append({
+                    'message': messages.get(
+                        'order_definition_error',
+                        '{item} 出现在首次引用之前（段落 {item_paragraph} 出现，段落 {paragraph} 首次引用），应先引用后出现'
+                    ).format(item=patterns.display(kind, number), item_paragraph=definition_index + 1,
+                             paragraph=position[0] + 1),
+                    'paragraph_index': definition_index,
+                })
+    return section_result(items, messages.get('order_ok', '图、表按编号顺序首次引用，且先引用后出现'))
+
+def check_doc_with_template(doc_path, template_identifier):
+    """
+    主检查函数：使用模板检查文档中图、表、公式的交叉引用
+    返回完整的检查报告
+    """
+    tpl = load_template(template_identifier)
+    doc = Document(doc_path)
+
+    patterns = CrossReferencePatterns(tpl)
+    index = build_cross_reference_index(doc, tpl, patterns)
+
+    report = {'summary': []}
+    checks = [
+        ('dangling_references', check_dangling_references),
+        ('uncited_items', check_uncited_items),
+        ('citation_order', check_citation_order),
+    ]
+    for key, check in checks:
+        if should_skip_check(key):
+            continue
+        report[key] = check(index, patterns, tpl)
+
+    report['details'] = {
+        'paragraphs_scanned': index.paragraphs_scanned,
+        'definitions': {kind: sorted(numbers) for kind, numbers in index.definitions.items()},
+        'mentions': {kind: dict(sorted(counts.items())) for kind, counts in index.mention_counts.items()},
+        'duplicate_definitions': {kind: duplicates
+                                  for kind, duplicates in index.duplicate_definitions.items() if duplicates},
+    }
+
+    all_ok = all(report[key]['ok'] for key, _ in checks if key in report)
+    report['summary'].append(f"交叉引用检查结果: {'通过' if all_ok else '发现问题'}")
+    report['summary'].append('，'.join(
+        f"{cfg.get('label', kind)}: 定义{len(index.definitions[kind])}个，被引用{len(index.first_mentions[kind])}个"
+        for kind, cfg in patterns.item_types.items()))
+    report['overall_ok'] = all_ok
+
+    return report
+
+# ---------- 报表输出 ----------
+def print_report(report):
+    """打印检查报告"""
+    print("=" * 60)
+    print("交叉引用检测报告")
+    print("=" * 60)
+
+    print("\n【检查总结】")
+    for summary in report.get('summary', []):
+        print(f"  {summary}")
+
+    sections = [
+        ('dangling_references', '悬空引用检查'),
+        ('uncited_items', '未引用检查'),
+        ('citation_order', '引用顺序检查'),
+    ]
+    for key, name in sections:
+        info = report.get(key)
+        if info is None:
+            continue
+        print(f"\n【{name}】")
+        mark = '✓' if info.get('ok', True) else '✗'
+        for msg in info.get('messages', []):
+            print(f"  {mark} {msg}")
+
+    duplicates = report.get('details', {}).get('duplicate_definitions', {})
+    if duplicates:
+        print("\n【重复编号】")
+        for kind, entries in duplicates.items():
+            for number, paragraph_index in entries:
+                print(f"  - {kind} {number} 重复出现（段落 {paragraph_index + 1}）")
+
+    print("\n" + "=" * 60)
+
+def print_help():
+    """显示帮助信息"""
+    print("用法:")
+    print("  python CrossRef_detect.py check <paper.docx> <template.json_or_name>")
+    print("")
+    print("示例:")
+    print("  python CrossRef_detect.py check template/test.docx CrossRef")
+    print("  python CrossRef_detect.py check template/test.docx templates/CrossRef.json")
+    print("")
+    print("说明:")
+    print("  检查正文中图、表、公式的交叉引用，包括：")
+    print("  - 引用的图、表、公式是否存在")
+    print("  - 每个图、表是否被引用")
+    print("  - 是否按编号顺序首次引用、先引用后出现")
+
+# ---------- CLI接口 ----------
+if __name__ == '__main__':
+    if len(sys.argv) != 4:
+        print_help()
+        sys.exit(0)
+
+    cmd = sys.argv[1]
+    if cmd == 'check':
+        paper_path = sys.argv[2]
+        tpl_id = sys.argv[3]
+
+        if not os.path.isfile(paper_path):
+            print(f"论文文件不存在: {paper_path}")
+            sys.exit(1)
+
+        try:
+            report = check_doc_with_template(paper_path, tpl_id)
+            print_report(report)
+            sys.exit(0 if report.get('overall_ok', False) else 1)
+        except Exception as e:
+            print("检查时出错:", e)
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+    else:
+        print_help()
+        sys.exit(0)
+
+'''
+使用示例:
+python paper_detect\CrossRef_detect.py check template\test.docx CrossRef
+python paper_detect\CrossRef_detect.py check template\test.docx templates\CrossRef.json
+'''
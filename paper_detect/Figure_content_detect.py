@@ -18,6 +18,9 @@
 import os
 import sys
 import io
+import copy
+import json
+import time
 import base64
 import tempfile
 from pathlib import Path
@@ -26,18 +29,82 @@ from docx import Document
 from docx.oxml import parse_xml
 from PIL import Image
 
+try:
+    from paper_detect.figure_store import FigureStore, content_hash
+except ImportError:
+    from .figure_store import FigureStore, content_hash
+
 try:
     import requests
 except ImportError:
     print("警告: 需要安装 requests 库: pip install requests")
     requests = None
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# 本地图表预分类默认阈值（可通过配置文件或构造参数覆盖）
+DEFAULT_PRECLASSIFY_THRESHOLDS = {
+    'max_side': 256,               # 分析前缩放到的最大边长（像素）
+    'white_level': 235,            # 灰度 >= 该值视为白色背景
+    'dark_level': 128,             # 灰度 < 该值视为线条/文字像素
+    'long_line_fraction': 0.4,     # 连续暗像素达到宽/高的该比例视为长直线
+    'photo_entropy_min': 4.0,      # 颜色直方图熵 >= 该值 且 白底比例较低 → 照片/显微图
+    'photo_white_max': 0.3,
+    'chart_entropy_max': 2.5,      # 颜色直方图熵 <= 该值 且 白底 + 横竖长线 → 图表
+    'chart_white_min': 0.6,
+    'chart_long_edge_min': 0.05    # 长直线像素占全部暗像素的最小比例
+}
+
+
+# 图表逐项检测顺序：(提示词键, 检测项名称)
+FIGURE_CHECK_ORDER = [
+    ('tick_direction', '刻度线方向'),
+    ('unit_format', '物理量单位表示'),
+    ('unit_brackets', '组合单位括号'),
+    ('decimal_consistency', '数值格式统一性'),
+    ('axis_title_consistency', '坐标轴标题一致性')
+]
+
+# 多图批量请求的提示词包装（json_object 模式要求顶层为对象，结果放在 results 数组中）
+BATCH_PROMPT_TEMPLATE = """以上共有 {count} 张图片（图片1 ~ 图片{count}）。
+对每张图片分别回答下面的同一个问题，单张图片的输出格式如下：
+
+{prompt}
+
+**只输出一个JSON对象**，results 数组按图片顺序给出每张图片的结果，必须恰好 {count} 项：
+```json
+{{"results": [<图片1的JSON>, <图片2的JSON>]}}
+```"""
+
+
+# 级联模式下追加给小模型的要求：给出置信度，供决定是否升级到大模型
+CASCADE_CONFIDENCE_SUFFIX = """
+
+另外在JSON中加入 "confidence" 字段（0~1之间的数字），表示你对该结论的把握程度。"""
+
+
+def _max_run_per_row(mask):
+    """返回二维布尔数组每一行中最长连续 True 的长度"""
+    counts = np.cumsum(mask, axis=1, dtype=np.int32)
+    resets = np.maximum.accumulate(np.where(mask, 0, counts), axis=1)
+    return (counts - resets).max(axis=1)
+
 
 class FigureContentDetector:
     """图片内容检测器 - 使用视觉模型分析图表规范性"""
     
     def __init__(self, api_key: str = None, api_base: str = None, 
-                 model: str = None, save_images: bool = None, image_dir: str = None):
+                 model: str = None, save_images: bool = None, image_dir: str = None,
+                 cassette_mode: str = None, cassette_path: str = None,
+                 preclassify: bool = None, preclassify_thresholds: Dict = None,
+                 batch_size: int = None, max_batch_bytes: int = None,
+                 cascade_model: str = None, cascade_min_confidence: float = None,
+                 budget: Dict = None, on_api_call=None, cancel_event=None,
+                 deadline_seconds: float = None):
         """
         初始化检测器
         
@@ -47,6 +114,19 @@ class FigureContentDetector:
             model: 模型名称（可选，未提供时从配置文件读取）
             save_images: 是否永久保存提取的图片（可选，未提供时从配置文件读取）
             image_dir: 保存图片的目录（可选，未提供时从配置文件读取）
+            cassette_mode: API录制/回放模式 'off'/'record'/'replay'（可选，未提供时从配置文件读取）
+            cassette_path: cassette文件路径（可选，未提供时从配置文件读取）
+            preclassify: 是否启用本地图表预分类（可选，未提供时从配置文件读取）
+            preclassify_thresholds: 预分类阈值，覆盖 DEFAULT_PRECLASSIFY_THRESHOLDS 中的对应项
+            batch_size: 每个请求最多打包的图片数（可选，默认1即逐张调用）
+            max_batch_bytes: 每个请求中图片base64的总字节上限（可选）
+            cascade_model: 级联模式下先调用的小模型（可选，未设置时只使用 model）
+            cascade_min_confidence: 小模型置信度低于该值时升级到大模型（可选，默认0.8）
+            budget: 单个文档的API预算 {'max_calls', 'max_tokens', 'max_seconds'}（可选，0或缺省表示不限）
+            on_api_call: 每次API请求完成后的回调，参数为该次请求的用量记录（可选）
+            cancel_event: threading.Event，被设置后不再发起新请求，剩余检查标记为跳过（可选）
+            deadline_seconds: 本次运行的截止时间（秒，可选），与预算中的 max_seconds 取较小值，
+                              进行中的请求超时也不超过截止时间
         """
         # 尝试从配置文件加载
         try:
@@ -59,6 +139,19 @@ class FigureContentDetector:
             self.model = model or config.model
             self.save_images = save_images if save_images is not None else config.save_images
             self.image_dir = Path(image_dir or config.image_dir)
+            cassette_mode = cassette_mode or config.cassette_mode
+            cassette_path = cassette_path or config.cassette_path
+            if preclassify is None:
+                preclassify = config.preclassify
+            if preclassify_thresholds is None:
+                preclassify_thresholds = config.preclassify_thresholds
+            batch_size = batch_size or config.batch_size
+            max_batch_bytes = max_batch_bytes or config.max_batch_bytes
+            cascade_model = cascade_model or config.cascade_model
+            if cascade_min_confidence is None:
+                cascade_min_confidence = config.cascade_min_confidence
+            # 配置文件中的预算与传入的预算按项合并，传入的项优先
+            budget = {**config.budget, **(budget or {})}
         except ImportError:
             # 如果无法导入配置加载器，使用默认值
             self.api_key = api_key
@@ -67,17 +160,59 @@ class FigureContentDetector:
             self.save_images = save_images if save_images is not None else False
             self.image_dir = Path(image_dir or "extracted_figures")
         
+        # 本地图表预分类：只有"不确定"的图片才调用 is_chart 提示词
+        self.preclassify_enabled = (preclassify if preclassify is not None else True) and np is not None
+        self.preclassify_thresholds = dict(DEFAULT_PRECLASSIFY_THRESHOLDS)
+        self.preclassify_thresholds.update(preclassify_thresholds or {})
+        unknown_thresholds = set(preclassify_thresholds or {}) - set(DEFAULT_PRECLASSIFY_THRESHOLDS)
+        if unknown_thresholds:
+            print(f"警告: 未知的预分类阈值 {', '.join(sorted(unknown_thresholds))}（可用: "
+                  f"{', '.join(DEFAULT_PRECLASSIFY_THRESHOLDS)}）")
+        self.preclassify_stats = {'chart': 0, 'not_chart': 0, 'uncertain': 0, 'api_calls_avoided': 0}
+        
+        # 多图批量请求（同一文档的多张图片打包到一条消息中）
+        self.batch_size = max(1, int(batch_size or 1))
+        self.max_batch_bytes = int(max_batch_bytes or 8 * 1024 * 1024)
+        
+        # 模型级联：小模型先答，无法解析/报告违规/置信度低时再交给大模型
+        self.cascade_model = cascade_model if cascade_model and cascade_model != self.model else None
+        self.cascade_min_confidence = cascade_min_confidence if cascade_min_confidence is not None else 0.8
+        self.cascade_stats = {'answered_by_small': 0, 'escalated': 0}
+        
+        # API用量统计与预算（每个检测器对应一个文档）
+        self.budget = {key: value for key, value in (budget or {}).items() if value}
+        if deadline_seconds:
+            self.budget['max_seconds'] = min(self.budget.get('max_seconds') or deadline_seconds, deadline_seconds)
+        self.api_calls = []  # 每次请求的用量记录
+        self.skipped_checks = 0
+        self.budget_exhausted_reason = None
+        # 时间预算从第一次请求开始计时；设置了截止时间时从检测器创建时开始计时
+        self._budget_start = time.perf_counter() if deadline_seconds else None
+        self._last_attempts = 0
+        self.on_api_call = on_api_call
+        self.cancel_event = cancel_event
+        
+        # API录制/回放（回放模式下不访问网络，也不需要API密钥）
+        self.cassette = None
+        cassette_mode = cassette_mode or 'off'
+        if cassette_mode != 'off':
+            from paper_detect.api_cassette import VisionCassette
+            self.cassette = VisionCassette(
+                cassette_path or "api_results/figure_api_cassette.jsonl",
+                mode=cassette_mode
+            )
+            print(f"  API cassette: {cassette_mode} -> {self.cassette.path}")
+        
         # 验证API密钥
-        if not self.api_key:
+        if not self.api_key and not (self.cassette and self.cassette.mode == 'replay'):
             raise ValueError(
                 "未提供API密钥。请通过以下方式之一配置:\n"
                 "1. 在 config_api.py 中设置 SILICONFLOW_API_KEY\n"
                 "2. 传递 api_key 参数: FigureContentDetector(api_key='sk-xxx')"
             )
         
-        # 如果需要永久保存图片，创建目录
-        if self.save_images and not self.image_dir.exists():
-            self.image_dir.mkdir(parents=True, exist_ok=True)
+        # 如果需要永久保存图片，使用内容寻址的图片库（自动创建目录与索引）
+        self.store = FigureStore(self.image_dir) if self.save_images else None
         
         # 检测规则提示词（分为多个独立问题）
         self.detection_prompts = {
@@ -164,19 +299,19 @@ class FigureContentDetector:
 ```"""
         }
     
-    def extract_and_save_image(self, paragraph, doc_path: str, figure_number: int = None) -> Optional[str]:
+    def extract_image_blob(self, paragraph, rel_id: str = None) -> Optional[Tuple[bytes, str]]:
         """
-        从段落中提取图片并保存到本地
+        从段落中取出第一张图片的字节数据
         
         参数:
             paragraph: 段落对象
-            doc_path: 文档路径（用于提取图片）
-            figure_number: 图片编号（用于文件命名）
+            rel_id: 图片关系ID（来自媒体索引，提供时不再查询段落XML）
         
         返回:
-            保存的图片文件路径或None
+            (图片字节, 扩展名) 或None
         """
-        try:
+        embed_id = rel_id
+        if not embed_id:
             # 检查段落是否包含图片
             para_xml = paragraph._element
             
@@ -193,50 +328,83 @@ class FigureContentDetector:
             embed_id = blip.get('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed')
             if not embed_id:
                 embed_id = blip.get('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id')
+        
+        if not embed_id:
+            return None
+        
+        # 从文档中提取图片
+        image_part = paragraph.part.related_parts[embed_id]
+        image_bytes = image_part.blob
+        
+        # 确定图片格式
+        content_type = image_part.content_type
+        if 'png' in content_type:
+            ext = 'png'
+        elif 'jpeg' in content_type or 'jpg' in content_type:
+            ext = 'jpg'
+        elif 'gif' in content_type:
+            ext = 'gif'
+        elif 'bmp' in content_type:
+            ext = 'bmp'
+        else:
+            ext = 'png'  # 默认使用png
+        
+        return image_bytes, ext
+    
+    def save_image_bytes(self, image_bytes: bytes, ext: str, doc_path: str,
+                         figure_number: int = None, digest: str = None) -> str:
+        """
+        保存图片字节：永久保存时按内容哈希存入图片库并登记索引，否则写入临时文件
+        
+        参数:
+            image_bytes: 图片字节
+            ext: 扩展名
+            doc_path: 文档路径（用于索引中的文档名）
+            figure_number: 图片编号（用于索引）
+            digest: 预先计算的 sha256（可选）
+        
+        返回:
+            图片文件路径
+        """
+        if self.store:
+            # 永久保存（内容寻址，同一内容只保存一次）
+            digest = digest or content_hash(image_bytes)
+            image_path = self.store.store(image_bytes, ext, digest)
+            figure_key = str(figure_number) if figure_number else f"sha-{digest[:12]}"
+            self.store.register(Path(doc_path).stem, figure_key, digest)
             
-            if not embed_id:
+            print(f"  ✓ 图片已保存: {image_path}")
+            return str(image_path)
+        
+        # 使用临时文件
+        temp_file = tempfile.NamedTemporaryFile(suffix=f'.{ext}', delete=False)
+        temp_file.write(image_bytes)
+        temp_file.close()
+        
+        print(f"  ✓ 图片已提取到临时文件: {temp_file.name}")
+        return temp_file.name
+    
+    def extract_and_save_image(self, paragraph, doc_path: str, figure_number: int = None) -> Optional[str]:
+        """
+        从段落中提取图片并保存到本地
+        
+        参数:
+            paragraph: 段落对象
+            doc_path: 文档路径（用于提取图片）
+            figure_number: 图片编号（用于索引登记）
+        
+        返回:
+            保存的图片文件路径或None
+        """
+        try:
+            blob = self.extract_image_blob(paragraph)
+            if not blob:
                 return None
             
-            # 从文档中提取图片
-            image_part = paragraph.part.related_parts[embed_id]
-            image_bytes = image_part.blob
-            
-            # 确定图片格式
-            content_type = image_part.content_type
-            if 'png' in content_type:
-                ext = 'png'
-            elif 'jpeg' in content_type or 'jpg' in content_type:
-                ext = 'jpg'
-            elif 'gif' in content_type:
-                ext = 'gif'
-            elif 'bmp' in content_type:
-                ext = 'bmp'
-            else:
-                ext = 'png'  # 默认使用png
-            
-            # 保存图片
-            if self.save_images:
-                # 永久保存
-                doc_name = Path(doc_path).stem
-                if figure_number:
-                    filename = f"{doc_name}_Fig{figure_number}.{ext}"
-                else:
-                    filename = f"{doc_name}_figure_{id(paragraph)}.{ext}"
-                
-                image_path = self.image_dir / filename
-                with open(image_path, 'wb') as f:
-                    f.write(image_bytes)
-                
-                print(f"  ✓ 图片已保存: {image_path}")
-                return str(image_path)
-            else:
-                # 使用临时文件
-                temp_file = tempfile.NamedTemporaryFile(suffix=f'.{ext}', delete=False)
-                temp_file.write(image_bytes)
-                temp_file.close()
-                
-                print(f"  ✓ 图片已提取到临时文件: {temp_file.name}")
-                return temp_file.name
+            image_path = self.save_image_bytes(blob[0], blob[1], doc_path, figure_number)
+            if self.store:
+                self.store.flush()
+            return image_path
             
         except Exception as e:
             print(f"  ✗ 提取图片失败: {e}")
@@ -244,6 +412,80 @@ class FigureContentDetector:
             traceback.print_exc()
             return None
     
+    def preclassify_chart(self, image_path: str) -> Optional[Dict]:
+        """
+        本地快速判断图片是否为带坐标轴的图表（不调用API）
+        
+        特征:
+            - color_entropy: 颜色直方图熵（每通道16级量化），照片/显微图高，图表低
+            - white_fraction: 白色背景像素比例，图表通常为白底
+            - long_edge_ratio: 位于长横线/长竖线（坐标轴、边框）上的暗像素比例
+        
+        参数:
+            image_path: 图片文件路径
+        
+        返回:
+            {'label': 'chart'/'not_chart'/'uncertain', 'features': {...}}；
+            无法分析（未安装numpy或图片损坏）时返回None
+        """
+        if np is None:
+            return None
+        
+        th = self.preclassify_thresholds
+        try:
+            with Image.open(image_path) as img:
+                img.draft('RGB', (th['max_side'], th['max_side']))  # JPEG可直接按缩小尺寸解码
+                if img.mode in ('RGBA', 'LA', 'P'):
+                    img = img.convert('RGBA')
+                    background = Image.new('RGBA', img.size, (255, 255, 255, 255))
+                    img = Image.alpha_composite(background, img)
+                img = img.convert('RGB')
+                img.thumbnail((th['max_side'], th['max_side']))
+                rgb = np.asarray(img, dtype=np.uint8)
+        except Exception as e:
+            print(f"    本地预分类失败: {e}")
+            return None
+        
+        if rgb.size == 0:
+            return None
+        
+        # 颜色直方图熵
+        quantized = (rgb >> 4).astype(np.int32)
+        codes = (quantized[..., 0] << 8) | (quantized[..., 1] << 4) | quantized[..., 2]
+        hist = np.bincount(codes.ravel(), minlength=4096).astype(np.float64)
+        prob = hist[hist > 0] / codes.size
+        color_entropy = float(-(prob * np.log2(prob)).sum())
+        
+        # 白底比例与长直线
+        gray = rgb.astype(np.float32) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+        white_fraction = float((gray >= th['white_level']).mean())
+        dark = gray < th['dark_level']
+        height, width = dark.shape
+        long_rows = _max_run_per_row(dark) >= th['long_line_fraction'] * width
+        long_cols = _max_run_per_row(dark.T) >= th['long_line_fraction'] * height
+        dark_total = int(dark.sum())
+        long_pixels = int(dark[long_rows, :].sum() + dark[:, long_cols].sum())
+        long_edge_ratio = min(1.0, long_pixels / dark_total) if dark_total else 0.0
+        
+        features = {
+            'color_entropy': round(color_entropy, 3),
+            'white_fraction': round(white_fraction, 3),
+            'long_edge_ratio': round(long_edge_ratio, 3),
+            'horizontal_lines': int(long_rows.sum()),
+            'vertical_lines': int(long_cols.sum())
+        }
+        
+        if color_entropy >= th['photo_entropy_min'] and white_fraction <= th['photo_white_max']:
+            label = 'not_chart'
+        elif (color_entropy <= th['chart_entropy_max'] and white_fraction >= th['chart_white_min']
+              and features['horizontal_lines'] > 0 and features['vertical_lines'] > 0
+              and long_edge_ratio >= th['chart_long_edge_min']):
+            label = 'chart'
+        else:
+            label = 'uncertain'
+        
+        return {'label': label, 'features': features}
+    
     def encode_image_base64(self, image_bytes: bytes) -> str:
         """
         将图片字节编码为base64字符串（兼容旧方法）
@@ -270,30 +512,47 @@ class FigureContentDetector:
             image_bytes = f.read()
         return base64.b64encode(image_bytes).decode('utf-8')
     
-    def call_vision_api(self, image_base64: str, prompt: str) -> Optional[Dict]:
+    def _build_payload(self, images_base64: List[str], prompt: str, model: str = None) -> Dict:
         """
-        调用硅基流动视觉API
+        构造 /chat/completions 请求体
         
         参数:
-            image_base64: base64编码的图片
+            images_base64: base64编码的图片列表（单张时与逐张调用的请求完全一致）
             prompt: 提示词
+            model: 使用的模型（默认 self.model）
         
         返回:
-            API响应字典或None
+            请求体字典
         """
-        if not requests:
-            print("错误: 未安装 requests 库")
-            return None
-        
-        url = f"{self.api_base}/chat/completions"
-        
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
+        if len(images_base64) == 1:
+            user_content = [
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:image/jpeg;base64,{images_base64[0]}"
+                    }
+                },
+                {
+                    "type": "text",
+                    "text": prompt
+                }
+            ]
+        else:
+            # 多图：每张图片前加序号，便于模型按顺序返回结果
+            user_content = []
+            for k, image_base64 in enumerate(images_base64, start=1):
+                user_content.append({"type": "text", "text": f"图片{k}:"})
+                user_content.append({
+                    "type": "image_url",
+                    "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"}
+                })
+            user_content.append({
+                "type": "text",
+                "text": BATCH_PROMPT_TEMPLATE.format(count=len(images_base64), prompt=prompt)
+            })
         
-        payload = {
-            "model": self.model,
+        return {
+            "model": model or self.model,
             "messages": [
                 {
                     "role": "system",
@@ -301,24 +560,169 @@ class FigureContentDetector:
                 },
                 {
                     "role": "user",
-                    "content": [
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{image_base64}"
-                            }
-                        },
-                        {
-                            "type": "text",
-                            "text": prompt
-                        }
-                    ]
+                    "content": user_content
                 }
             ],
-            "max_tokens": 500,  # 减少token限制，强制简短回答
+            "max_tokens": min(500 * len(images_base64), 4000),  # 减少token限制，强制简短回答
             "temperature": 0.0,  # 最低温度
             "response_format": {"type": "json_object"}  # 强制JSON输出
         }
+    
+    def _send_payload(self, payload: Dict) -> Optional[Dict]:
+        """
+        发送请求体（处理cassette录制/回放）
+        
+        参数:
+            payload: 请求体
+        
+        返回:
+            API响应字典或None
+        """
+        if self._budget_start is None:
+            self._budget_start = time.perf_counter()
+        
+        start_time = time.perf_counter()
+        self._last_attempts = 1
+        
+        # 回放模式：直接返回录制的响应
+        if self.cassette and self.cassette.mode == 'replay':
+            response = self.cassette.replay(payload)
+            if response is None:
+                print(f"    cassette中没有该请求的录制记录: {self.cassette.path}")
+        else:
+            response = self._post_chat_completion(payload)
+        
+        elapsed = time.perf_counter() - start_time
+        
+        # 录制模式：保存请求/响应对（密钥脱敏）
+        if self.cassette and self.cassette.mode == 'record':
+            self.cassette.record(payload, self.api_key, response, elapsed)
+        
+        self._record_usage(payload, response, elapsed)
+        return response
+    
+    def _record_usage(self, payload: Dict, response: Optional[Dict], elapsed: float):
+        """记录单次请求的用量：tokens、图片载荷字节数（base64 data URL）、耗时、重试次数"""
+        images = [item['image_url']['url'] for item in payload['messages'][-1]['content']
+                  if item.get('type') == 'image_url']
+        usage = (response or {}).get('usage') or {}
+        record = {
+            'model': payload['model'],
+            'images': len(images),
+            'payload_bytes': sum(len(url) for url in images),
+            'prompt_tokens': usage.get('prompt_tokens', 0),
+            'completion_tokens': usage.get('completion_tokens', 0),
+            'latency_seconds': round(elapsed, 3),
+            'retries': max(0, self._last_attempts - 1),
+            'ok': response is not None
+        }
+        self.api_calls.append(record)
+        if self.on_api_call:
+            self.on_api_call(dict(record))
+    
+    def usage_summary(self) -> Dict:
+        """
+        汇总本文档的API用量
+        
+        返回:
+            {'calls', 'failed_calls', 'prompt_tokens', 'completion_tokens', 'payload_bytes',
+             'api_seconds', 'retries', 'skipped_checks', 'budget', 'budget_exhausted', 'per_call'}
+        """
+        return {
+            'calls': len(self.api_calls),
+            'failed_calls': sum(1 for call in self.api_calls if not call['ok']),
+            'prompt_tokens': sum(call['prompt_tokens'] for call in self.api_calls),
+            'completion_tokens': sum(call['completion_tokens'] for call in self.api_calls),
+            'payload_bytes': sum(call['payload_bytes'] for call in self.api_calls),
+            'api_seconds': round(sum(call['latency_seconds'] for call in self.api_calls), 3),
+            'retries': sum(call['retries'] for call in self.api_calls),
+            'skipped_checks': self.skipped_checks,
+            'budget': dict(self.budget),
+            'budget_exhausted': self.budget_exhausted_reason,
+            'per_call': list(self.api_calls)
+        }
+    
+    def _remaining_seconds(self) -> Optional[float]:
+        """返回时间预算的剩余秒数；未设置时间预算时返回None"""
+        if not self.budget.get('max_seconds') or self._budget_start is None:
+            return None
+        return self.budget['max_seconds'] - (time.perf_counter() - self._budget_start)
+    
+    def check_budget(self) -> Optional[str]:
+        """
+        检查API预算是否用尽
+        
+        返回:
+            用尽原因（如 "调用次数已达上限 40"）；预算充足时返回None
+        """
+        if self.budget_exhausted_reason:
+            return self.budget_exhausted_reason
+        
+        reason = None
+        tokens = sum(call['prompt_tokens'] + call['completion_tokens'] for call in self.api_calls)
+        remaining = self._remaining_seconds()
+        if self.budget.get('max_calls') and len(self.api_calls) >= self.budget['max_calls']:
+            reason = f"调用次数已达上限 {self.budget['max_calls']}"
+        elif self.budget.get('max_tokens') and tokens >= self.budget['max_tokens']:
+            reason = f"token用量已达上限 {self.budget['max_tokens']}"
+        elif remaining is not None and remaining <= 0:
+            reason = f"耗时已达上限 {self.budget['max_seconds']}s"
+        elif self.cancel_event is not None and self.cancel_event.is_set():
+            reason = "已超过截止时间"
+        
+        if reason:
+            self.budget_exhausted_reason = reason
+            print(f"    ⚠ API预算已用尽（{reason}），剩余图片检查标记为跳过")
+        return reason
+    
+    def call_vision_api(self, image_base64: str, prompt: str, model: str = None) -> Optional[Dict]:
+        """
+        调用硅基流动视觉API
+        
+        参数:
+            image_base64: base64编码的图片
+            prompt: 提示词
+            model: 使用的模型（默认 self.model）
+        
+        返回:
+            API响应字典或None
+        """
+        return self._send_payload(self._build_payload([image_base64], prompt, model))
+    
+    def call_vision_api_batch(self, images_base64: List[str], prompt: str, model: str = None) -> Optional[Dict]:
+        """
+        在一条消息中发送多张图片，要求模型按顺序返回每张图片的结果
+        
+        参数:
+            images_base64: base64编码的图片列表
+            prompt: 单张图片的提示词（会包装为批量提示词）
+            model: 使用的模型（默认 self.model）
+        
+        返回:
+            API响应字典或None
+        """
+        return self._send_payload(self._build_payload(images_base64, prompt, model))
+    
+    def _post_chat_completion(self, payload: Dict) -> Optional[Dict]:
+        """
+        发送 /chat/completions 请求（带重试）
+        
+        参数:
+            payload: 请求体
+        
+        返回:
+            API响应字典或None
+        """
+        if not requests:
+            print("错误: 未安装 requests 库")
+            return None
+        
+        url = f"{self.api_base}/chat/completions"
+        
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
         
         # 添加重试机制：最多重试3次
         max_retries = 3
@@ -326,13 +730,21 @@ class FigureContentDetector:
         
         for attempt in range(max_retries):
             try:
-                # 增加超时时间到180秒（3分钟），适应复杂图片处理
+                # 增加超时时间到180秒（3分钟），适应复杂图片处理；设置了时间预算时不超过剩余时间
+                timeout = 180
+                remaining = self._remaining_seconds()
+                if remaining is not None:
+                    if attempt > 0 and remaining <= retry_delay:
+                        print(f"    时间预算不足，放弃重试")
+                        return None
+                    timeout = max(1, min(timeout, remaining - (retry_delay if attempt > 0 else 0)))
+                
                 if attempt > 0:
                     print(f"    第 {attempt + 1} 次重试...")
-                    import time
                     time.sleep(retry_delay)
                 
-                response = requests.post(url, json=payload, headers=headers, timeout=180)
+                self._last_attempts = attempt + 1
+                response = requests.post(url, json=payload, headers=headers, timeout=timeout)
                 response.raise_for_status()
                 return response.json()
                 
@@ -400,6 +812,163 @@ class FigureContentDetector:
         except Exception as e:
             return {'error': f'解析响应失败: {e}'}
     
+    def parse_batch_response(self, response: Dict, count: int) -> Optional[List[Dict]]:
+        """
+        解析批量API响应
+        
+        参数:
+            response: API返回的响应
+            count: 本批图片数量
+        
+        返回:
+            按图片顺序排列的结果列表；无法按图片拆分时返回None
+        """
+        parsed = self.parse_api_response(response)
+        if isinstance(parsed, dict):
+            parsed = parsed.get('results')
+        if not isinstance(parsed, list) or len(parsed) != count:
+            return None
+        if not all(isinstance(item, dict) for item in parsed):
+            return None
+        return parsed
+    
+    def _make_batches(self, images_base64: List[str]) -> List[List[int]]:
+        """
+        按批大小和请求体积上限把图片分组
+        
+        参数:
+            images_base64: base64编码的图片列表
+        
+        返回:
+            图片下标分组列表
+        """
+        batches = []
+        current = []
+        current_bytes = 0
+        for i, image_base64 in enumerate(images_base64):
+            size = len(image_base64)
+            if current and (len(current) >= self.batch_size or current_bytes + size > self.max_batch_bytes):
+                batches.append(current)
+                current = []
+                current_bytes = 0
+            current.append(i)
+            current_bytes += size
+        if current:
+            batches.append(current)
+        return batches
+    
+    def ask_vision_batch(self, images_base64: List[str], prompt_key: str, model: str = None,
+                         prompt_suffix: str = '') -> List[Optional[Dict]]:
+        """
+        对多张图片询问同一个检测问题（按 batch_size 打包，批量解析失败时逐张重试）
+        
+        参数:
+            images_base64: base64编码的图片列表
+            prompt_key: detection_prompts 中的提示词键
+            model: 使用的模型（默认 self.model）
+            prompt_suffix: 追加在提示词后的额外要求
+        
+        返回:
+            与 images_base64 一一对应的解析结果；API调用失败的位置为None
+        """
+        prompt = self.detection_prompts[prompt_key] + prompt_suffix
+        results = [None] * len(images_base64)
+        
+        for batch in self._make_batches(images_base64):
+            # 预算用尽：剩余图片的该项检查标记为跳过，不再发请求
+            reason = self.check_budget()
+            if reason:
+                for i in batch:
+                    results[i] = {'skipped': True, 'reason': f"API预算已用尽（{reason}）"}
+                    self.skipped_checks += 1
+                continue
+            
+            if len(batch) > 1:
+                response = self.call_vision_api_batch([images_base64[i] for i in batch], prompt, model)
+                parsed = self.parse_batch_response(response, len(batch)) if response else None
+                if parsed is not None:
+                    for i, item in zip(batch, parsed):
+                        results[i] = item
+                    continue
+                print(f"    批量响应无法按图片拆分，改为逐张调用（{len(batch)} 张）...")
+            
+            for i in batch:
+                reason = self.check_budget()
+                if reason:
+                    results[i] = {'skipped': True, 'reason': f"API预算已用尽（{reason}）"}
+                    self.skipped_checks += 1
+                    continue
+                response = self.call_vision_api(images_base64[i], prompt, model)
+                results[i] = self.parse_api_response(response) if response else None
+        
+        return results
+    
+    def _needs_escalation(self, prompt_key: str, parsed_result: Optional[Dict]) -> bool:
+        """
+        判断小模型的回答是否需要交给大模型复核
+        
+        条件：调用失败/JSON无法解析、报告了违规（ok 不为 true）、置信度低于阈值
+        """
+        if isinstance(parsed_result, dict) and parsed_result.get('skipped'):
+            return False
+        if not isinstance(parsed_result, dict) or 'error' in parsed_result or parsed_result.get('parsed') is False:
+            return True
+        
+        if prompt_key == 'is_chart':
+            if 'is_chart' not in parsed_result:
+                return True
+        elif parsed_result.get('ok') is not True:
+            return True
+        
+        confidence = parsed_result.get('confidence')
+        if confidence is not None:
+            try:
+                return float(confidence) < self.cascade_min_confidence
+            except (TypeError, ValueError):
+                return True
+        return False
+    
+    def ask_vision_cascade(self, images_base64: List[str], prompt_key: str) -> Tuple[List[Optional[Dict]], List[Optional[str]]]:
+        """
+        按模型级联询问检测问题：先用 cascade_model，有疑问的图片再交给 self.model
+        
+        参数:
+            images_base64: base64编码的图片列表
+            prompt_key: detection_prompts 中的提示词键
+        
+        返回:
+            (解析结果列表, 给出该结果的模型名列表)，两者与 images_base64 一一对应
+        """
+        if not self.cascade_model:
+            results = self.ask_vision_batch(images_base64, prompt_key)
+            return results, [self.model if r is not None else None for r in results]
+        
+        results = self.ask_vision_batch(images_base64, prompt_key, model=self.cascade_model,
+                                        prompt_suffix=CASCADE_CONFIDENCE_SUFFIX)
+        models = [self.cascade_model] * len(images_base64)
+        
+        for i, r in enumerate(results):
+            if isinstance(r, dict) and r.get('skipped'):
+                models[i] = None
+        escalate = [i for i, r in enumerate(results) if self._needs_escalation(prompt_key, r)]
+        self.cascade_stats['answered_by_small'] += len(images_base64) - len(escalate)
+        self.cascade_stats['escalated'] += len(escalate)
+        
+        if escalate:
+            answers = self.ask_vision_batch([images_base64[i] for i in escalate], prompt_key)
+            for i, answer in zip(escalate, answers):
+                results[i] = answer
+                models[i] = self.model if answer is not None else None
+        
+        return results, models
+    
+    def _release_image(self, result: Dict):
+        """清理临时图片文件（如果不是永久保存）"""
+        image_path = result.get('image_path')
+        if not self.save_images and image_path and os.path.exists(image_path):
+            os.unlink(image_path)
+            result['image_path'] = None
+    
     def detect_figure_content(self, paragraph, doc_path: str, figure_number: int = None) -> Dict:
         """
         检测图片内容规范性（完整流程：提取→保存→逐项分析）
@@ -412,104 +981,241 @@ class FigureContentDetector:
         返回:
             检测结果字典
         """
-        result = {
-            'ok': True,
-            'is_chart': False,
-            'messages': [],
-            'details': {},
-            'image_path': None
-        }
+        return self.detect_figures_content([(paragraph, figure_number)], doc_path)[0]
+    
+    def detect_figures_content(self, figures: List[Tuple], doc_path: str, on_result=None) -> List[Dict]:
+        """
+        检测同一文档中多张图片的内容规范性
         
-        # 1. 提取并保存图片到本地
-        print(f"    正在提取图片...")
-        image_path = self.extract_and_save_image(paragraph, doc_path, figure_number)
-        if not image_path:
-            result['ok'] = False
-            result['messages'].append("无法提取图片数据")
-            return result
+        每个检测问题对所有图片一起询问，batch_size > 1 时多张图片打包在一条消息中，
+        系统提示词与请求开销按批而不是按图片计算。
         
-        result['image_path'] = image_path
+        参数:
+            figures: [(包含图片的段落, 图片编号[, 图片关系ID]), ...]
+                     第三项来自媒体索引（media_index），可省略
+            doc_path: 文档路径
+            on_result: 某张图片的结论确定后立即调用的回调 f(图片下标, 检测结果)（可选）；
+                       非图表在类型判断后即完成，图表在全部检查项完成后完成
         
-        # 2. 读取图片并编码为base64
-        try:
-            image_base64 = self.encode_image_base64_from_file(image_path)
-        except Exception as e:
-            result['ok'] = False
-            result['messages'].append(f"读取图片文件失败: {e}")
-            # 清理临时文件
-            if not self.save_images and os.path.exists(image_path):
-                os.unlink(image_path)
-            return result
-        
-        # 3. 第一步：判断是否为图表
-        print(f"    [1/6] 判断图片类型...")
-        is_chart_response = self.call_vision_api(image_base64, self.detection_prompts['is_chart'])
-        
-        if not is_chart_response:
-            result['ok'] = False
-            result['messages'].append("图片类型判断失败")
-            if not self.save_images and os.path.exists(image_path):
-                os.unlink(image_path)
-            return result
-        
-        is_chart_result = self.parse_api_response(is_chart_response)
-        result['details']['is_chart_check'] = is_chart_result
-        
-        if not is_chart_result.get('is_chart', False):
-            # 不是图表，跳过后续检测
-            result['is_chart'] = False
-            result['messages'].append(f"图片类型: {is_chart_result.get('chart_type', '非图表')}")
-            if not self.save_images and os.path.exists(image_path):
-                os.unlink(image_path)
-            return result
-        
-        result['is_chart'] = True
-        print(f"    图表类型: {is_chart_result.get('chart_type', '图表')}")
-        
-        # 4. 逐项检测（针对图表）
-        check_results = {}
-        check_order = [
-            ('tick_direction', '刻度线方向'),
-            ('unit_format', '物理量单位表示'),
-            ('unit_brackets', '组合单位括号'),
-            ('decimal_consistency', '数值格式统一性'),
-            ('axis_title_consistency', '坐标轴标题一致性')
-        ]
-        
-        for idx, (check_key, check_name) in enumerate(check_order, start=2):
-            print(f"    [{idx}/6] 检查{check_name}...")
+        返回:
+            与 figures 一一对应的检测结果字典列表
+        """
+        results = []
+        images = []
+        digests = []
+        first_by_digest = {}  # sha256 -> 本文档中第一次出现的图片下标
+        duplicates = {}       # 图片下标 -> 内容相同的第一张图片下标
+        cached = set()        # 直接复用图片库中已有分析结果的图片下标
+        signature = self._analysis_signature()
+        
+        # 1. 提取图片并编码为base64（内容相同的图片只分析一次）
+        for figure in figures:
+            paragraph, figure_number = figure[0], figure[1]
+            rel_id = figure[2] if len(figure) > 2 else None
+            result = {
+                'ok': True,
+                'is_chart': False,
+                'messages': [],
+                'details': {},
+                'image_path': None
+            }
+            results.append(result)
+            images.append(None)
+            digests.append(None)
             
-            response = self.call_vision_api(image_base64, self.detection_prompts[check_key])
-            if not response:
-                check_results[check_key] = {'ok': False, 'error': 'API调用失败'}
+            print(f"    正在提取图片...")
+            try:
+                blob = self.extract_image_blob(paragraph, rel_id)
+            except Exception as e:
+                print(f"  ✗ 提取图片失败: {e}")
+                blob = None
+            if not blob:
+                result['ok'] = False
+                result['messages'].append("无法提取图片数据")
                 continue
             
-            parsed_result = self.parse_api_response(response)
-            check_results[check_key] = parsed_result
+            image_bytes, ext = blob
+            digest = content_hash(image_bytes)
+            digests[-1] = digest
+            result['details']['sha256'] = digest
             
-            # 收集问题
-            if not parsed_result.get('ok', True):
-                result['ok'] = False
+            if digest in first_by_digest:
+                duplicates[len(results) - 1] = first_by_digest[digest]
+                if self.store:
+                    result['image_path'] = self.save_image_bytes(image_bytes, ext, doc_path, figure_number, digest)
+                continue
+            first_by_digest[digest] = len(results) - 1
+            
+            result['image_path'] = self.save_image_bytes(image_bytes, ext, doc_path, figure_number, digest)
+            
+            cached_analysis = self.store.cached_analysis(digest, signature) if self.store else None
+            if cached_analysis:
+                result.update(copy.deepcopy(cached_analysis))
+                result['details']['sha256'] = digest
+                result['details']['cached'] = True
+                cached.add(len(results) - 1)
+                print(f"    已按内容复用图片分析结果: {digest[:12]}")
+                continue
+            
+            images[-1] = self.encode_image_base64(image_bytes)
+        
+        active = [i for i, image_base64 in enumerate(images) if image_base64]
+        active_set = set(active)
+        copies = {}  # 第一张图片下标 -> 内容相同的其余图片下标
+        for i, first in duplicates.items():
+            copies.setdefault(first, []).append(i)
+        
+        def finish(i):
+            """图片 i 的结论已确定：清理临时文件、保存分析结果，复制给内容相同的图片并回调"""
+            result = results[i]
+            if i in active_set:
+                self._release_image(result)
                 
-                # 根据不同的结果格式提取问题描述
-                if 'issues' in parsed_result:
-                    for issue in parsed_result['issues']:
-                        result['messages'].append(f"❌ [{check_name}] {issue}")
-                elif 'description' in parsed_result:
-                    result['messages'].append(f"❌ [{check_name}] {parsed_result['description']}")
+                # 如果所有（未跳过的）检查都通过
+                if result['is_chart'] and result['ok'] and not result.get('skipped'):
+                    result['messages'].append("✅ 图表内容符合所有规范")
+                
+                # 完整分析的结果按内容保存，供其他文档复用
+                if self.store and not result.get('skipped') and self._analysis_complete(result):
+                    self.store.save_analysis(digests[i], signature, {
+                        key: result[key] for key in ('ok', 'is_chart', 'messages', 'details')
+                    })
+            
+            # 内容相同的图片直接复用第一张图片的结果
+            for j in copies.get(i, ()):
+                image_path = results[j]['image_path']
+                results[j] = copy.deepcopy(result)
+                results[j]['image_path'] = image_path
+                results[j]['details']['duplicate_of'] = i + 1
+            
+            if on_result:
+                for k in [i] + copies.get(i, []):
+                    on_result(k, results[k])
         
-        result['details']['check_results'] = check_results
+        # 提取失败或复用了已有分析结果的图片不需要调用API
+        for i in range(len(results)):
+            if i not in duplicates and i not in active_set:
+                finish(i)
         
-        # 清理临时文件（如果不是永久保存）
-        if not self.save_images and os.path.exists(image_path):
-            os.unlink(image_path)
-            result['image_path'] = None
+        # 2. 第一步：判断是否为图表（本地预分类有把握时不调用API）
+        print(f"    [1/6] 判断图片类型（{len(active)} 张）...")
+        is_chart_results = {}
+        need_api = []
+        for i in active:
+            preclassified = self.preclassify_chart(results[i]['image_path']) if self.preclassify_enabled else None
+            if preclassified:
+                results[i]['details']['preclassify'] = preclassified
+                self.preclassify_stats[preclassified['label']] += 1
+            
+            if preclassified and preclassified['label'] != 'uncertain':
+                self.preclassify_stats['api_calls_avoided'] += 1
+                if preclassified['label'] == 'chart':
+                    is_chart_results[i] = {'is_chart': True, 'chart_type': '图表（本地预分类）'}
+                else:
+                    is_chart_results[i] = {'is_chart': False, 'chart_type': '非图表（本地预分类）'}
+            else:
+                need_api.append(i)
         
-        # 如果所有检查都通过
-        if result['ok']:
-            result['messages'].append("✅ 图表内容符合所有规范")
+        if need_api:
+            answers, models = self.ask_vision_cascade([images[i] for i in need_api], 'is_chart')
+            for i, answer, model in zip(need_api, answers, models):
+                results[i]['details']['answered_by'] = {'is_chart': model}
+                if answer is None:
+                    results[i]['ok'] = False
+                    results[i]['messages'].append("图片类型判断失败")
+                elif answer.get('skipped'):
+                    results[i]['skipped'] = True
+                    results[i]['messages'].append(f"⏭ 图片内容检测已跳过：{answer['reason']}")
+                else:
+                    is_chart_results[i] = answer
+        
+        charts = []
+        for i in active:
+            if i not in is_chart_results:
+                continue
+            is_chart_result = is_chart_results[i]
+            results[i]['details']['is_chart_check'] = is_chart_result
+            
+            if not is_chart_result.get('is_chart', False):
+                # 不是图表，跳过后续检测
+                results[i]['is_chart'] = False
+                results[i]['messages'].append(f"图片类型: {is_chart_result.get('chart_type', '非图表')}")
+            else:
+                results[i]['is_chart'] = True
+                results[i]['details']['check_results'] = {}
+                charts.append(i)
+                print(f"    图表类型: {is_chart_result.get('chart_type', '图表')}")
+        
+        # 非图表与类型判断失败的图片到此完成
+        chart_set = set(charts)
+        for i in active:
+            if i not in chart_set:
+                finish(i)
+        
+        # 3. 逐项检测（针对图表）
+        for idx, (check_key, check_name) in enumerate(FIGURE_CHECK_ORDER, start=2):
+            if not charts:
+                break
+            print(f"    [{idx}/6] 检查{check_name}（{len(charts)} 张）...")
+            
+            answers, models = self.ask_vision_cascade([images[i] for i in charts], check_key)
+            for i, parsed_result, model in zip(charts, answers, models):
+                result = results[i]
+                result['details'].setdefault('answered_by', {})[check_key] = model
+                check_results = result['details']['check_results']
+                if parsed_result is None:
+                    check_results[check_key] = {'ok': False, 'error': 'API调用失败'}
+                    continue
+                
+                if parsed_result.get('skipped'):
+                    check_results[check_key] = parsed_result
+                    if not result.get('skipped'):
+                        result['skipped'] = True
+                        result['messages'].append(f"⏭ 部分检查已跳过：{parsed_result['reason']}")
+                    continue
+                
+                check_results[check_key] = parsed_result
+                
+                # 收集问题
+                if not parsed_result.get('ok', True):
+                    result['ok'] = False
+                    
+                    # 根据不同的结果格式提取问题描述
+                    if 'issues' in parsed_result:
+                        for issue in parsed_result['issues']:
+                            result['messages'].append(f"❌ [{check_name}] {issue}")
+                    elif 'description' in parsed_result:
+                        result['messages'].append(f"❌ [{check_name}] {parsed_result['description']}")
         
-        return result
+        # 4. 图表的全部检查项完成
+        for i in charts:
+            finish(i)
+        
+        if self.store:
+            self.store.flush()
+        
+        return results
+    
+    def _analysis_signature(self) -> str:
+        """分析签名：模型、提示词、预分类与级联设置不变时，按内容缓存的分析结果才可复用"""
+        material = json.dumps({
+            'model': self.model,
+            'cascade_model': self.cascade_model,
+            'cascade_min_confidence': self.cascade_min_confidence,
+            'preclassify_enabled': self.preclassify_enabled,
+            'preclassify_thresholds': self.preclassify_thresholds,
+            'prompts': self.detection_prompts
+        }, ensure_ascii=False, sort_keys=True)
+        return content_hash(material.encode('utf-8'))
+    
+    def _analysis_complete(self, result: Dict) -> bool:
+        """判断分析是否完整（没有API失败的检查项），不完整的结果不缓存"""
+        if 'is_chart_check' not in result['details']:
+            return False
+        checks = result['details'].get('check_results', {})
+        if result['is_chart'] and len(checks) < len(FIGURE_CHECK_ORDER):
+            return False
+        return not any('error' in check or check.get('skipped') for check in checks.values())
 
 
 def detect_figure_content_with_api(doc_path: str, figure_paragraph, api_key: str, 
@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 
 import os
+import io
+import copy
 import sys
 import json
 import re
@@ -18,6 +20,16 @@ from docx.shared import Pt
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 from docx.oxml.ns import qn
 
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    from paper_detect.media_index import build_media_index
+except ImportError:
+    from media_index import build_media_index
+
 # 全局检测配置（由 run_all_detections 在导入时注入）
 GLOBAL_DETECTION_CONFIG = {'skip_checks': set()}
 
@@ -295,6 +307,93 @@ def has_picture_object(paragraph):
     
     return False
 
+EMU_PER_INCH = 914400
+CM_PER_INCH = 2.54
+
+def get_image_metadata(paragraph, media_entry=None):
+    """
+    只读取图片文件头获取像素尺寸、DPI和颜色模式（不解码像素），
+    并结合 wp:extent 的显示尺寸计算实际打印分辨率（有效DPI）
+    
+    media_entry 为媒体索引中的条目（提供时直接使用其关系ID与显示尺寸）
+    返回：元数据字典；段落中没有可识别的图片时返回None
+    """
+    if Image is None:
+        return None
+    
+    para_xml = paragraph._element
+    if media_entry is not None:
+        embed_id = media_entry.rel_id
+    else:
+        blips = para_xml.xpath('.//a:blip')
+        if not blips:
+            return None
+        embed_id = blips[0].get(qn('r:embed')) or blips[0].get(qn('r:link'))
+    if not embed_id or embed_id not in paragraph.part.related_parts:
+        return None
+    
+    try:
+        image_part = paragraph.part.related_parts[embed_id]
+        # Image.open 只解析文件头，不会解码像素数据
+        with Image.open(io.BytesIO(image_part.blob)) as img:
+            width_px, height_px = img.size
+            header_dpi = img.info.get('dpi')
+            metadata = {
+                'width_px': width_px,
+                'height_px': height_px,
+                'header_dpi': tuple(round(float(v), 1) for v in header_dpi) if header_dpi else None,
+                'mode': img.mode,
+                'format': img.format,
+                'extent_cm': None,
+                'effective_dpi': None
+            }
+    except Exception:
+        return None
+    
+    if media_entry is not None:
+        cx, cy = media_entry.extent or (0, 0)
+    else:
+        extents = para_xml.xpath('.//wp:extent')
+        cx = int(extents[0].get('cx', 0) or 0) if extents else 0
+        cy = int(extents[0].get('cy', 0) or 0) if extents else 0
+    if cx > 0 and cy > 0:
+        metadata['extent_cm'] = (round(cx / EMU_PER_INCH * CM_PER_INCH, 2),
+                                 round(cy / EMU_PER_INCH * CM_PER_INCH, 2))
+        # 横纵两个方向取较小值（图片被拉伸时以较差的方向为准）
+        metadata['effective_dpi'] = round(min(width_px * EMU_PER_INCH / cx,
+                                              height_px * EMU_PER_INCH / cy), 1)
+    
+    return metadata
+
+def check_image_resolution(metadata, tpl):
+    """
+    根据模板检查图片的有效打印分辨率
+    返回：{'ok': bool, 'messages': [], 'metadata': {...}}
+    """
+    report = {'ok': True, 'messages': [], 'metadata': metadata}
+    quality_rules = tpl.get('format_rules', {}).get('image_quality', {})
+    min_dpi = quality_rules.get('min_effective_dpi', 300)
+    
+    if not metadata or metadata['effective_dpi'] is None:
+        return report
+    
+    if metadata['effective_dpi'] < min_dpi:
+        report['ok'] = False
+        msg_template = tpl.get('messages', {}).get(
+            'image_resolution_error',
+            '图片分辨率过低：有效分辨率 {dpi} DPI，应不低于 {min_dpi} DPI（{width}×{height} 像素，显示尺寸 {w_cm}×{h_cm} cm）'
+        )
+        report['messages'].append(msg_template.format(
+            dpi=int(metadata['effective_dpi']),
+            min_dpi=min_dpi,
+            width=metadata['width_px'],
+            height=metadata['height_px'],
+            w_cm=metadata['extent_cm'][0],
+            h_cm=metadata['extent_cm'][1]
+        ))
+    
+    return report
+
 def find_picture_captions(doc, tpl):
     """
     识别文档中的图片标题
@@ -330,11 +429,12 @@ def find_picture_before_caption(doc, caption_info):
     max_distance = 2  # 最多向上查找2个段落
     
     # 在标题前的几个段落中查找图片
+    paragraphs = doc.paragraphs
     for i in range(caption_idx - 1, max(0, caption_idx - max_distance - 1), -1):
-        if i < 0 or i >= len(doc.paragraphs):
+        if i < 0 or i >= len(paragraphs):
             continue
         
-        paragraph = doc.paragraphs[i]
+        paragraph = paragraphs[i]
         if has_picture_object(paragraph):
             return paragraph
     
@@ -464,7 +564,33 @@ def check_figure_numbering(captions, tpl):
     
     return report
 
-def check_doc_with_template(doc_path, template_identifier, enable_content_check=True, api_key=None):
+def build_caption_list(report):
+    """兼容处理：由按图片组织的报告生成旧格式的captions列表"""
+    return [{
+        'number': fig_report['caption_info']['number'],
+        'title': fig_report['caption_info']['title'],
+        'full_text': fig_report['caption_info']['full_text'],
+        'format_check': fig_report['format_check'],
+        'position_check': fig_report.get('position_check', {'ok': True, 'messages': []}),
+        'content_check': fig_report.get('content_check')
+    } for fig_report in report['figures'] if fig_report['has_caption']]
+
+def _partial_report(report):
+    """
+    复制本地检查已完成的报告，供截止时间到达时输出部分结果
+    
+    复制的是报告中会被后续内容检测修改的部分（各图片报告、overall、summary），
+    后台线程之后写入的内容检测结果不会影响该副本。
+    """
+    partial = dict(report)
+    partial['overall'] = {'ok': report['overall']['ok'], 'messages': list(report['overall']['messages'])}
+    partial['figures'] = [dict(fig_report) for fig_report in report['figures']]
+    partial['summary'] = dict(report['summary'])
+    partial['captions'] = build_caption_list(partial)
+    return partial
+
+def check_doc_with_template(doc_path, template_identifier, enable_content_check=True, api_key=None,
+                            api_options=None, progress=None):
     """
     使用指定的模板检测文档中的图片格式
     
@@ -473,6 +599,11 @@ def check_doc_with_template(doc_path, template_identifier, enable_content_check=
         template_identifier: 模板标识符（文件路径或模板名称）
         enable_content_check: 是否启用图片内容智能检测（需要API密钥）
         api_key: 硅基流动API密钥（启用内容检测时需要）
+        api_options: 传给 FigureContentDetector 的其他参数（可选，未提供时使用
+                     GLOBAL_DETECTION_CONFIG['figure_api_options']）
+        progress: 共享的进度字典 {'lock', 'report'}（可选，供截止时间到达时输出部分结果）：
+                  本地检查完成后写入 progress['report']（报告副本），之后每张图片的内容检测
+                  完成时在持有 progress['lock'] 的情况下把结果写入该副本
     
     返回:
         检测报告字典
@@ -495,13 +626,16 @@ def check_doc_with_template(doc_path, template_identifier, enable_content_check=
                 from .Figure_content_detect import FigureContentDetector
             
             # 初始化检测器（会自动从配置文件读取，或使用传入的api_key）
-            content_detector = FigureContentDetector(api_key=api_key)
+            # 未单独传入时使用 run_all_detections 注入的 figure_api_options（如 cassette 录制/回放设置）
+            if api_options is None:
+                api_options = GLOBAL_DETECTION_CONFIG.get('figure_api_options', {})
+            content_detector = FigureContentDetector(api_key=api_key, **api_options)
             print(f"✓ 图片内容智能检测已启用")
             if content_detector.save_images:
                 print(f"  图片将保存到: {content_detector.image_dir}/ 目录")
             else:
                 print(f"  使用临时文件（分析后自动删除）")
-        except ValueError as e:
+        except (ValueError, FileNotFoundError) as e:
             print(f"警告: {e}")
             print("  将跳过内容检测")
         except ImportError as e:
@@ -516,14 +650,11 @@ def check_doc_with_template(doc_path, template_identifier, enable_content_check=
         'summary': {}
     }
     
-    # 1. 找出所有包含图片的段落（按文档顺序）
-    picture_paragraphs = []
-    for idx, paragraph in enumerate(doc.paragraphs):
-        if has_picture_object(paragraph):
-            picture_paragraphs.append({
-                'paragraph': paragraph,
-                'paragraph_index': idx
-            })
+    # 1. 遍历一次正文建立媒体索引：图片段落、关系ID、显示尺寸及下方的标题（按文档顺序）
+    caption_pattern = tpl.get('figure_detection_rules', {}).get('caption_pattern', r'^\s*Fig\.\s+(\d+)\s+(.+)$')
+    paragraphs = doc.paragraphs
+    media_index = build_media_index(doc, caption_pattern, paragraphs=paragraphs)
+    picture_paragraphs = media_index.picture_paragraphs()
     
     if not picture_paragraphs:
         report['overall']['ok'] = False
@@ -534,12 +665,12 @@ def check_doc_with_template(doc_path, template_identifier, enable_content_check=
     report['summary']['figure_count'] = len(picture_paragraphs)
     
     # 2. 对每张图片进行检查
-    caption_pattern = tpl.get('figure_detection_rules', {}).get('caption_pattern', r'^\s*Fig\.\s+(\d+)\s+(.+)$')
     figure_numbers = []
+    pending_content = []
     
-    for fig_idx, pic_info in enumerate(picture_paragraphs, start=1):
-        picture_para = pic_info['paragraph']
-        pic_index = pic_info['paragraph_index']
+    for fig_idx, media_entry in enumerate(picture_paragraphs, start=1):
+        picture_para = media_entry.paragraph
+        pic_index = media_entry.paragraph_index
         
         figure_report = {
             'figure_index': fig_idx,
@@ -548,25 +679,24 @@ def check_doc_with_template(doc_path, template_identifier, enable_content_check=
             'caption_info': None,
             'format_check': {'ok': True, 'messages': []},
             'position_check': {'ok': True, 'messages': []},
-            'picture_check': {'ok': True, 'messages': []}
+            'picture_check': {'ok': True, 'messages': []},
+            'resolution_check': {'ok': True, 'messages': []}
         }
         
-        # 2.1 检查是否有标题（向下查找）
+        # 2.1 检查是否有标题（媒体索引中已向下查找）
         caption_found = None
-        for i in range(pic_index + 1, min(pic_index + 3, len(doc.paragraphs))):
-            caption_para = doc.paragraphs[i]
-            match = re.match(caption_pattern, caption_para.text.strip(), re.IGNORECASE)
-            if match:
-                figure_num = int(match.group(1))
-                figure_title = match.group(2).strip()
-                caption_found = {
-                    'paragraph': caption_para,
-                    'number': figure_num,
-                    'title': figure_title,
-                    'full_text': caption_para.text.strip()
-                }
-                figure_numbers.append(figure_num)
-                break
+        if media_entry.caption_index is not None:
+            caption_para = paragraphs[media_entry.caption_index]
+            match = media_entry.caption_match
+            figure_num = int(match.group(1))
+            figure_title = match.group(2).strip()
+            caption_found = {
+                'paragraph': caption_para,
+                'number': figure_num,
+                'title': figure_title,
+                'full_text': caption_para.text.strip()
+            }
+            figure_numbers.append(figure_num)
         
         if caption_found:
             figure_report['has_caption'] = True
@@ -596,23 +726,21 @@ def check_doc_with_template(doc_path, template_identifier, enable_content_check=
                 )
                 report['overall']['ok'] = False
         
-        # 2.4 检查图片内容（如果启用）- 不管有没有标题都检查
+        # 2.4 检查图片分辨率（只读文件头，不调用API）
+        if tpl.get('check_rules', {}).get('image_resolution_check', True):
+            resolution_result = check_image_resolution(get_image_metadata(picture_para, media_entry), tpl)
+            figure_report['resolution_check'] = resolution_result
+            if not resolution_result['ok']:
+                report['overall']['ok'] = False
+        
+        # 2.5 记录待检测内容的图片（如果启用）- 不管有没有标题都检查
         if content_detector:
-            print(f"  正在检测第 {fig_idx} 张图片的内容规范性...")
             fig_num = caption_found['number'] if caption_found else fig_idx
-            content_result = content_detector.detect_figure_content(
-                picture_para, 
-                doc_path, 
-                figure_number=fig_num
-            )
-            figure_report['content_check'] = content_result
-            
-            if not content_result['ok']:
-                report['overall']['ok'] = False
+            pending_content.append((figure_report, picture_para, fig_num, media_entry.rel_id))
         
         report['figures'].append(figure_report)
     
-    # 3. 检查编号连续性（只对有标题的图片）
+    # 2.6 检查编号连续性（只对有标题的图片）
     if figure_numbers:
         numbers_sorted = sorted(figure_numbers)
         expected_start = tpl.get('check_rules', {}).get('numbering_start', 1)
@@ -632,18 +760,67 @@ def check_doc_with_template(doc_path, template_identifier, enable_content_check=
             )
             report['overall']['ok'] = False
     
+    # 本地检查到此完成：保存部分结果，截止时间到达时只有未完成的内容检测标记为待定
+    if progress is not None:
+        partial = _partial_report(report)
+        with progress['lock']:
+            progress['report'] = partial
+    
+    def on_content_result(index, content_result):
+        """某张图片的内容检测完成：写入部分结果（截止时间到达、部分结果已被取走后不再写入）"""
+        if progress is None:
+            return
+        with progress['lock']:
+            partial = progress.get('report')
+            if partial is None:
+                return
+            fig_report = partial['figures'][pending_content[index][0]['figure_index'] - 1]
+            fig_report['content_check'] = copy.deepcopy(content_result)
+            if not content_result['ok']:
+                partial['overall']['ok'] = False
+            partial['captions'] = build_caption_list(partial)
+    
+    # 3. 统一检测图片内容（同一文档的图片可按 batch_size 打包请求）
+    if pending_content:
+        print(f"  正在检测 {len(pending_content)} 张图片的内容规范性（每批最多 {content_detector.batch_size} 张）...")
+        content_results = content_detector.detect_figures_content(
+            [(picture_para, fig_num, rel_id) for _, picture_para, fig_num, rel_id in pending_content],
+            doc_path,
+            on_result=on_content_result
+        )
+        for (figure_report, _, _, _), content_result in zip(pending_content, content_results):
+            figure_report['content_check'] = content_result
+            
+            if not content_result['ok']:
+                report['overall']['ok'] = False
+    
+    # 记录API用量（tokens、图片字节数、耗时、重试、预算）
+    if content_detector:
+        report['summary']['api_usage'] = content_detector.usage_summary()
+        if content_detector.budget_exhausted_reason:
+            report['overall']['messages'].append(
+                f"API预算已用尽（{content_detector.budget_exhausted_reason}），"
+                f"{content_detector.skipped_checks} 项图片检查已跳过"
+            )
+    
+    # 记录API录制/回放统计（含模型调用累计耗时）
+    if content_detector and content_detector.cassette:
+        report['summary']['api_cassette'] = content_detector.cassette.summary()
+    
+    # 记录本地预分类统计（节省的API调用次数）
+    if content_detector and content_detector.preclassify_enabled:
+        report['summary']['preclassify'] = dict(content_detector.preclassify_stats)
+    
+    # 记录模型级联统计（小模型直接给出结论 / 升级到大模型的检查次数）
+    if content_detector and content_detector.cascade_model:
+        report['summary']['cascade'] = {
+            'small_model': content_detector.cascade_model,
+            'large_model': content_detector.model,
+            **content_detector.cascade_stats
+        }
+    
     # 兼容处理：生成旧格式的captions列表
-    report['captions'] = []
-    for fig_report in report['figures']:
-        if fig_report['has_caption']:
-            report['captions'].append({
-                'number': fig_report['caption_info']['number'],
-                'title': fig_report['caption_info']['title'],
-                'full_text': fig_report['caption_info']['full_text'],
-                'format_check': fig_report['format_check'],
-                'position_check': fig_report.get('position_check', {'ok': True, 'messages': []}),
-                'content_check': fig_report.get('content_check')
-            })
+    report['captions'] = build_caption_list(report)
     
     return report
 
@@ -714,7 +891,14 @@ def print_report(report, tpl):
                 if fig_report['has_caption']:  # 只有有标题的才显示图片OK
                     all_issues.append("✓ 图片位置正确")
             
-            # 3. 内容检查（如果有）
+            # 3. 分辨率问题
+            resolution_check = fig_report.get('resolution_check', {})
+            if not resolution_check.get('ok', True):
+                all_issues.append("分辨率问题：")
+                for msg in resolution_check['messages']:
+                    all_issues.append(f"  - {msg}")
+            
+            # 4. 内容检查（如果有）
             if 'content_check' in fig_report:
                 content_check = fig_report['content_check']
                 if content_check.get('is_chart', False):
@@ -11,6 +11,13 @@ from docx.shared import Pt
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 from docx.oxml.ns import qn
 
+try:
+    from paper_detect.math_index import build_math_index
+    from paper_detect.omml_linear import omml_to_linear
+except ImportError:
+    from math_index import build_math_index
+    from omml_linear import omml_to_linear
+
 # 全局检测配置（由 run_all_detections 在导入时注入）
 GLOBAL_DETECTION_CONFIG = {'skip_checks': set()}
 
@@ -145,76 +152,94 @@ def get_font_size(pt_size, tpl=None):
 
 # ---------- 公式检测核心函数 ----------
 
-def identify_formula_paragraphs(doc):
+FORMULA_STYLE_KEYWORDS = ['formula', 'equation', '公式', 'math']
+
+
+def _formula_tabs(tab_elements):
+    """
+    从 w:tab 元素中提取公式样式的制表位
+
+    返回:
+        (居中制表位字符位置列表, 右对齐制表位字符位置列表)
+    """
+    center_tabs = []
+    right_tabs = []
+    for tab in tab_elements:
+        pos = tab.get(qn('w:pos'))
+        val = tab.get(qn('w:val'))
+        if pos and val:
+            pos_twips = int(pos)
+            pos_chars = round(pos_twips / 210.0)  # 1字符 ≈ 210 twips (根据实际测试修正)
+            
+            if val == 'center' and 10 <= pos_chars <= 50:
+                center_tabs.append(pos_chars)
+            elif val == 'right' and 20 <= pos_chars <= 100:
+                right_tabs.append(pos_chars)
+    return center_tabs, right_tabs
+
+
+def _style_formula_info(paragraph, style_cache):
+    """
+    段落样式的公式特征（按样式ID缓存，每种样式只解析一次）
+
+    返回:
+        {'center_tabs': [...], 'right_tabs': [...], 'has_formula_style': bool}
+    """
+    style_id = paragraph._p.style
+    info = style_cache.get(style_id)
+    if info is None:
+        info = {'center_tabs': [], 'right_tabs': [], 'has_formula_style': False}
+        try:
+            style = paragraph.style
+            if style is not None and hasattr(style, '_element'):
+                info['center_tabs'], info['right_tabs'] = _formula_tabs(style._element.xpath('.//w:tabs/w:tab'))
+            style_name = style.name.lower() if style is not None and style.name else ""
+            info['has_formula_style'] = any(keyword in style_name for keyword in FORMULA_STYLE_KEYWORDS)
+        except Exception:
+            pass
+        style_cache[style_id] = info
+    return info
+
+
+def identify_formula_paragraphs(doc, paragraphs=None, math_index=None):
     """
     识别真正的Word公式段落
     优先检测Office Math对象和制表位设置，减少误识别
+    paragraphs / math_index: 已物化的段落列表与公式索引（可选，不提供时自动构建）
+    返回的每一项带 'paragraph_index'（在 paragraphs 中的位置）
     """
     formula_paragraphs = []
+    paragraphs = paragraphs if paragraphs is not None else doc.paragraphs
+    math_index = math_index if math_index is not None else build_math_index(doc, paragraphs)
+    style_cache = {}
     
-    for paragraph in doc.paragraphs:
+    for para_idx, paragraph in enumerate(paragraphs):
         # 跳过空段落
-        if not paragraph.text.strip():
+        text = paragraph.text.strip()
+        if not text:
             continue
             
-        # 1. 优先检查是否包含Office Math对象（最可靠的指标）
-        has_math_object = False
-        math_object_count = 0
-        try:
-            para_xml = paragraph._element
-            # 检查多个可能的数学对象命名空间
-            math_elements = (
-                para_xml.xpath('.//w:oMath') + 
-                para_xml.xpath('.//m:oMath') +
-                para_xml.xpath('.//oMath') +
-                para_xml.xpath('.//w:r/w:object[contains(@w:progId, "Equation")]') +  # 公式对象
-                para_xml.xpath('.//w:r/w:object[contains(@w:progId, "MathType")]')    # MathType对象
-            )
-            if math_elements:
-                has_math_object = True
-                math_object_count = len(math_elements)
-        except Exception:
-            pass
+        # 1. 优先检查是否包含Office Math对象（最可靠的指标，来自公式索引）
+        math_elements = math_index.equation_objects(para_idx)
+        has_math_object = bool(math_elements)
+        math_object_count = len(math_elements)
         
         # 2. 检查是否包含公式样式的制表位设置
         has_formula_tab_stops = False
         center_tabs = []
         right_tabs = []
+        style_info = None
         
         try:
             # 首先检查段落格式中的制表位
-            if hasattr(paragraph.paragraph_format, '_element'):
-                pPr = paragraph.paragraph_format._element
-                tabs_elements = pPr.xpath('.//w:tabs/w:tab')
-                
-                for tab in tabs_elements:
-                    pos = tab.get(qn('w:pos'))
-                    val = tab.get(qn('w:val'))
-                    if pos and val:
-                        pos_twips = int(pos)
-                        pos_chars = round(pos_twips / 210.0)  # 1字符 ≈ 210 twips (根据实际测试修正)
-                        
-                        if val == 'center' and 10 <= pos_chars <= 50:
-                            center_tabs.append(pos_chars)
-                        elif val == 'right' and 20 <= pos_chars <= 100:
-                            right_tabs.append(pos_chars)
+            pPr = paragraph._p.pPr
+            if pPr is not None and pPr.find(qn('w:tabs')) is not None:
+                center_tabs, right_tabs = _formula_tabs(pPr.xpath('./w:tabs/w:tab'))
             
             # 如果段落格式中没有找到制表位，检查样式中的制表位
-            if not center_tabs and not right_tabs and paragraph.style and hasattr(paragraph.style, '_element'):
-                style_elem = paragraph.style._element
-                style_tabs = style_elem.xpath('.//w:tabs/w:tab')
-                
-                for tab in style_tabs:
-                    pos = tab.get(qn('w:pos'))
-                    val = tab.get(qn('w:val'))
-                    if pos and val:
-                        pos_twips = int(pos)
-                        pos_chars = round(pos_twips / 210.0)  # 1字符 ≈ 210 twips (根据实际测试修正)
-                        
-                        if val == 'center' and 10 <= pos_chars <= 50:
-                            center_tabs.append(pos_chars)
-                        elif val == 'right' and 20 <= pos_chars <= 100:
-                            right_tabs.append(pos_chars)
+            if not center_tabs and not right_tabs:
+                style_info = _style_formula_info(paragraph, style_cache)
+                center_tabs, right_tabs = style_info['center_tabs'], style_info['right_tabs']
             
             # 如果同时有居中和右对齐制表位，很可能是公式样式
             if center_tabs and right_tabs:
@@ -223,18 +248,10 @@ def identify_formula_paragraphs(doc):
         except Exception:
             pass
         
-        # 3. 获取段落文本（用于后续处理）
-        text = paragraph.text.strip()
-        
-        # 4. 检查段落样式名称（如果应用了公式样式）
-        has_formula_style = False
-        try:
-            style_name = paragraph.style.name.lower() if paragraph.style and paragraph.style.name else ""
-            formula_style_keywords = ['formula', 'equation', '公式', 'math']
-            if any(keyword in style_name for keyword in formula_style_keywords):
-                has_formula_style = True
-        except Exception:
-            pass
+        # 3. 检查段落样式名称（如果应用了公式样式）
+        if style_info is None:
+            style_info = _style_formula_info(paragraph, style_cache)
+        has_formula_style = style_info['has_formula_style']
         
         # 4. 决策逻辑：只识别真正的公式
         is_formula_paragraph = False
@@ -256,6 +273,7 @@ def identify_formula_paragraphs(doc):
         if is_formula_paragraph:
             formula_paragraphs.append({
                 'paragraph': paragraph,
+                'paragraph_index': para_idx,
                 'has_math_object': has_math_object,
                 'math_object_count': math_object_count,
                 'has_formula_tab_stops': has_formula_tab_stops,
@@ -359,9 +377,10 @@ def check_tab_stops(paragraph, expected_tabs):
         issues.append(f"制表位检测异常: {str(e)}")
         return False, issues, detected_tabs
 
-def detect_math_objects(paragraph):
+def detect_math_objects(paragraph, math_elements=None):
     """
     在段落中检测Office Math对象
+    math_elements: 公式索引中该段落的公式元素（MathIndex.math_elements），不提供时扫描段落XML
     返回 (has_math, math_objects, math_info)
     """
     math_objects = []
@@ -372,31 +391,17 @@ def detect_math_objects(paragraph):
     }
     
     try:
-        para_xml = paragraph._element
-        
-        # 搜索多种可能的数学对象命名空间
-        math_elements = []
-        
-        # 常见的数学对象XML路径
-        math_paths = [
-            './/w:oMath',      # Word 2007+标准路径
-            './/m:oMath',      # 数学命名空间
-            './/oMath',        # 简化路径
-            './/w:r/w:object', # 嵌入对象
-            './/w:r[.//w:oMath]' # 包含数学对象的run
-        ]
-        
-        for path in math_paths:
-            try:
-                elements = para_xml.xpath(path)
-                math_elements.extend(elements)
-            except Exception:
-                continue
+        if math_elements is None:
+            # Office Math 对象（m:oMath）与 run 中的嵌入对象（w:object）
+            para_xml = paragraph._element
+            math_elements = para_xml.xpath('.//m:oMath') + para_xml.xpath('.//w:r/w:object')
         
-        # 去重
+        # 去重（按元素身份，保持顺序）
+        seen = set()
         unique_elements = []
         for elem in math_elements:
-            if elem not in unique_elements:
+            if id(elem) not in seen:
+                seen.add(id(elem))
                 unique_elements.append(elem)
         
         math_info['count'] = len(unique_elements)
@@ -408,11 +413,15 @@ def detect_math_objects(paragraph):
                     'element': math_elem,
                     'tag': math_elem.tag,
                     'text_content': '',
-                    'type': 'unknown'
+                    'type': 'unknown',
+                    'linear': None
                 }
                 
-                # 尝试提取文本内容
-                if hasattr(math_elem, 'text') and math_elem.text:
+                # 尝试提取文本内容（Office Math 转换为保留结构的线性文本，结果按公式缓存）
+                if math_elem.tag.endswith('}oMath') or math_elem.tag.endswith('}oMathPara'):
+                    math_obj['linear'] = omml_to_linear(math_elem)
+                    math_obj['text_content'] = math_obj['linear'].text
+                elif hasattr(math_elem, 'text') and math_elem.text:
                     math_obj['text_content'] = math_elem.text.strip()
                 else:
                     # 递归提取所有文本节点
@@ -547,15 +556,34 @@ def check_formula_fonts(paragraph, math_objects, template):
             has_cambria_math_in_math = False
             try:
                 for math_obj in math_objects:
-                    math_elem = math_obj['element']
-                    # 简单检查：如果XML中包含Cambria Math，就认为有
-                    math_xml = ET.tostring(math_elem, encoding='unicode')
-                    if 'cambria math' in math_xml.lower():
+                    linear = math_obj.get('linear')
+                    if linear is not None:
+                        # 线性化时已收集公式内的字体
+                        found = any('cambria math' in font.lower() for font in linear.fonts)
+                    else:
+                        # 嵌入对象：如果XML中包含Cambria Math，就认为有
+                        math_xml = ET.tostring(math_obj['element'], encoding='unicode')
+                        found = 'cambria math' in math_xml.lower()
+                    if found:
                         has_cambria_math_in_math = True
                         break
             except Exception:
                 pass
             
+            # 可选：公式中的单字母变量应为斜体（m:sty="p" 设为正体的单个拉丁字母）
+            if font_requirements.get('math_variable_italic', False):
+                upright_variables = []
+                for math_obj in math_objects:
+                    linear = math_obj.get('linear')
+                    if linear is None:
+                        continue
+                    for math_run in linear.runs:
+                        if math_run.is_upright and re.fullmatch(r'[A-Za-z]', math_run.text) \
+                                and math_run.text not in upright_variables:
+                            upright_variables.append(math_run.text)
+                if upright_variables:
+                    issues.append(f"公式变量应为斜体，以下变量为正体：{', '.join(upright_variables[:10])}")
+            
             # 如果在常规run或Math对象中都没有找到Cambria Math，才报错
             if not has_cambria_math_in_runs and not has_cambria_math_in_math:
                 issues.append("检测到Office Math对象但未找到Cambria Math字体")
@@ -591,9 +619,10 @@ def check_formula_fonts(paragraph, math_objects, template):
         issues.append(f"字体检测异常: {str(e)}")
         return False, issues, font_info
 
-def validate_formula_format(paragraph, template):
+def validate_formula_format(paragraph, template, math_elements=None):
     """
     综合验证公式格式，整合所有检测结果
+    math_elements: 公式索引中该段落的公式元素（可选）
     返回 {'ok': bool, 'messages': [], 'details': {}}
     """
     report = {'ok': True, 'messages': [], 'details': {}}
@@ -615,7 +644,7 @@ def validate_formula_format(paragraph, template):
             report['messages'].extend([f"制表位问题: {issue}" for issue in tab_issues])
         
         # 2. 检测数学对象
-        has_math, math_objects, math_info = detect_math_objects(paragraph)
+        has_math, math_objects, math_info = detect_math_objects(paragraph, math_elements)
         report['details']['math_objects'] = {
             'has_math': has_math,
             'count': math_info['count'],
@@ -680,15 +709,17 @@ def check_doc_with_template(doc_path, template_identifier):
         # 打开文档
         doc = Document(doc_path)
         
-        # 识别公式段落
-        formula_paragraphs = identify_formula_paragraphs(doc)
+        # 一次遍历建立公式索引，识别公式段落
+        paragraphs = doc.paragraphs
+        math_index = build_math_index(doc, paragraphs)
+        formula_paragraphs = identify_formula_paragraphs(doc, paragraphs, math_index)
         
         # 初始化报告
         report = {
             'formula_detection': {'ok': True, 'messages': []},
             'summary': [],
             'details': {
-                'total_paragraphs': len(doc.paragraphs),
+                'total_paragraphs': len(paragraphs),
                 'formula_paragraphs_count': len(formula_paragraphs),
                 'formula_paragraphs': []
             }
@@ -705,9 +736,10 @@ def check_doc_with_template(doc_path, template_identifier):
         
         for i, formula_para in enumerate(formula_paragraphs):
             paragraph = formula_para['paragraph']
+            para_idx = formula_para['paragraph_index']
             
             # 验证公式格式
-            para_report = validate_formula_format(paragraph, template)
+            para_report = validate_formula_format(paragraph, template, math_index.math_elements(para_idx))
             
             # 获取更好的文本预览（数学内容在前，编号在后）
             math_content = ""
@@ -716,14 +748,10 @@ def check_doc_with_template(doc_path, template_identifier):
             # 如果段落包含Office Math对象，提取数学内容
             if formula_para['has_math_object']:
                 try:
-                    para_xml = paragraph._element
-                    math_elements = para_xml.xpath('.//m:oMath | .//w:oMath | .//oMath')
-                    
                     math_texts = []
-                    for math_elem in math_elements:
-                        # 提取Math对象中的文本内容
-                        t_elements = math_elem.xpath('.//*[local-name()="t"]')
-                        math_text = ''.join(t.text for t in t_elements if t.text)
+                    for math_elem in math_index.office_math(para_idx):
+                        # Math对象转换为线性文本（与 detect_math_objects 共用缓存）
+                        math_text = omml_to_linear(math_elem).text
                         if math_text:
                             math_texts.append(math_text)
                     
@@ -831,17 +859,17 @@ def check_doc_with_template(doc_path, template_identifier):
         
         # 检查是否有可能的公式但没有使用Word公式功能
         potential_formula_suggestions = []
-        for paragraph in doc.paragraphs:
-            if not paragraph.text.strip():
+        # Paragraph 对象每次从 doc.paragraphs 取出都是新的代理对象，按段落索引判断是否已识别
+        identified_indices = {fp['paragraph_index'] for fp in formula_paragraphs}
+        for para_idx, paragraph in enumerate(paragraphs):
+            text = paragraph.text.strip()
+            if not text:
                 continue
             
             # 跳过已识别的公式段落
-            is_identified_formula = any(fp['paragraph'] == paragraph for fp in formula_paragraphs)
-            if is_identified_formula:
+            if para_idx in identified_indices:
                 continue
             
-            text = paragraph.text.strip()
-            
             # 检测可能是公式的模式
             if len(text) < 200:  # 限制段落长度
                 potential_patterns = [
@@ -857,7 +885,7 @@ def check_doc_with_template(doc_path, template_identifier):
                 if has_math_pattern:
                     potential_formula_suggestions.append({
                         'text': text[:100] + ('...' if len(text) > 100 else ''),
-                        'paragraph_index': doc.paragraphs.index(paragraph) + 1
+                        'paragraph_index': para_idx + 1
                     })
         
         # 添加建议到报告中
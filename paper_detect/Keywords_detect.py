@@ -27,6 +27,11 @@ except ImportError:
     TITLE_DETECT_AVAILABLE = False
     print("警告: 无法导入Title_detect模块，脚注中的作者和标题比对功能将被禁用")
 
+try:
+    from paper_detect.footnote_model import get_footnote_model, FIELD_NAMES
+except ImportError:
+    from footnote_model import get_footnote_model, FIELD_NAMES
+
 """
 === 论文格式检测系统 - Keywords、CLC、脚注检测器 ===
 
@@ -392,27 +397,28 @@ def check_keywords_paragraphs(doc, tpl):
     
     # 方案1：查找包含Keywords:的段落（正确格式）
     keywords_with_colon = []
-    for paragraph in doc.paragraphs:
+    paragraphs = doc.paragraphs
+    for paragraph in paragraphs:
         if paragraph.text and re.search(r'\bKeywords\s*:', paragraph.text, re.IGNORECASE):
             keywords_with_colon.append(paragraph)
     
     # 方案2：查找单独的Keywords段落（错误格式）
     keywords_alone = None
     next_paragraph = None
-    for i, paragraph in enumerate(doc.paragraphs):
+    for i, paragraph in enumerate(paragraphs):
         if paragraph.text and re.match(r'^\s*Keywords\s*$', paragraph.text.strip(), re.IGNORECASE):
             keywords_alone = paragraph
             # 查找下一个非空段落作为关键词内容
-            for j in range(i+1, min(i+3, len(doc.paragraphs))):
-                if doc.paragraphs[j].text and doc.paragraphs[j].text.strip():
-                    next_paragraph = doc.paragraphs[j]
+            for j in range(i+1, min(i+3, len(paragraphs))):
+                if paragraphs[j].text and paragraphs[j].text.strip():
+                    next_paragraph = paragraphs[j]
                     break
             break
     
     # 方案3：宽松匹配（仅在前两种都失败时使用）
     keywords_any = []
     if not keywords_with_colon and not keywords_alone:
-        for paragraph in doc.paragraphs:
+        for paragraph in paragraphs:
             if paragraph.text and re.search(r'\bKeywords\b', paragraph.text, re.IGNORECASE):
                 keywords_any.append(paragraph)
     
@@ -895,7 +901,8 @@ def check_keywords_with_template(doc_path, template_identifier):
     # 查找关键词段落索引（用于CLC检查）
     keywords_text = ""
     keywords_paragraph_index = None
-    paragraphs = [p for p in doc.paragraphs if p.text and p.text.strip()]
+    all_paragraphs = doc.paragraphs
+    paragraphs = [p for p in all_paragraphs if p.text and p.text.strip()]
     
     # 根据找到的段落提取文本
     if paragraphs_report.get('keywords_paragraph'):
@@ -908,16 +915,16 @@ def check_keywords_with_template(doc_path, template_identifier):
     else:
         # 如果没找到段落，尝试多种方式查找
         # 1. 查找单独的Keywords标题
-        for i, paragraph in enumerate(doc.paragraphs):
+        for i, paragraph in enumerate(all_paragraphs):
             if paragraph.text and re.match(r'^\s*Keywords\s*$', paragraph.text.strip(), re.IGNORECASE):
                 keywords_text = paragraph.text.strip()
                 # 如果下一段是内容，也包含它
-                for j in range(i+1, min(i+2, len(doc.paragraphs))):
-                    if doc.paragraphs[j].text and doc.paragraphs[j].text.strip():
-                        keywords_text = "Keywords\n" + doc.paragraphs[j].text.strip()
+                for j in range(i+1, min(i+2, len(all_paragraphs))):
+                    if all_paragraphs[j].text and all_paragraphs[j].text.strip():
+                        keywords_text = "Keywords\n" + all_paragraphs[j].text.strip()
                         # 在paragraphs列表中找索引
                         for k, p in enumerate(paragraphs):
-                            if p.text == doc.paragraphs[j].text:
+                            if p.text == all_paragraphs[j].text:
                                 keywords_paragraph_index = k
                                 break
                         break
@@ -1192,34 +1199,31 @@ def check_footnote_structure(doc, tpl):
     report = {'ok': True, 'messages': [], 'footnote_paragraphs': []}
     
     try:
-        # 访问脚注XML
-        rels = doc.part.rels
-        footnote_rels = [rel for rel in rels if 'footnotes.xml' in rels[rel].target_ref]
+        # 脚注模型（每个文档只解析一次footnotes.xml，并已按模板规则分类）
+        model = get_footnote_model(doc, tpl)
         
-        if not footnote_rels:
+        if not model.found:
             report['ok'] = False
             error_msg = tpl.get('messages', {}).get('footnote_missing')
             if error_msg:
                 report['messages'].append(error_msg)
             return report
         
-        footnote_part = rels[footnote_rels[0]].target_part
-        xml_content = footnote_part.blob.decode('utf-8')
-        
-        # 解析脚注XML
-        import xml.etree.ElementTree as ET
-        root = ET.fromstring(xml_content)
-        ns = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
+        print(f"找到 {model.total} 个脚注")
         
-        footnotes = root.findall('.//w:footnote', ns)
-        print(f"找到 {len(footnotes)} 个脚注")
+        # 论文标题和作者只在需要时提取一次（Correspondence与Citation共用）
+        paper_info = []
+        def get_paper_info():
+            if not paper_info:
+                paper_info.append(extract_paper_title_authors(doc, tpl))
+            return paper_info[0]
         
-        # 获取结构规则
-        structure_rules = tpl.get('structure_rules', {})
-        received_pattern = structure_rules.get('footnote_received_pattern', r'Received date\\s*:')
-        foundation_pattern = structure_rules.get('footnote_foundation_pattern', r'Foundation item\\s*:')
-        correspondence_pattern = structure_rules.get('footnote_correspondence_pattern', r'\\*\\s*Correspondence should be addressed to')
-        citation_pattern = structure_rules.get('footnote_citation_pattern', r'Citation\\s*:')
+        # 字段拼写错误提示（错误写法由脚注模型一次扫描得到）
+        field_names = tpl.get('structure_rules', {}).get('footnote_field_names', FIELD_NAMES)
+        spelling_template = tpl.get('messages', {}).get(
+            'footnote_spelling_error', "❌ 字段拼写错误：正确写法为'{correct}'，当前为'{found}'")
+        def spelling_error(category, written):
+            return spelling_template.format(correct=field_names.get(category, category), found=written)
         
         found_items = {
             'received': False,
@@ -1228,48 +1232,40 @@ def check_footnote_structure(doc, tpl):
             'citation': False
         }
         
-        footnote_content = ""
-        
         # 检查每个脚注的内容
-        for footnote in footnotes:
-            footnote_id = footnote.get('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}id')
-            if footnote_id in ['-1', '0']:  # 跳过分隔符脚注
-                continue
-                
-            # 获取脚注文本
-            text_elements = footnote.findall('.//w:t', ns)
-            footnote_text = ''.join([t.text for t in text_elements if t.text])
-            footnote_content += footnote_text + " "
+        for footnote in model:
+            footnote_text = footnote.text
+            categories = footnote.categories
             
-            print(f"脚注 {footnote_id} 内容: {footnote_text}")
+            print(f"脚注 {footnote.id} 内容: {footnote_text}")
             
             # 检查各个项目
             # 1. 检查Received date（正确拼写）
-            if re.search(received_pattern, footnote_text, re.IGNORECASE):
+            if 'received' in categories:
                 found_items['received'] = True
                 ok_msg = tpl.get('messages', {}).get('footnote_received_ok')
                 if ok_msg:
                     report['messages'].append(ok_msg)
-            # 检查常见错误：Receive date
-            elif re.search(r'Receive\s+date\s*:', footnote_text, re.IGNORECASE):
+            # 检查常见拼写错误（如Receive date）
+            elif 'received' in footnote.misspellings:
                 found_items['received'] = False
                 report['ok'] = False
-                report['messages'].append("❌ 字段拼写错误：正确写法为'Received date'，当前为'Receive date'")
+                report['messages'].append(spelling_error('received', footnote.misspellings['received']))
             
             # 2. 检查Foundation item（正确拼写）
-            if re.search(foundation_pattern, footnote_text, re.IGNORECASE):
+            if 'foundation' in categories:
                 found_items['foundation'] = True
                 ok_msg = tpl.get('messages', {}).get('footnote_foundation_ok')
                 if ok_msg:
                     report['messages'].append(ok_msg)
-            # 检查常见错误：Foundation items
-            elif re.search(r'Foundation\s+items\s*:', footnote_text, re.IGNORECASE):
+            # 检查常见拼写错误（如Foundation items）
+            elif 'foundation' in footnote.misspellings:
                 found_items['foundation'] = False
                 report['ok'] = False
-                report['messages'].append("❌ 字段拼写错误：正确写法为'Foundation item'，当前为'Foundation items'")
+                report['messages'].append(spelling_error('foundation', footnote.misspellings['foundation']))
             
             # 检查Correspondence（正确拼写）
-            if re.search(correspondence_pattern, footnote_text, re.IGNORECASE):
+            if 'correspondence' in categories:
                 found_items['correspondence'] = True
                 
                 # === 新增：检查Correspondence中的作者是否正确 ===
@@ -1280,7 +1276,7 @@ def check_footnote_structure(doc, tpl):
                         
                         if corr_author_name:
                             # 提取论文作者信息
-                            doc_info = extract_paper_title_authors(doc, tpl)
+                            doc_info = get_paper_info()
                             
                             if doc_info and doc_info['authors']:
                                 # 匹配Correspondence作者与论文作者
@@ -1318,13 +1314,13 @@ def check_footnote_structure(doc, tpl):
                 if ok_msg and not any('Correspondence作者' in m for m in report['messages'][-3:]):
                     report['messages'].append(ok_msg)
                     
-            # 检查是否错误拼写为Corresponding
-            elif re.search(r'\*\s*Corresponding\s+', footnote_text, re.IGNORECASE):
+            # 检查常见拼写错误（如Corresponding）
+            elif 'correspondence' in footnote.misspellings:
                 found_items['correspondence'] = False
                 report['ok'] = False
-                report['messages'].append("❌ 字段拼写错误：正确写法为'Correspondence'，当前为'Corresponding'")
+                report['messages'].append(spelling_error('correspondence', footnote.misspellings['correspondence']))
             
-            if re.search(citation_pattern, footnote_text, re.IGNORECASE):
+            if 'citation' in categories:
                 found_items['citation'] = True
                 
                 # 详细检查Citation格式
@@ -1391,7 +1387,7 @@ def check_footnote_structure(doc, tpl):
                 if TITLE_DETECT_AVAILABLE:
                     try:
                         # 提取论文的标题和作者
-                        doc_info = extract_paper_title_authors(doc, tpl)
+                        doc_info = get_paper_info()
                         
                         if doc_info:
                             # 1. 比对作者
@@ -1441,6 +1437,12 @@ def check_footnote_structure(doc, tpl):
                     except Exception as e:
                         # 如果比对失败，记录但不影响主检测
                         print(f"作者/标题比对时出错: {str(e)}")
+            
+            # 检查是否错误拼写了Citation
+            elif 'citation' in footnote.misspellings:
+                found_items['citation'] = False
+                report['ok'] = False
+                report['messages'].append(spelling_error('citation', footnote.misspellings['citation']))
         
         # 检查是否找到所有必需项目
         missing_items = [key for key, value in found_items.items() if not value]
@@ -1468,81 +1470,46 @@ def check_footnote_format(doc, tpl):
     report = {'ok': True, 'messages': []}
     
     try:
-        # 访问脚注XML
-        rels = doc.part.rels
-        footnote_rels = [rel for rel in rels if 'footnotes.xml' in rels[rel].target_ref]
+        # 与结构检查共用脚注模型
+        model = get_footnote_model(doc)
         
-        if not footnote_rels:
+        if not model.found:
             report['ok'] = False
             report['messages'].append("无法访问脚注进行格式检查")
             return report
         
-        footnote_part = rels[footnote_rels[0]].target_part
-        xml_content = footnote_part.blob.decode('utf-8')
-        
-        # 解析脚注XML
-        import xml.etree.ElementTree as ET
-        root = ET.fromstring(xml_content)
-        ns = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
-        
-        footnotes = root.findall('.//w:footnote', ns)
-        
         # 获取格式规则
         format_rules = tpl.get('format_rules', {}).get('footnote', {})
         issues = []
         
-        # 检查实际脚注内容（跳过分隔符）
-        for footnote in footnotes:
-            footnote_id = footnote.get('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}id')
-            if footnote_id in ['-1', '0']:  # 跳过分隔符脚注
-                continue
-            
+        # 检查实际脚注内容（模型中已跳过分隔符）
+        for footnote in model:
             # 检查字体大小
-            sz_elements = footnote.findall('.//w:sz', ns)
-            if sz_elements:
-                for sz in sz_elements:
-                    sz_val = sz.get('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}val')
-                    if sz_val:
-                        actual_size_pt = float(sz_val) / 2.0
-                        expected_size_pt = float(format_rules.get('font_size_pt', 9))
-                        actual_size_name = get_font_size(actual_size_pt, tpl)
-                        expected_size_name = get_font_size(expected_size_pt, tpl)
-                        
-                        print(f"脚注字体大小: {actual_size_name}（{actual_size_pt}pt）(期望: {expected_size_name}（{expected_size_pt}pt）)")
-                        if abs(actual_size_pt - expected_size_pt) > 0.5:
-                            issues.append(f"脚注字体大小应为{expected_size_name}（{expected_size_pt}pt），实际为{actual_size_name}（{actual_size_pt}pt）")
-                        break
+            if footnote.size_pt is not None:
+                actual_size_pt = footnote.size_pt
+                expected_size_pt = float(format_rules.get('font_size_pt', 9))
+                actual_size_name = get_font_size(actual_size_pt, tpl)
+                expected_size_name = get_font_size(expected_size_pt, tpl)
+                
+                print(f"脚注字体大小: {actual_size_name}（{actual_size_pt}pt）(期望: {expected_size_name}（{expected_size_pt}pt）)")
+                if abs(actual_size_pt - expected_size_pt) > 0.5:
+                    issues.append(f"脚注字体大小应为{expected_size_name}（{expected_size_pt}pt），实际为{actual_size_name}（{actual_size_pt}pt）")
             
             # 检查字体名称
-            font_elements = footnote.findall('.//w:rFonts', ns)
-            if font_elements:
-                for font_elem in font_elements:
-                    ascii_font = font_elem.get('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}ascii')
-                    if ascii_font:
-                        expected_font_name = str(format_rules.get('font_name', 'Times New Roman'))
-                        print(f"脚注字体名称: {ascii_font} (期望: {expected_font_name})")
-                        if expected_font_name.lower() not in ascii_font.lower():
-                            issues.append(f"脚注字体应为{expected_font_name}，实际为{ascii_font}")
-                        break
+            if footnote.font_ascii:
+                ascii_font = footnote.font_ascii
+                expected_font_name = str(format_rules.get('font_name', 'Times New Roman'))
+                print(f"脚注字体名称: {ascii_font} (期望: {expected_font_name})")
+                if expected_font_name.lower() not in ascii_font.lower():
+                    issues.append(f"脚注字体应为{expected_font_name}，实际为{ascii_font}")
             
             # 检查是否有斜体（Journal名称应该斜体）
-            text_elements = footnote.findall('.//w:t', ns)
-            footnote_text = ''.join([t.text for t in text_elements if t.text])
-            
-            if 'Journal of Donghua University (English Edition)' in footnote_text:
+            if 'Journal of Donghua University (English Edition)' in footnote.text:
                 # 检查Journal部分是否为斜体
                 journal_italic = format_rules.get('journal_italic', True)
                 if journal_italic:
-                    # 查找包含Journal文本的run，检查是否有斜体标记
-                    journal_found_italic = False
-                    for run in footnote.findall('.//w:r', ns):
-                        run_text_elements = run.findall('.//w:t', ns)
-                        run_text = ''.join([t.text for t in run_text_elements if t.text])
-                        if 'Journal of Donghua University' in run_text:
-                            italic_elements = run.findall('.//w:i', ns)
-                            if italic_elements:
-                                journal_found_italic = True
-                                break
+                    # 包含Journal文本的run中需有斜体标记
+                    journal_found_italic = any(run.italic for run in footnote.runs_containing('Journal of Donghua University'))
                     
                     if not journal_found_italic:
                         issues.append("Journal of Donghua University (English Edition)应为斜体")
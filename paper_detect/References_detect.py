@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import re
+from docx import Document
+
+# 全局检测配置（由 run_all_detections 在导入时注入）
+GLOBAL_DETECTION_CONFIG = {'skip_checks': set()}
+
+def should_skip_check(check_name):
+    """
+    判断是否应该跳过某个检测项
+    """
+    return check_name in GLOBAL_DETECTION_CONFIG.get('skip_checks', set())
+
+"""
+=== 论文格式检测系统 - 参考文献检测器 ===
+
+【参考文献检测 (References Detection)】
+
+1. 【著录格式检测】
+   - 按 GB/T 7714 拆分每条文献的作者、题名、文献类型标志与出版项
+   - 文献类型标志须为规定的类型（[J]、[M]、[D]、[EB/OL] 等）
+   - 按文献类型检查出版项（期刊：刊名, 年, 卷(期): 起止页码.）
+   - 作者姓全部大写、名缩写为首字母，超过3位作者只列前3位加 et al
+
+2. 【编号检测】
+   - 参考文献从 [1] 开始连续编号，不重复（支持文本编号与 Word 自动编号）
+
+3. 【引用一致性检测】
+   - 正文引用的 [12]、[3-5]、[1, 4] 等必须在参考文献表中存在
+   - 参考文献表中的每条文献都应在正文中被引用
+   - 按正文首次引用顺序编号（顺序编码制）
+
+4. 【技术特性】
+   - 著录规则按模板预编译一次（同一模板的多次检测共用编译结果）
+   - 对正文做一次遍历：参考文献标题之前收集引用标注，之后拆分文献条目
+   - 文献编号与首次引用位置都存入字典，引用核对是 O(1) 查表，总耗时与文档长度成线性关系
+"""
+
+try:
+    from paper_detect.citation_checks import (MAX_RANGE_SPAN, expand_number_list, iter_first_mention_order,
+                                              section_result)
+    from paper_detect.numbering_resolver import get_numbering_resolver
+    from paper_detect.ooxml import W_P
+    from paper_detect.table_grid import paragraph_text
+except ImportError:
+    from citation_checks import MAX_RANGE_SPAN, expand_number_list, iter_first_mention_order, section_result
+    from numbering_resolver import get_numbering_resolver
+    from ooxml import W_P
+    from table_grid import paragraph_text
+
+DEFAULT_HEADING_PATTERN = r'^\s*(?:References|REFERENCES|参考文献)\s*$'
+DEFAULT_LABEL_PATTERN = r'^\s*\[\s*(\d+)\s*\]\s*'
+DEFAULT_CITATION_PATTERN = r'\[(\s*\d+(?:\s*[-–~,，]\s*\d+)*\s*)\]'
+
+# ---------- 模板加载 ----------
+def resolve_template_path(identifier):
+    if os.path.isfile(identifier):
+        return identifier
+    candidate = os.path.join("templates", identifier + ".json")
+    if os.path.isfile(candidate):
+        return candidate
+    raise FileNotFoundError(f"Template not found: '{identifier}' (tried file path and {candidate})")
+
+def load_template(identifier):
+    tpl_path = resolve_template_path(identifier)
+    with open(tpl_path, 'r', encoding='utf-8') as f:
+        tpl = json.load(f)
+    return tpl
+
+# ---------- 著录规则 ----------
+class ReferenceGrammar:
+    """按模板预编译的参考文献著录规则与引用标注正则"""
+
+    def __init__(self, tpl):
+        grammar = tpl.get('grammar', {})
+        self.heading_re = re.compile(tpl.get('heading_pattern', DEFAULT_HEADING_PATTERN), re.IGNORECASE)
+        self.label_re = re.compile(tpl.get('label_pattern', DEFAULT_LABEL_PATTERN))
+        self.citation_re = re.compile(tpl.get('citation_pattern', DEFAULT_CITATION_PATTERN))
+        self.max_range_span = tpl.get('max_range_span', MAX_RANGE_SPAN)
+
+        self.entry_re = re.compile(grammar['entry_pattern']) if grammar.get('entry_pattern') else None
+        self.entry_types = grammar.get('entry_types', {})
+        self.carriers = set(grammar.get('carriers', []))
+        # 出版项正则：类型 -> 完整匹配"出版项. (语种说明)"的正则
+        suffix = grammar.get('suffix_pattern')
+        tail = rf'\s*\.\s*(?:{suffix}\s*)?$' if suffix else r'\s*\.\s*$'
+        self.publication_res = {
+            code: re.compile(rf"^(?:{cfg['publication_pattern']}){tail}")
+            for code, cfg in self.entry_types.items() if cfg.get('publication_pattern')
+        }
+
+        rules = tpl.get('author_rules', {})
+        self.max_authors = rules.get('max_listed', 3)
+        self.et_al_re = re.compile(rules.get('et_al_pattern', r'^(?:et\s+al|等)$'), re.IGNORECASE)
+        self.personal_name_re = re.compile(rules['personal_name_pattern']) if rules.get('personal_name_pattern') else None
+        self.name_re = re.compile(rules['name_pattern']) if rules.get('name_pattern') else None
+
+    def split_label(self, text):
+        """
+        拆分段落开头的文本编号
+
+        返回:
+            (编号, 去掉编号后的文本)；没有编号时编号为None
+        """
+        match = self.label_re.match(text)
+        if match is None:
+            return None, text
+        return int(match.group(1)), text[match.end():]
+
+    def iter_citations(self, text):
+        """
+        在一段文本中查找所有引用标注
+
+        返回:
+            生成 (起始位置, 标注文本, 编号列表)
+        """
+        for match in self.citation_re.finditer(text):
+            numbers = expand_number_list(match.group(1), self.max_range_span)
+            # 含 0 的方括号多为区间（如 [0, 1]），不是文献编号
+            if numbers and 0 not in numbers:
+                yield match.start(), match.group(0), numbers
+
+    def resolve_type(self, code):
+        """
+        文献类型标志对应的类型配置
+
+        参数:
+            code: 类型标志，如 "J"、"EB/OL"
+
+        返回:
+            (类型, 载体)；类型标志不合规时返回 (None, None)
+        """
+        base, _, carrier = code.partition('/')
+        if base not in self.entry_types or (carrier and carrier not in self.carriers):
+            return None, None
+        return base, carrier or None
+
+_GRAMMARS = {}
+
+def get_reference_grammar(tpl):
+    """
+    获取模板对应的预编译著录规则（同一份模板配置只编译一次）
+
+    参数:
+        tpl: 模板字典
+
+    返回:
+        ReferenceGrammar 对象
+    """
+    key = json.dumps({k: tpl.get(k) for k in ('heading_pattern', 'label_pattern', 'citation_pattern',
+                                                'max_range_span', 'grammar', 'author_rules')},
+                     sort_keys=True, ensure_ascii=False)
+    grammar = _GRAMMARS.get(key)
+    if grammar is None:
+        grammar = ReferenceGrammar(tpl)
+        _GRAMMARS[key] = grammar
+    return grammar
+
+# ---------- 参考文献索引 ----------
+class ReferenceEntry:
+    """参考文献表中的一条文献"""
+
+    __slots__ = ('position', 'number', 'paragraph_index', 'text')
+
+    def __init__(self, position, number, paragraph_index, text):
+        self.position = position                # 在参考文献表中的序号（从1开始）
+        self.number = number                    # 编号（文本编号或自动编号），没有编号时为None
+        self.paragraph_index = paragraph_index
+        self.text = text                        # 去掉编号后的著录文本
+
+    @property
+    def display(self):
+        return f'[{self.number}]' if self.number is not None else f'第 {self.position} 条'
+
+class ReferenceIndex:
+    """参考文献条目与正文引用标注的索引"""
+
+    def __init__(self):
+        self.heading_index = None               # 参考文献标题所在段落
+        self.entries = []                       # [ReferenceEntry]，按参考文献表顺序
+        self.by_number = {}                     # 编号 -> ReferenceEntry（首次出现）
+        self.citations = []                     # [(段落索引, 起始位置, 标注文本, 编号列表)]，按文档顺序
+        self.first_citations = {}               # 编号 -> (段落索引, 起始位置)
+        self.citation_counts = {}               # 编号 -> 引用次数
+        self.paragraphs_scanned = 0
+
+    def add_entry(self, entry):
+        self.entries.append(entry)
+        if entry.number is not None:
+            self.by_number.setdefault(entry.number, entry)
+
+    def add_citation(self, paragraph_index, offset, text, numbers):
+        self.citations.append((paragraph_index, offset, text, numbers))
+        counts = self.citation_counts
+        for number in numbers:
+            counts[number] = counts.get(number, 0) + 1
+            self.first_citations.setdefault(number, (paragraph_index, offset))
+
+def build_reference_index(doc, tpl, grammar=None):
+    """
+    对正文做一次遍历，收集引用标注并拆分参考文献条目
+
+    参数:
+        doc: Document对象
+        tpl: 模板配置
+        grammar: 预编译的 ReferenceGrammar（可选）
+
+    返回:
+        ReferenceIndex 对象
+    """
+    grammar = grammar or get_reference_grammar(tpl)
+    numbering = get_numbering_resolver(doc)
+    index = ReferenceIndex()
+
+    for paragraph_index, p in enumerate(doc.element.body.iterchildren(W_P)):
+        text = paragraph_text(p)
+        index.paragraphs_scanned += 1
+
+        if index.heading_index is None:
+            if grammar.heading_re.match(text.strip()):
+                index.heading_index = paragraph_index
+                continue
+            for offset, citation, numbers in grammar.iter_citations(text):
+                index.add_citation(paragraph_index, offset, citation, numbers)
+            continue
+
+        if not text.strip():
+            continue
+        number, body = grammar.split_label(text)
+        if number is None:
+            label = numbering.label_for(p)
+            if label is not None and label.number and label.number.isdigit():
+                number = int(label.number)
+        if number is None:
+            # 文献条目之前的说明文字跳过；条目之后第一个没有编号的段落为参考文献表的结束
+            if index.entries:
+                break
+            continue
+        index.add_entry(ReferenceEntry(len(index.entries) + 1, number, paragraph_index, body.strip()))
+
+    return index
+
+# ---------- 检查 ----------
+def check_entry_format(index, grammar, tpl):
+    """按 GB/T 7714 著录规则检查每条文献"""
+    messages = tpl.get('messages', {})
+    items = []
+
+    def report(entry, key, default, **values):
+        items.append({
+            'message': messages.get(key, default).format(entry=entry.display, **values),
+            'paragraph_index': entry.paragraph_index,
+        })
+
+    for entry in index.entries:
+        match = grammar.entry_re.match(entry.text) if grammar.entry_re is not None else None
+        if match is None:
+            report(entry, 'format_structure_error', '参考文献 {entry} 未识别到“作者. 题名[文献类型标志]. 出版项.”结构')
+            continue
+
+        type_code = match.group('type')
+        base, carrier = grammar.resolve_type(type_code)
+        if base is None:
+            report(entry, 'format_type_error', '参考文献 {entry} 的文献类型标志 [{type}] 不是 GB/T 7714 规定的类型',
+                   type=type_code)
+        elif match.group('separator') is None and match.group('publication'):
+            report(entry, 'format_separator_error', '参考文献 {entry} 的文献类型标志 [{type}] 后缺少“.”',
+                   type=type_code)
+        else:
+            # 带载体的类型（如 [J/OL]）出版项后另有网址，只有配置了完整类型标志时才检查
+            publication_re = grammar.publication_res.get(type_code if carrier and base != 'EB' else base)
+            if publication_re is not None and not publication_re.match(match.group('publication')):
+                cfg = grammar.entry_types[base]
+                report(entry, 'format_publication_error', '参考文献 {entry} 的{label}出版项格式不符，应为：{expected}',
+                       label=cfg.get('label', base), expected=cfg.get('expected', ''))
+
+        authors = match.group('authors')
+        if not authors:
+            continue
+        if '，' in authors:
+            report(entry, 'format_author_separator_error', '参考文献 {entry} 的作者之间应使用英文逗号“,”分隔')
+        names = [name.strip() for name in re.split(r'[,，]', authors) if name.strip()]
+        et_al = bool(names) and grammar.et_al_re.match(names[-1]) is not None
+        if et_al:
+            names.pop()
+        for name in names:
+            if (grammar.personal_name_re is not None and grammar.name_re is not None
+                    and grammar.personal_name_re.match(name) and not grammar.name_re.match(name)):
+                report(entry, 'format_author_name_error',
+                       "参考文献 {entry} 的作者 '{name}' 格式不符：姓全部大写，名缩写为首字母且不加缩写点（如 ZHANG S Y）",
+                       name=name)
+        if not et_al and len(names) > grammar.max_authors:
+            report(entry, 'format_author_count_error',
+                   '参考文献 {entry} 列出了{count}位作者，超过{max}位时只列前{max}位，其后加 et al',
+                   count=len(names), max=grammar.max_authors)
+        elif et_al and len(names) < grammar.max_authors:
+            report(entry, 'format_et_al_error', '参考文献 {entry} 使用 et al 时应列出前{max}位作者（当前{count}位）',
+                   count=len(names), max=grammar.max_authors)
+
+    return section_result(items, messages.get('format_ok', '参考文献著录格式符合 GB/T 7714 规则'))
+
+def check_numbering(index, grammar, tpl):
+    """检查参考文献是否从 [1] 开始连续编号"""
+    messages = tpl.get('messages', {})
+    items = []
+    seen = set()
+    expected = 1
+    for entry in index.entries:
+        if entry.number is None:
+            items.append({
+                'message': messages.get('numbering_missing_error', '参考文献第 {position} 条缺少编号').format(
+                    position=entry.position),
+                'paragraph_index': entry.paragraph_index,
+            })
+            expected += 1
+            continue
+        if entry.number in seen:
+            items.append({
+                'message': messages.get('numbering_duplicate_error', '参考文献编号 [{number}] 重复').format(
+                    number=entry.number),
+                'paragraph_index': entry.paragraph_index,
+            })
+            # 重复的编号占用一个位置
+            expected += 1
+            continue
+        if entry.number != expected:
+            items.append({
+                'message': messages.get('numbering_sequence_error', '参考文献编号 [{number}] 不连续，应为 [{expected}]').format(
+                    number=entry.number, expected=expected),
+                'paragraph_index': entry.paragraph_index,
+            })
+        seen.add(entry.number)
+        # 跳号之后按实际编号继续，避免一处跳号导致后续全部报错
+        expected = entry.number + 1
+    return section_result(items, messages.get('numbering_ok', '参考文献共 {count} 条，编号从 [1] 开始连续').format(
+        count=len(index.entries)))
+
+def check_dangling_citations(index, grammar, tpl):
+    """检查正文引用的文献是否都在参考文献表中"""
+    messages = tpl.get('messages', {})
+    items = []
+    reported = set()
+    for paragraph_index, _, citation, numbers in index.citations:
+        missing = [number for number in numbers if number not in index.by_number and number not in reported]
+        if not missing:
+            continue
+        reported.update(missing)
+        items.append({
+            'message': messages.get('dangling_error', '正文引用 {citation} 中的文献 {numbers} 在参考文献表中不存在').format(
+                citation=citation, numbers=', '.join(f'[{number}]' for number in missing)),
+            'paragraph_index': paragraph_index,
+        })
+    return section_result(items, messages.get('dangling_ok', '正文引用的参考文献均在参考文献表中'))
+
+def check_uncited_entries(index, grammar, tpl):
+    """检查参考文献表中的每条文献是否在正文中被引用"""
+    messages = tpl.get('messages', {})
+    if not index.citations:
+        return section_result([], messages.get('citations_missing', '正文中未识别到 [n] 形式的引用标注，跳过未引用与引用顺序检查'))
+    items = []
+    for entry in index.entries:
+        if entry.number is None or entry.number in index.first_citations:
+            continue
+        items.append({
+            'message': messages.get('uncited_error', '参考文献 [{number}] 未在正文中引用').format(number=entry.number),
+            'paragraph_index': entry.paragraph_index,
+        })
+    return section_result(items, messages.get('uncited_ok', '参考文献表中的文献均在正文中被引用'))
+
+def check_citation_order(index, grammar, tpl):
+    """检查参考文献是否按正文首次引用顺序编号"""
+    messages = tpl.get('messages', {})
+    if not index.citations:
+        return section_result([], messages.get('citations_missing', '正文中未识别到 [n] 形式的引用标注，跳过未引用与引用顺序检查'))
+    items = []
+    for number, position, latest in iter_first_mention_order(index.by_number, index.first_citations):
+        if latest is not None:
+            items.append({
+                'message': messages.get(
+                    'order_error',
+                    '参考文献 [{number}] 的首次引用（段落 {paragraph}）早于 [{previous}]（段落 {previous_paragraph}），应按正文首次引用顺序编号'
+                ).format(number=number, paragraph=position[0] + 1, previous=latest[1],
+                         previous_paragraph=latest[0][0] + 1),
+                'paragraph_index': position[0],
+            })
+    return section_result(items, messages.get('order_ok', '参考文献按正文首次引用顺序编号'))
+
+def check_doc_with_template(doc_path, template_identifier):
+    """
+    主检查函数：使用模板检查文档的参考文献著录格式、编号与正文引用
+    返回完整的检查报告
+    """
+    tpl = load_template(template_identifier)
+    doc = Document(doc_path)
+    messages = tpl.get('messages', {})
+
+    grammar = get_reference_grammar(tpl)
+    index = build_reference_index(doc, tpl, grammar)
+
+    report = {'summary': []}
+    checks = [
+        ('entry_format', check_entry_format),
+        ('numbering', check_numbering),
+        ('dangling_citations', check_dangling_citations),
+        ('uncited_entries', check_uncited_entries),
+        ('citation_order', check_citation_order),
+    ]
+    if index.heading_index is None:
+        report['summary'].append(messages.get('section_missing', '未找到参考文献部分，跳过参考文献检查'))
+    elif not index.entries:
+        report['numbering'] = {
+            'ok': False,
+            'messages': [messages.get('entries_missing', '参考文献部分未识别到编号的文献条目')],
+            'items': [{'message': messages.get('entries_missing', '参考文献部分未识别到编号的文献条目'),
+                       'paragraph_index': index.heading_index}],
+        }
+    else:
+        for key, check in checks:
+            if should_skip_check(key):
+                continue
+            report[key] = check(index, grammar, tpl)
+
+    report['details'] = {
+        'paragraphs_scanned': index.paragraphs_scanned,
+        'heading_index': index.heading_index,
+        'entries': [entry.number for entry in index.entries],
+        'citations': dict(sorted(index.citation_counts.items())),
+    }
+
+    all_ok = all(report[key]['ok'] for key, _ in checks if key in report)
+    report['summary'].append(f"参考文献检查结果: {'通过' if all_ok else '发现问题'}")
+    report['summary'].append(
+        f"参考文献 {len(index.entries)} 条，正文引用标注 {len(index.citations)} 处，"
+        f"被引用文献 {len(index.first_citations)} 篇")
+    report['overall_ok'] = all_ok
+
+    return report
+
+# ---------- 报表输出 ----------
+def print_report(report):
+    """打印检查报告"""
+    print("=" * 60)
+    print("参考文献检测报告")
+    print("=" * 60)
+
+    print("\n【检查总结】")
+    for summary in report.get('summary', []):
+        print(f"  {summary}")
+
+    sections = [
+        ('entry_format', '著录格式检查'),
+        ('numbering', '编号检查'),
+        ('dangling_citations', '悬空引用检查'),
+        ('uncited_entries', '未引用检查'),
+        ('citation_order', '引用顺序检查'),
+    ]
+    for key, name in sections:
+        info = report.get(key)
+        if info is None:
+            continue
+        print(f"\n【{name}】")
+        mark = '✓' if info.get('ok', True) else '✗'
+        for msg in info.get('messages', []):
+            print(f"  {mark} {msg}")
+
+    print("\n" + "=" * 60)
+
+def print_help():
+    """显示帮助信息"""
+    print("用法:")
+    print("  python References_detect.py check <paper.docx> <template.json_or_name>")
+    print("")
+    print("示例:")
+    print("  python References_detect.py check template/test.docx References")
+    print("  python References_detect.py check template/test.docx templates/References.json")
+    print("")
+    print("说明:")
+    print("  检查参考文献表与正文引用，包括：")
+    print("  - 每条文献是否符合 GB/T 7714 著录格式")
+    print("  - 是否从 [1] 开始连续编号")
+    print("  - 正文引用的文献是否存在、每条文献是否被引用、是否按首次引用顺序编号")
+
+# ---------- CLI接口 ----------
+if __name__ == '__main__':
+    if len(sys.argv) != 4:
+        print_help()
+        sys.exit(0)
+
+    cmd = sys.argv[1]
+    if cmd == 'check':
+        paper_path = sys.argv[2]
+        tpl_id = sys.argv[3]
+
+        if not os.path.isfile(paper_path):
+            print(f"论文文件不存在: {paper_path}")
+            sys.exit(1)
+
+        try:
+            report = check_doc_with_template(paper_path, tpl_id)
+            print_report(report)
+            sys.exit(0 if report.get('overall_ok', False) else 1)
+        except Exception as e:
+            print("检查时出错:", e)
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+    else:
+        print_help()
+        sys.exit(0)
+
+'''
+使用示例:
+python paper_detect\References_detect.py check template\test.docx References
+python paper_detect\References_detect.py check template\test.docx templates\References.json
+'''
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import re
+from collections import Counter
+from docx import Document
+
+# 全局检测配置（由 run_all_detections 在导入时注入）
+GLOBAL_DETECTION_CONFIG = {'skip_checks': set()}
+
+def should_skip_check(check_name):
+    """
+    判断是否应该跳过某个检测项
+    """
+    return check_name in GLOBAL_DETECTION_CONFIG.get('skip_checks', set())
+
+"""
+=== 论文格式检测系统 - 拼写检测器 ===
+
+【拼写检测 (Spelling Detection)】（可选模块）
+
+1. 【检查范围】
+   - 标题、摘要、关键词、各级标题与正文段落中的英文单词
+   - 作者与单位信息（标题与摘要之间）、表格内容、参考文献之后的内容不检查
+
+2. 【词典】
+   - 内置英文词表 + 用户领域词表（化学、材料、纺织等专业术语）
+   - 词表构建为 SymSpell 删除索引，保存为磁盘文件后以 mmap 只读打开，
+     多个检测进程通过操作系统页缓存共享；每个单词的查询次数与词表大小无关
+
+3. 【跳过规则】
+   - 含数字的词（化学式、型号、单位）、全大写缩写、大小写混排的词（如 MXene）
+   - 句中首字母大写的词（人名、地名等专有名词）
+   - 网址与邮箱
+   - 在文档中反复出现的未收录单词（视为专业术语）
+
+4. 【报告规则】
+   - 只报告词典中存在相近单词（编辑距离不超过设定值）的疑似错误，并给出建议
+"""
+
+try:
+    from paper_detect.spell_index import open_spell_index, DEFAULT_MAX_EDIT_DISTANCE, DEFAULT_PREFIX_LENGTH
+    from paper_detect.table_grid import paragraph_text
+except ImportError:
+    from spell_index import open_spell_index, DEFAULT_MAX_EDIT_DISTANCE, DEFAULT_PREFIX_LENGTH
+    from table_grid import paragraph_text
+
+# 词表等相对路径相对于项目根目录
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TOKEN_RE = re.compile(r"[A-Za-z0-9]+(?:['’][A-Za-z]+)*")
+SKIP_SPAN_RE = re.compile(r"\S+@\S+|(?:https?://|www\.)\S+", re.IGNORECASE)
+POSSESSIVE_RE = re.compile(r"['’]s$", re.IGNORECASE)
+# 句首判断时跳过的左引号、左括号
+OPENING_CHARACTERS = '"\'“‘(（[【'
+SENTENCE_END_CHARACTERS = '.!?:。！？：'
+
+HEADING_STYLE_PREFIXES = ('heading', '标题')
+
+# ---------- 模板加载 ----------
+def resolve_template_path(identifier):
+    if os.path.isfile(identifier):
+        return identifier
+    candidate = os.path.join("templates", identifier + ".json")
+    if os.path.isfile(candidate):
+        return candidate
+    raise FileNotFoundError(f"Template not found: '{identifier}' (tried file path and {candidate})")
+
+def load_template(identifier):
+    tpl_path = resolve_template_path(identifier)
+    with open(tpl_path, 'r', encoding='utf-8') as f:
+        tpl = json.load(f)
+    return tpl
+
+def resolve_data_path(path):
+    """词表路径：绝对路径或当前目录下存在的文件直接使用，否则相对于项目根目录"""
+    if os.path.isabs(path) or os.path.isfile(path):
+        return path
+    return os.path.join(PROJECT_ROOT, path)
+
+def default_index_dir():
+    """索引文件默认保存目录"""
+    return os.environ.get('PAPER_DETECT_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'paper_detect')
+
+def load_spell_index(tpl):
+    """
+    按模板中的词典配置打开拼写索引（首次使用时构建并保存）
+
+    返回:
+        SpellIndex 对象
+    """
+    config = tpl.get('dictionary', {})
+    word_files = [resolve_data_path(path)
+                  for path in config.get('word_lists', []) + config.get('domain_lexicons', [])]
+    index_dir = config.get('index_dir') or default_index_dir()
+    return open_spell_index(word_files, resolve_data_path(index_dir),
+                            int(config.get('max_edit_distance', DEFAULT_MAX_EDIT_DISTANCE)),
+                            int(config.get('prefix_length', DEFAULT_PREFIX_LENGTH)))
+
+# ---------- 段落区域 ----------
+def classify_paragraph_regions(doc, tpl):
+    """
+    把正文段落划分为标题、摘要、关键词、章节标题、正文
+
+    参数:
+        doc: Document对象
+        tpl: 模板字典
+
+    返回:
+        [(段落索引, 区域, 段落文本)]，只包含需要检查的段落
+    """
+    patterns = {key: re.compile(pattern, re.IGNORECASE if key != 'heading' else 0)
+                for key, pattern in tpl.get('region_patterns', {}).items()}
+    stop_pattern = tpl.get('stop_pattern')
+    stop_re = re.compile(stop_pattern, re.IGNORECASE) if stop_pattern else None
+
+    paragraphs = []
+    for paragraph_index, paragraph in enumerate(doc.paragraphs):
+        text = paragraph_text(paragraph._p)
+        if stop_re and stop_re.match(text):
+            break
+        if text.strip():
+            paragraphs.append((paragraph_index, paragraph, text))
+
+    # 标题与摘要之间为作者、单位信息，不检查
+    abstract_position = next((position for position, (_, _, text) in enumerate(paragraphs)
+                              if 'abstract' in patterns and patterns['abstract'].match(text)), None)
+
+    regions = []
+    for position, (paragraph_index, paragraph, text) in enumerate(paragraphs):
+        if position == 0:
+            region = 'title'
+        elif abstract_position is not None and position < abstract_position:
+            continue
+        elif 'abstract' in patterns and patterns['abstract'].match(text):
+            region = 'abstract'
+        elif 'keywords' in patterns and patterns['keywords'].match(text):
+            region = 'keywords'
+        elif (paragraph.style is not None and (paragraph.style.name or '').lower().startswith(HEADING_STYLE_PREFIXES)) \
+                or ('heading' in patterns and patterns['heading'].match(text)):
+            region = 'heading'
+        else:
+            region = 'content'
+        regions.append((paragraph_index, region, text))
+    return regions
+
+# ---------- 单词提取 ----------
+def is_sentence_start(text, start):
+    """单词是否位于段落或句子开头"""
+    prefix = text[:start].rstrip().rstrip(OPENING_CHARACTERS).rstrip()
+    return not prefix or prefix[-1] in SENTENCE_END_CHARACTERS
+
+def iter_checkable_words(text, rules):
+    """
+    段落中需要检查的单词
+
+    参数:
+        text: 段落文本
+        rules: 模板中的 token_rules
+
+    返回:
+        (原词, 小写词, 是否首字母大写) 的迭代器
+    """
+    min_length = int(rules.get('min_word_length', 3))
+    skip_capitalized = rules.get('skip_capitalized_words', True)
+    ignore_res = [re.compile(pattern, re.IGNORECASE) for pattern in rules.get('ignore_token_patterns', [])]
+
+    text = SKIP_SPAN_RE.sub(lambda match: ' ' * len(match.group(0)), text)
+    for match in TOKEN_RE.finditer(text):
+        token = POSSESSIVE_RE.sub('', match.group(0)).rstrip("'’")
+        if len(token) < min_length or any(char.isdigit() for char in token):
+            continue
+        # 全大写缩写、大小写混排（MXene、pH 等）
+        if any(char.isupper() for char in token[1:]):
+            continue
+        if skip_capitalized and token[0].isupper() and not is_sentence_start(text, match.start()):
+            continue
+        word = token.replace('’', "'").lower()
+        if any(ignore_re.match(word) for ignore_re in ignore_res):
+            continue
+        yield token, word, token[0].isupper()
+
+# ---------- 拼写检查 ----------
+def check_spelling(doc, index, tpl):
+    """
+    检查正文中的英文拼写
+
+    参数:
+        doc: Document对象
+        index: SpellIndex 对象
+        tpl: 模板字典
+
+    返回:
+        (检查结果, 统计信息)
+    """
+    rules = tpl.get('token_rules', {})
+    messages = tpl.get('messages', {})
+    enabled_regions = tpl.get('regions', {})
+    region_labels = tpl.get('region_labels', {})
+    short_length = int(rules.get('short_word_length', 4))
+    short_distance = int(rules.get('short_word_max_edit_distance', 1))
+    term_threshold = int(rules.get('term_frequency_threshold', 3))
+    max_suggestions = int(rules.get('max_suggestions', 3))
+    max_reported = int(rules.get('max_reported_words', 100))
+
+    # 第一遍：收集单词并查词典（同一单词只查一次）
+    occurrences = []
+    known = {}
+    unknown_counts = Counter()
+    words_checked = 0
+    for paragraph_index, region, text in classify_paragraph_regions(doc, tpl):
+        if not enabled_regions.get(region, True):
+            continue
+        for token, word, capitalized in iter_checkable_words(text, rules):
+            words_checked += 1
+            is_known = known.get(word)
+            if is_known is None:
+                is_known = known[word] = word in index
+            if not is_known:
+                unknown_counts[word] += 1
+                occurrences.append((paragraph_index, region, token, word, capitalized))
+
+    # 第二遍：为疑似错误生成建议（反复出现的未收录单词视为专业术语）
+    suggestions = {}
+    items = []
+    for paragraph_index, region, token, word, capitalized in occurrences:
+        if term_threshold and unknown_counts[word] >= term_threshold:
+            continue
+        if word not in suggestions:
+            max_distance = short_distance if len(word) <= short_length else None
+            suggestions[word] = index.suggest(word, max_distance, max_suggestions)
+        # 句首大写的词可能是专有名词，只接受短距离的建议
+        candidates = [candidate for candidate, distance in suggestions[word]
+                      if not capitalized or distance <= short_distance]
+        if not candidates:
+            continue
+        items.append({
+            'message': messages.get('spelling_error', "段落 {paragraph}（{region}）: '{word}' 可能拼写错误，建议: {suggestions}").format(
+                paragraph=paragraph_index + 1, region=region_labels.get(region, region),
+                word=token, suggestions=', '.join(candidates)),
+            'paragraph_index': paragraph_index,
+            'word': token,
+            'suggestions': candidates,
+        })
+
+    result = {'ok': not items, 'messages': [], 'items': items}
+    if items:
+        result['messages'] = [item['message'] for item in items[:max_reported]]
+        if len(items) > max_reported:
+            result['messages'].append(messages.get('spelling_truncated', "其余 {count} 处疑似拼写错误未列出").format(
+                count=len(items) - max_reported))
+    else:
+        result['messages'].append(messages.get('spelling_ok', '未发现拼写错误'))
+
+    details = {
+        'words_checked': words_checked,
+        'distinct_words': len(known),
+        'unknown_words': len(unknown_counts),
+        'treated_as_terms': sorted(word for word, count in unknown_counts.items()
+                                   if term_threshold and count >= term_threshold),
+    }
+    return result, details
+
+def check_doc_with_template(doc_path, template_identifier):
+    """
+    主检查函数：使用模板检查文档中的英文拼写
+    返回完整的检查报告
+    """
+    tpl = load_template(template_identifier)
+    doc = Document(doc_path)
+
+    report = {'summary': []}
+    if should_skip_check('spelling'):
+        report['overall_ok'] = True
+        return report
+
+    try:
+        index = load_spell_index(tpl)
+    except (OSError, ValueError) as e:
+        message = tpl.get('messages', {}).get('dictionary_error', "拼写检查词典加载失败: {error}").format(error=e)
+        report['spelling'] = {'ok': False, 'messages': [message], 'items': []}
+        report['summary'].append(message)
+        report['overall_ok'] = False
+        return report
+
+    report['spelling'], report['details'] = check_spelling(doc, index, tpl)
+    report['details']['dictionary_words'] = len(index)
+    report['details']['index_path'] = index.path
+
+    all_ok = report['spelling']['ok']
+    report['summary'].append(f"拼写检查结果: {'通过' if all_ok else '发现问题'}")
+    report['summary'].append(f"检查单词 {report['details']['words_checked']} 个，"
+                             f"疑似拼写错误 {len(report['spelling']['items'])} 处")
+    report['overall_ok'] = all_ok
+
+    return report
+
+# ---------- 报表输出 ----------
+def print_report(report):
+    """打印检查报告"""
+    print("=" * 60)
+    print("拼写检测报告")
+    print("=" * 60)
+
+    print("\n【检查总结】")
+    for summary in report.get('summary', []):
+        print(f"  {summary}")
+
+    info = report.get('spelling')
+    if info is not None:
+        print("\n【拼写检查】")
+        mark = '✓' if info.get('ok', True) else '✗'
+        for msg in info.get('messages', []):
+            print(f"  {mark} {msg}")
+
+    terms = report.get('details', {}).get('treated_as_terms', [])
+    if terms:
+        print("\n【视为专业术语的未收录单词】")
+        print(f"  {', '.join(terms)}")
+
+    print("\n" + "=" * 60)
+
+def print_help():
+    """显示帮助信息"""
+    print("用法:")
+    print("  python Spelling_detect.py check <paper.docx> <template.json_or_name>")
+    print("  python Spelling_detect.py build-index <template.json_or_name>")
+    print("")
+    print("示例:")
+    print("  python Spelling_detect.py check template/test.docx Spelling")
+    print("  python Spelling_detect.py build-index templates/Spelling.json")
+    print("")
+    print("说明:")
+    print("  检查标题、摘要、关键词、章节标题与正文中的英文拼写")
+    print("  build-index 预先构建词典索引（检测时缺少索引也会自动构建）")
+
+# ---------- CLI接口 ----------
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] == 'build-index':
+        index = load_spell_index(load_template(sys.argv[2]))
+        print(f"词典索引: {index.path}（{len(index)} 个单词）")
+        sys.exit(0)
+
+    if len(sys.argv) != 4:
+        print_help()
+        sys.exit(0)
+
+    cmd = sys.argv[1]
+    if cmd == 'check':
+        paper_path = sys.argv[2]
+        tpl_id = sys.argv[3]
+
+        if not os.path.isfile(paper_path):
+            print(f"论文文件不存在: {paper_path}")
+            sys.exit(1)
+
+        try:
+            report = check_doc_with_template(paper_path, tpl_id)
+            print_report(report)
+            sys.exit(0 if report.get('overall_ok', False) else 1)
+        except Exception as e:
+            print("检查时出错:", e)
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+    else:
+        print_help()
+        sys.exit(0)
+
+'''
+使用示例:
+python paper_detect\Spelling_detect.py check template\test.docx Spelling
+python paper_detect\Spelling_detect.py build-index Spelling
+'''
@@ -11,6 +11,17 @@ from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 from docx.oxml.ns import qn
 from docx.table import Table
 
+from docx.text.paragraph import Paragraph
+
+try:
+    from paper_detect.body_index import build_body_index
+    from paper_detect.table_grid import read_table_grid
+    from paper_detect.table_borders import build_border_matrix
+except ImportError:
+    from body_index import build_body_index
+    from table_grid import read_table_grid
+    from table_borders import build_border_matrix
+
 # 全局检测配置（由 run_all_detections 在导入时注入）
 GLOBAL_DETECTION_CONFIG = {'skip_checks': set()}
 
@@ -225,169 +236,149 @@ def identify_table_captions(doc, tpl):
     
     return captions
 
-def find_table_after_caption(doc, caption_info):
+def find_table_after_caption(doc, caption_info, body_index=None):
     """
     在标题后查找对应的表格
+    
+    参数:
+        doc: Document对象
+        caption_info: identify_table_captions 返回的标题信息
+        body_index: 正文顺序索引（可选，多个标题共用时只需构建一次）
+    
     返回：Table对象或None
     """
-    caption_idx = caption_info['paragraph_index']
-    
-    # 在标题后的几个元素中查找表格
-    for i in range(caption_idx + 1, min(caption_idx + 5, len(doc.element.body))):
-        element = doc.element.body[i]
-        if element.tag.endswith('tbl'):  # 表格元素
-            # 通过索引找到对应的Table对象
-            table_idx = 0
-            for j, elem in enumerate(doc.element.body):
-                if elem.tag.endswith('tbl'):
-                    if j == i:
-                        return doc.tables[table_idx] if table_idx < len(doc.tables) else None
-                    table_idx += 1
-    
-    return None
+    body_index = body_index or build_body_index(doc)
+    # 在标题后的4个正文元素中查找表格（段落索引需先换算为 body 位置）
+    return body_index.table(body_index.table_after_paragraph(caption_info['paragraph_index'], max_distance=4))
+
+def format_column_ranges(columns):
+    """把列号列表压缩为 "1-3, 5" 形式（列号从1开始）"""
+    ranges = []
+    for column in columns:
+        if ranges and column == ranges[-1][1] + 1:
+            ranges[-1][1] = column
+        else:
+            ranges.append([column, column])
+    return ', '.join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
 
-def check_table_style(table, tpl):
+def check_table_style(table, tpl, grid=None):
     """
     检查表格是否为三线表格式
+    基于有效边框矩阵（合并表格样式、条件格式、表格/行/单元格边框）逐条检查横线与竖线：
+    只允许顶线、表头底线和底线三条横线，且不应有竖线
+    grid: read_table_grid 构建的单元格网格（可选，与对齐检查共用）
     返回：(is_three_line, issues)
     """
     issues = []
-    border_width_issues = []
+    messages = tpl.get('messages', {})
     
     if not table:
         issues.append("未找到表格对象")
         return False, issues
     
     try:
-        # 检查表格的边框设置
-        # 三线表特征：只有顶部、底部和表头底部有线
         tbl = table._element
-        tblPr = tbl.find(qn('w:tblPr'))
-        
-        if tblPr is None:
+        if tbl.find(qn('w:tblPr')) is None:
             issues.append("表格缺少格式属性")
             return False, issues
         
-        # 检查表格边框
-        tblBorders = tblPr.find(qn('w:tblBorders'))
-        
-        # 三线表应该：
-        # 1. 有顶部边框（top）
-        # 2. 有底部边框（bottom）
-        # 3. 无左右边框或边框为none
-        # 4. 表头行底部有边框
-        
-        has_issues = False
+        grid = grid or read_table_grid(tbl)
+        matrix = build_border_matrix(tbl, grid, table.part.styles.element)
+        row_count = matrix.row_count
+        if row_count == 0:
+            return True, []
         
-        if tblBorders is not None:
-            # 检查是否有左右边框（三线表不应有）
-            left_border = tblBorders.find(qn('w:left'))
-            right_border = tblBorders.find(qn('w:right'))
-            inside_v = tblBorders.find(qn('w:insideV'))
-            
-            if left_border is not None and left_border.get(qn('w:val')) not in [None, 'none', 'nil']:
-                issues.append("表格不应有左边框（三线表格式）")
-                has_issues = True
-                
-            if right_border is not None and right_border.get(qn('w:val')) not in [None, 'none', 'nil']:
-                issues.append("表格不应有右边框（三线表格式）")
-                has_issues = True
-                
-            if inside_v is not None and inside_v.get(qn('w:val')) not in [None, 'none', 'nil']:
-                issues.append("表格不应有内部竖线（三线表格式）")
-                has_issues = True
+        check_width = tpl.get('check_rules', {}).get('border_width_check', False)
+        border_config = tpl.get('table_detection_rules', {}).get('table_style', {}).get('border_width', {})
+        tolerance = tpl.get('check_rules', {}).get('border_width_tolerance', 0.1)
         
-        # 检查是否只有三条横线（简化检查：检查表格的行边框设置）
-        # 这里我们检查是否大部分内部横线都是none
-        inside_h = None
-        if tblBorders is not None:
-            inside_h = tblBorders.find(qn('w:insideH'))
-            
-        # 如果内部横线不是none，说明可能不是标准三线表
-        if inside_h is not None and inside_h.get(qn('w:val')) not in [None, 'none', 'nil']:
-            # 需要进一步检查：可能第一行（表头）下方有线是正常的
-            # 这里简化处理：如果有内部横线，我们检查是否只在表头下方
-            pass  # 暂时允许，因为表头下方应该有线
+        # 必需的横线：顶线、表头底线（多于一行时）、底线
+        # 多行表头（首行纵向合并或标题行重复）内部允许有分隔子表头的辅助横线
+        header_rows = grid.header_row_count()
+        required_lines = {0: ('top', border_config.get('top_line', 1.5))}
+        if header_rows < row_count:
+            required_lines[header_rows] = ('header', border_config.get('header_line', 0.75))
+        required_lines[row_count] = ('bottom', border_config.get('bottom_line', 1.5))
+        missing_defaults = {
+            'top': '表格缺少顶线（第{columns}列）',
+            'header': '表格缺少表头底线（第{columns}列）',
+            'bottom': '表格缺少底线（第{columns}列）',
+        }
+        width_defaults = {
+            'top': '顶线宽度应为{expected}磅，实际为{actual}磅',
+            'header': '表头底线宽度应为{expected}磅，实际为{actual}磅',
+            'bottom': '底线宽度应为{expected}磅，实际为{actual}磅',
+        }
         
-        # 检查边框粗细（如果模板中启用了此检查）
-        if tpl.get('check_rules', {}).get('border_width_check', False):
-            border_config = tpl.get('table_detection_rules', {}).get('table_style', {}).get('border_width', {})
-            tolerance = tpl.get('check_rules', {}).get('border_width_tolerance', 0.1)
-            
-            expected_top = border_config.get('top_line', 1.5)
-            expected_bottom = border_config.get('bottom_line', 1.5)
-            expected_header = border_config.get('header_line', 0.75)
-            
-            # 三线表的边框通常设置在单元格级别，而不是表格级别
-            # 1. 检查顶线：第一行单元格的顶边框
-            if len(table.rows) > 0:
-                first_row = table.rows[0]
-                if first_row.cells:
-                    first_cell = first_row.cells[0]
-                    tc = first_cell._element
-                    tcPr = tc.find(qn('w:tcPr'))
-                    if tcPr is not None:
-                        tcBorders = tcPr.find(qn('w:tcBorders'))
-                        if tcBorders is not None:
-                            # 检查顶线
-                            top_border = tcBorders.find(qn('w:top'))
-                            if top_border is not None:
-                                sz = top_border.get(qn('w:sz'))
-                                if sz:
-                                    actual_width = float(sz) / 8.0
-                                    if abs(actual_width - expected_top) > tolerance:
-                                        msg_template = tpl.get('messages', {}).get('top_border_width_error', '顶线宽度应为{expected}磅，实际为{actual}磅')
-                                        border_width_issues.append(msg_template.format(expected=expected_top, actual=round(actual_width, 2)))
-                                        has_issues = True
-                            
-                            # 检查表头底线（第一行底边框）
-                            bottom_border = tcBorders.find(qn('w:bottom'))
-                            if bottom_border is not None:
-                                sz = bottom_border.get(qn('w:sz'))
-                                if sz:
-                                    actual_width = float(sz) / 8.0
-                                    if abs(actual_width - expected_header) > tolerance:
-                                        msg_template = tpl.get('messages', {}).get('header_border_width_error', '表头底线宽度应为{expected}磅，实际为{actual}磅')
-                                        border_width_issues.append(msg_template.format(expected=expected_header, actual=round(actual_width, 2)))
-                                        has_issues = True
-            
-            # 2. 检查底线：最后一行单元格的底边框
-            if len(table.rows) > 0:
-                last_row = table.rows[-1]
-                if last_row.cells:
-                    first_cell = last_row.cells[0]
-                    tc = first_cell._element
-                    tcPr = tc.find(qn('w:tcPr'))
-                    if tcPr is not None:
-                        tcBorders = tcPr.find(qn('w:tcBorders'))
-                        if tcBorders is not None:
-                            bottom_border = tcBorders.find(qn('w:bottom'))
-                            if bottom_border is not None:
-                                sz = bottom_border.get(qn('w:sz'))
-                                if sz:
-                                    actual_width = float(sz) / 8.0
-                                    if abs(actual_width - expected_bottom) > tolerance:
-                                        msg_template = tpl.get('messages', {}).get('bottom_border_width_error', '底线宽度应为{expected}磅，实际为{actual}磅')
-                                        border_width_issues.append(msg_template.format(expected=expected_bottom, actual=round(actual_width, 2)))
-                                        has_issues = True
+        width_issues = []
+        for edge, line in enumerate(matrix.horizontal):
+            present = [col for col, border in enumerate(line, 1) if border is not None]
+            if edge in required_lines:
+                name, expected = required_lines[edge]
+                missing = [col for col, border in enumerate(line, 1)
+                           if border is None and not (0 < edge < row_count and grid.grid[edge - 1][col - 1] == grid.grid[edge][col - 1])]
+                if missing:
+                    issues.append(messages.get(f'missing_{name}_border', missing_defaults[name]).format(
+                        columns=format_column_ranges(missing)))
+                if check_width:
+                    actual = next((border[1] for border in line
+                                   if border is not None and border[1] is not None and abs(border[1] - expected) > tolerance), None)
+                    if actual is not None:
+                        width_issues.append(messages.get(f'{name}_border_width_error', width_defaults[name]).format(
+                            expected=expected, actual=round(actual, 2)))
+            elif present and not 0 < edge < header_rows:
+                issues.append(messages.get(
+                    'extra_horizontal_border',
+                    '第{row}行与第{next_row}行之间存在多余横线（第{columns}列），三线表只允许顶线、表头底线和底线'
+                ).format(row=edge, next_row=edge + 1, columns=format_column_ranges(present)))
         
-        issues.extend(border_width_issues)
+        # 竖线：左边框、右边框、内部竖线均不应存在
+        column_count = matrix.column_count
+        vertical_found = {'left': False, 'right': False, 'inside': False}
+        for line in matrix.vertical:
+            for edge, border in enumerate(line):
+                if border is None:
+                    continue
+                key = 'left' if edge == 0 else 'right' if edge == column_count else 'inside'
+                vertical_found[key] = True
+        vertical_defaults = {
+            'left': '表格不应有左边框（三线表格式）',
+            'right': '表格不应有右边框（三线表格式）',
+            'inside': '表格不应有内部竖线（三线表格式）',
+        }
+        for key, found in vertical_found.items():
+            if found:
+                issues.append(messages.get(f'{key}_vertical_border_error', vertical_defaults[key]))
         
-        if has_issues:
-            return False, issues
-        else:
-            return True, []
+        issues.extend(width_issues)
+        return len(issues) == 0, issues
             
     except Exception as e:
         issues.append(f"表格格式检测异常: {str(e)}")
         return False, issues
 
-def check_table_content_alignment(table, tpl):
+def table_style_alignment_resolver(table):
+    """
+    返回按段落样式取对齐方式的函数（供 read_table_grid 使用）
+    同一样式只解析一次
+    """
+    cache = {}
+    
+    def style_alignment(p_element):
+        style_id = p_element.style
+        if style_id not in cache:
+            cache[style_id] = detect_paragraph_alignment(Paragraph(p_element, table))
+        return cache[style_id]
+    
+    return style_alignment
+
+def check_table_content_alignment(table, tpl, grid=None):
     """
     检查表格内容的对齐方式
     规则：
     - 表头行（第1行）：所有单元格居中对齐
     - 内容行（其他行）：较长内容左对齐，较短内容居中对齐
+    grid: read_table_grid 构建的单元格网格（可选，与三线表检查共用）
     返回：(is_correct, issues)
     """
     issues = []
@@ -409,46 +400,24 @@ def check_table_content_alignment(table, tpl):
     length_threshold = tpl.get('check_rules', {}).get('alignment_length_threshold', 20)
     
     try:
-        # 用于跟踪已检查的单元格（避免合并单元格重复检查）
-        checked_cells = set()
+        grid = grid or read_table_grid(table._tbl, table_style_alignment_resolver(table))
         
-        for row_idx, row in enumerate(table.rows):
+        for row_idx, row_cells in enumerate(grid.row_cells):
             # 判断是否是表头行（第1行，索引为0）
             is_header_row = (row_idx == 0)
             
-            # 计算逻辑列号（排除合并单元格的重复）
-            logical_col = 0
-            
-            for cell_idx, cell in enumerate(row.cells):
-                # 获取单元格的唯一标识（用于处理合并单元格）
-                cell_id = id(cell._element)
-                is_merged = cell_id in checked_cells
-                
-                if is_merged:
-                    continue
-                    
-                checked_cells.add(cell_id)
-                logical_col += 1
-                
-                # 获取单元格中的段落
-                paragraphs = cell.paragraphs
-                
-                if not paragraphs:
-                    continue
-                
-                # 获取非空段落
-                non_empty_paras = [p for p in paragraphs if p.text.strip()]
-                if not non_empty_paras:
+            # 逻辑列号：只计起始于本行的单元格（合并单元格只检查一次）
+            for logical_col, cell in enumerate(row_cells, 1):
+                # 只检查第一个非空段落的对齐方式（全空单元格跳过）
+                actual_alignment = grid.alignments[cell]
+                if actual_alignment is None:
                     continue
                 
                 # 获取单元格文本用于显示
-                cell_text = cell.text.strip()
+                cell_text = grid.texts[cell].strip()
                 text_preview = cell_text[:20] + '...' if len(cell_text) > 20 else cell_text
                 text_length = len(cell_text)
                 
-                # 只检查第一个非空段落的对齐方式（避免重复报告）
-                para = non_empty_paras[0]
-                actual_alignment = detect_paragraph_alignment(para)
                 actual_alignment_name = alignment_names.get(actual_alignment, f'未知({actual_alignment})')
                 
                 # 根据位置判断期望的对齐方式
@@ -582,6 +551,7 @@ def check_doc_with_template(doc_path, template_identifier):
     
     # 识别所有表格标题
     captions = identify_table_captions(doc, tpl)
+    body_index = build_body_index(doc)
     
     report = {
         'captions': [],
@@ -613,19 +583,22 @@ def check_doc_with_template(doc_path, template_identifier):
         table_report['caption_format'] = caption_format_report
         
         # 查找对应的表格
-        table = find_table_after_caption(doc, caption_info)
+        table = find_table_after_caption(doc, caption_info, body_index)
         table_report['table_object'] = table is not None
         
         if table:
+            # 一次读取表格网格，三线表与对齐检查共用
+            grid = read_table_grid(table._tbl, table_style_alignment_resolver(table))
+            
             # 检查三线表格式
-            is_three_line, style_issues = check_table_style(table, tpl)
+            is_three_line, style_issues = check_table_style(table, tpl, grid)
             table_report['table_style'] = {
                 'ok': is_three_line,
                 'messages': style_issues if not is_three_line else [tpl.get('messages', {}).get('table_style_ok', '表格为三线表格式')]
             }
             
             # 检查内容对齐
-            is_aligned, alignment_issues = check_table_content_alignment(table, tpl)
+            is_aligned, alignment_issues = check_table_content_alignment(table, tpl, grid)
             table_report['table_alignment'] = {
                 'ok': is_aligned,
                 'messages': alignment_issues if not is_aligned else [tpl.get('messages', {}).get('table_content_alignment_ok', '表格内容对齐方式正确')]
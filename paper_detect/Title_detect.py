@@ -4,6 +4,7 @@ import json
 import re
 import zipfile
 import xml.etree.ElementTree as ET
+from collections import OrderedDict
 from docx import Document
 from docx.shared import Pt
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
@@ -38,6 +39,15 @@ except ImportError:
     SPACY_AVAILABLE = False
     print("警告: 未安装spaCy，将使用简化的Title Case检查")
 
+# 大小写检查只需要词性（tagger + attribute_ruler），关闭依存分析、实体识别和词形还原
+SPACY_DISABLED_PIPES = ('parser', 'ner', 'lemmatizer')
+if nlp is not None:
+    nlp.select_pipes(disable=[name for name in SPACY_DISABLED_PIPES if name in nlp.pipe_names])
+
+# 单词词性缓存（LRU）：小写单词 -> 词性标签
+POS_CACHE_SIZE = 4096
+_POS_CACHE = OrderedDict()
+
 
 """
 === 论文格式检测系统 - 标题、作者、单位检测器 ===
@@ -379,6 +389,67 @@ def get_font_size(pt_size, tpl=None):
     return size_map[closest_size]
 
 
+def tag_words(words, nlp_model=None):
+    """
+    获取单词的词性（逐词标注，不带句子上下文）
+    
+    已缓存的单词直接返回；其余单词在一次 nlp.pipe 调用中批量标注后写入LRU缓存。
+    缓存只按单词区分，同一进程内应使用同一个spaCy模型。
+    
+    参数:
+        words: 单词列表（大小写不限）
+        nlp_model: spaCy模型（默认使用模块加载的模型）
+    
+    返回:
+        {小写单词: 词性标签}，无法标注时词性为None
+    """
+    nlp_model = nlp_model or nlp
+    tags = {}
+    missing = []
+    for word in words:
+        key = word.lower()
+        if not key or key in tags:
+            continue
+        if key in _POS_CACHE:
+            _POS_CACHE.move_to_end(key)
+            tags[key] = _POS_CACHE[key]
+        else:
+            tags[key] = None
+            missing.append(key)
+    
+    if missing and nlp_model:
+        for key, doc in zip(missing, nlp_model.pipe(missing)):
+            tags[key] = doc[0].pos_ if len(doc) else None
+            _POS_CACHE[key] = tags[key]
+        while len(_POS_CACHE) > POS_CACHE_SIZE:
+            _POS_CACHE.popitem(last=False)
+    
+    return tags
+
+def title_case_candidates(title):
+    """返回标题中需要词性标注的单词（去掉首尾标点，连字符复合词同时给出各部分）"""
+    candidates = []
+    for word in title.split():
+        match = re.match(r'^([^\w]*)(\S+)([^\w]*)$', word)
+        if match:
+            core_word = match.group(2)
+            candidates.append(core_word)
+            if '-' in core_word:
+                candidates.extend(part for part in core_word.split('-') if part)
+    return candidates
+
+def prime_title_case_tags(titles, nlp_model=None):
+    """
+    在一次 nlp.pipe 调用中标注多个标题的全部单词（结果进入词性缓存）
+    
+    参数:
+        titles: 标题文本列表
+        nlp_model: spaCy模型（默认使用模块加载的模型）
+    """
+    words = [word for title in titles for word in title_case_candidates(title)]
+    if words:
+        tag_words(words, nlp_model)
+
 def apply_chicago_title_case(title, nlp_model):
     """
     应用芝加哥格式的标题大小写规则，并特别处理化学式和缩写。
@@ -386,6 +457,9 @@ def apply_chicago_title_case(title, nlp_model):
     """
     if not nlp_model:
         return title
+    
+    # 标题中的单词一次性批量标注词性（已缓存的单词不再调用模型）
+    pos_tags = tag_words(title_case_candidates(title), nlp_model)
 
     # 定义虚词的词性标签
     MINOR_POS = {"ADP", "DET", "CCONJ", "SCONJ", "PART"}
@@ -425,9 +499,11 @@ def apply_chicago_title_case(title, nlp_model):
             processed_parts = [process_word(part, is_first and i == 0, is_last and i == len(parts) - 1) for i, part in enumerate(parts)]
             return prefix + '-'.join(processed_parts) + suffix
             
-        # 使用spaCy进行词性分析
-        doc = nlp_model(core_word.lower())
-        token = doc[0] if doc else None
+        # 使用spaCy词性分析结果
+        core_word_lower = core_word.lower()
+        if core_word_lower not in pos_tags:
+            pos_tags.update(tag_words([core_word_lower], nlp_model))
+        pos = pos_tags[core_word_lower]
         
         # 规则2：首词和末词大写
         if is_first or is_last:
@@ -437,8 +513,7 @@ def apply_chicago_title_case(title, nlp_model):
             return prefix + core_word.capitalize() + suffix
         
         # 规则3：虚词小写（结合spaCy词性分析和显式词汇表）
-        core_word_lower = core_word.lower()
-        if (token and token.pos_ in MINOR_POS) or core_word_lower in MINOR_WORDS:
+        if pos in MINOR_POS or core_word_lower in MINOR_WORDS:
             return prefix + core_word.lower() + suffix
             
         # 规则4：其他实词大写
@@ -725,7 +800,8 @@ def check_format_section(doc_path, tpl):
         # 找到第一个非空段落（标题）和第二个非空段落（作者）的索引
         nonempty_count = 0
         start_idx = 0
-        for idx, p in enumerate(doc.paragraphs):
+        all_paragraphs = doc.paragraphs
+        for idx, p in enumerate(all_paragraphs):
             if p.text and p.text.strip():
                 nonempty_count += 1
                 if nonempty_count == 3:  # 从第三个非空段落开始检查单位
@@ -733,8 +809,8 @@ def check_format_section(doc_path, tpl):
                     break
         
         if start_idx > 0:
-            for idx in range(start_idx, len(doc.paragraphs)):
-                p = doc.paragraphs[idx]
+            for idx in range(start_idx, len(all_paragraphs)):
+                p = all_paragraphs[idx]
                 # 跳过空段落
                 if not p.text or not p.text.strip():
                     continue
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+=== 视觉API录制/回放模块 (Cassette) ===
+
+【功能说明】
+1. 录制模式 (record)
+   - 每次真实调用 call_vision_api 后，把请求与响应成对写入 cassette 文件
+   - API密钥只以脱敏形式保存（Authorization: Bearer sk-****）
+   - 图片base64不直接落盘，只保存其 sha256 与字节数，文件体积可控
+   - 同时记录每次调用的真实耗时，便于分析模型调用在整体耗时中的占比
+
+2. 回放模式 (replay)
+   - 按请求指纹（模型 + 提示词 + 图片哈希 + 采样参数）查找录制的响应
+   - 同一指纹录制了多次时按录制顺序依次返回，保证结果确定
+   - 不访问网络、不需要API密钥，可离线复跑完整流程的基准与报告对比
+
+【文件格式】
+cassette 为 JSON Lines 文件，每行一个交互记录：
+    {"key": ..., "request": {...}, "response": {...}, "elapsed_seconds": ...}
+"""
+
+import copy
+import hashlib
+import json
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Dict, Optional
+
+CASSETTE_MODES = ('off', 'record', 'replay')
+
+
+def redact_api_key(api_key: Optional[str]) -> str:
+    """
+    返回脱敏后的API密钥（仅保留前缀）
+
+    参数:
+        api_key: 原始API密钥
+
+    返回:
+        形如 "sk-****" 的字符串
+    """
+    if not api_key:
+        return ''
+    prefix = api_key.split('-', 1)[0] if '-' in api_key else ''
+    return f"{prefix}-****" if prefix else '****'
+
+
+def _strip_image_payload(payload: Dict) -> Dict:
+    """
+    复制请求体，把其中的 data URL 图片替换为 "sha256:<hash>;bytes=<n>" 摘要
+    """
+    stripped = copy.deepcopy(payload)
+    for message in stripped.get('messages', []):
+        content = message.get('content')
+        if not isinstance(content, list):
+            continue
+        for item in content:
+            if item.get('type') != 'image_url':
+                continue
+            url = item.get('image_url', {}).get('url', '')
+            data = url.split(',', 1)[1] if url.startswith('data:') and ',' in url else url
+            digest = hashlib.sha256(data.encode('utf-8')).hexdigest()
+            item['image_url'] = {'url': f"sha256:{digest};bytes={len(data)}"}
+    return stripped
+
+
+def request_fingerprint(payload: Dict) -> str:
+    """
+    计算请求指纹（与API密钥、图片编码方式无关，只取决于实际请求内容）
+
+    参数:
+        payload: 发送给 /chat/completions 的请求体
+
+    返回:
+        sha256 十六进制字符串
+    """
+    stripped = _strip_image_payload(payload)
+    canonical = json.dumps(stripped, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class VisionCassette:
+    """视觉API请求/响应的录制与回放器"""
+
+    def __init__(self, path: str, mode: str = 'replay'):
+        """
+        初始化 cassette
+
+        参数:
+            path: cassette 文件路径（JSON Lines）
+            mode: 'record' 录制 或 'replay' 回放
+        """
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"未知的cassette模式: {mode}（应为 record 或 replay）")
+
+        self.path = Path(path)
+        self.mode = mode
+        self.recorded_count = 0
+        self.replayed_count = 0
+        self.miss_count = 0
+        self.recorded_seconds = 0.0
+        self.replayed_seconds = 0.0
+        self._entries = defaultdict(deque)
+
+        if mode == 'replay':
+            if not self.path.is_file():
+                raise FileNotFoundError(f"cassette文件不存在: {self.path}")
+            self._load()
+        elif self.path.parent and not self.path.parent.exists():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _load(self):
+        """读取 cassette 文件，按指纹分组（保持录制顺序）"""
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                self._entries[entry['key']].append(entry)
+
+    def record(self, payload: Dict, api_key: Optional[str], response: Optional[Dict],
+               elapsed_seconds: float):
+        """
+        追加一条录制记录
+
+        参数:
+            payload: 请求体
+            api_key: 使用的API密钥（只以脱敏形式保存）
+            response: API返回的JSON（调用失败时为None）
+            elapsed_seconds: 本次调用耗时（秒，含重试）
+        """
+        entry = {
+            'key': request_fingerprint(payload),
+            'request': {
+                'headers': {'Authorization': f"Bearer {redact_api_key(api_key)}"},
+                'payload': _strip_image_payload(payload)
+            },
+            'response': response,
+            'elapsed_seconds': round(elapsed_seconds, 4)
+        }
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+        self.recorded_count += 1
+        self.recorded_seconds += elapsed_seconds
+
+    def replay(self, payload: Dict) -> Optional[Dict]:
+        """
+        返回与请求对应的录制响应
+
+        参数:
+            payload: 请求体
+
+        返回:
+            录制时的响应字典；未录制过该请求时返回None
+        """
+        queue = self._entries.get(request_fingerprint(payload))
+        if not queue:
+            self.miss_count += 1
+            return None
+
+        # 多次录制的同一请求按顺序回放，最后一条保留用于后续重复请求
+        entry = queue.popleft() if len(queue) > 1 else queue[0]
+        self.replayed_count += 1
+        self.replayed_seconds += entry.get('elapsed_seconds', 0.0)
+        return copy.deepcopy(entry['response'])
+
+    def summary(self) -> Dict:
+        """
+        返回录制/回放统计
+
+        返回:
+            {'mode', 'path', 'recorded', 'replayed', 'misses', 'api_seconds'}
+            其中 api_seconds 为（录制时）真实模型调用的累计耗时
+        """
+        return {
+            'mode': self.mode,
+            'path': str(self.path),
+            'recorded': self.recorded_count,
+            'replayed': self.replayed_count,
+            'misses': self.miss_count,
+            'api_seconds': round(self.recorded_seconds if self.mode == 'record' else self.replayed_seconds, 3)
+        }
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+=== 文档正文顺序索引模块 ===
+
+【功能说明】
+doc.paragraphs 与 doc.tables 分别只包含正文中的段落和表格，
+二者的下标都不能直接当作 doc.element.body 的下标使用（中间夹着表格或段落）。
+
+本模块对正文的直接子元素做一次遍历，记录：
+    - 每个段落在 body 中的位置
+    - 每个表格在 body 中的位置及其序号（即在 doc.tables 中的下标）
+    - 每个位置之后最近的表格
+
+之后"标题下方的表格"的查询是 O(1) 的查表操作。
+"""
+
+from typing import List, Optional
+
+try:
+    from paper_detect.ooxml import W_P, W_TBL
+except ImportError:
+    from ooxml import W_P, W_TBL
+
+
+class BodyIndex:
+    """正文段落与表格的顺序索引"""
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.tables = doc.tables                  # 只物化一次 Table 对象
+        self.paragraph_positions: List[int] = []  # 段落索引 -> body 位置
+        self.table_positions: List[int] = []      # 表格序号 -> body 位置
+
+        children = list(doc.element.body.iterchildren())
+        # body 位置 -> ('p', 段落索引) / ('tbl', 表格序号) / None（sectPr 等其他元素）
+        self.slots: List[Optional[tuple]] = []
+        for position, child in enumerate(children):
+            if child.tag == W_P:
+                self.slots.append(('p', len(self.paragraph_positions)))
+                self.paragraph_positions.append(position)
+            elif child.tag == W_TBL:
+                self.slots.append(('tbl', len(self.table_positions)))
+                self.table_positions.append(position)
+            else:
+                self.slots.append(None)
+
+        # 每个位置之后（不含自身）最近的表格位置
+        count = len(children)
+        self._next_table: List[Optional[int]] = [None] * count
+        following = None
+        for position in range(count - 1, -1, -1):
+            self._next_table[position] = following
+            if self.slots[position] is not None and self.slots[position][0] == 'tbl':
+                following = position
+
+    def table_after_paragraph(self, paragraph_index: int, max_distance: int = 4) -> Optional[int]:
+        """
+        段落下方 max_distance 个正文元素以内的第一个表格
+
+        参数:
+            paragraph_index: 段落在 doc.paragraphs 中的索引
+            max_distance: 允许的最大 body 位置差
+
+        返回:
+            表格序号（doc.tables 中的下标），没有时返回None
+        """
+        if not 0 <= paragraph_index < len(self.paragraph_positions):
+            return None
+        position = self.paragraph_positions[paragraph_index]
+        table_position = self._next_table[position]
+        if table_position is None or table_position - position > max_distance:
+            return None
+        return self.slots[table_position][1]
+
+    def table(self, table_ordinal: Optional[int]):
+        """按序号取 Table 对象"""
+        if table_ordinal is None or not 0 <= table_ordinal < len(self.tables):
+            return None
+        return self.tables[table_ordinal]
+
+
+def build_body_index(doc) -> BodyIndex:
+    """
+    遍历一次正文，建立段落/表格顺序索引
+
+    参数:
+        doc: Document对象
+
+    返回:
+        BodyIndex 对象
+    """
+    return BodyIndex(doc)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+=== 引用检查公共模块 ===
+
+【功能说明】
+CrossRef_detect（图、表、公式引用）与 References_detect（参考文献引用）共用的部分：
+    - expand_number_list()：展开引用中的编号列表与范围写法（Figs. 2-4、[3-5]、[1, 4]）
+    - iter_first_mention_order()：按编号递增检查首次引用位置是否也递增
+    - section_result()：组装 {ok, messages, items} 形式的检查结果
+"""
+
+import re
+
+NUMBER_TOKEN_RE = re.compile(r'\d+|[-–~至]|\bto\b')
+# 范围写法展开的最大跨度，超过时按两个独立编号处理（避免 "Fig. 1-100" 之类的误展开）
+MAX_RANGE_SPAN = 50
+
+
+def expand_number_list(spec, max_range_span=MAX_RANGE_SPAN, allow_list=True, max_list_gap=None):
+    """
+    展开引用中的编号列表
+
+    参数:
+        spec: 编号部分文本，如 "2 and 3"、"2-4"、"(1)~(3)"、"1, 4"
+        max_range_span: 范围写法展开的最大跨度
+        allow_list: 是否接受逗号、and 等列表写法（单数前缀 "Fig. 3, 40 samples" 中的 40 不是图号）
+        max_list_gap: 列表中相邻编号的最大差值，超过时（如 "Tables 2 and 2019" 中的年份）
+            视为引用已结束；为None时不限制
+
+    返回:
+        编号列表，如 [2, 3]、[2, 3, 4]、[1, 2, 3]、[1, 4]
+    """
+    numbers = []
+    pending_range = False
+    for token in NUMBER_TOKEN_RE.findall(spec):
+        if token.isdigit():
+            number = int(token)
+            if pending_range and numbers and 0 < number - numbers[-1] <= max_range_span:
+                numbers.extend(range(numbers[-1] + 1, number + 1))
+            elif numbers and not pending_range and (
+                    not allow_list or
+                    (max_list_gap is not None and not 0 < abs(number - numbers[-1]) <= max_list_gap)):
+                break  # 不是列表中的编号，其后的内容不属于本次引用
+            else:
+                numbers.append(number)
+            pending_range = False
+        else:
+            pending_range = True
+    return numbers
+
+
+def iter_first_mention_order(numbers, first_mentions):
+    """
+    按编号递增遍历被引用的编号，检查首次引用位置是否也递增
+
+    参数:
+        numbers: 已定义的编号（图表编号或参考文献编号）
+        first_mentions: 编号 -> 首次引用位置 (段落索引, 起始位置)
+
+    返回:
+        生成 (编号, 首次引用位置, 更早的引用)；首次引用早于前面编号时，
+        更早的引用为 (该编号的首次引用位置, 编号)，否则为None
+    """
+    latest = None  # (首次引用位置, 编号)
+    for number in sorted(number for number in numbers if number in first_mentions):
+        position = first_mentions[number]
+        if latest is not None and position < latest[0]:
+            yield number, position, latest
+        else:
+            latest = (position, number)
+            yield number, position, None
+
+
+def section_result(items, ok_message):
+    """组装 {ok, messages, items} 形式的检查结果"""
+    if items:
+        return {'ok': False, 'messages': [item['message'] for item in items], 'items': items}
+    return {'ok': True, 'messages': [ok_message], 'items': []}
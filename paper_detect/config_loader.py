@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+=== 配置加载模块 ===
+
+【功能说明】
+读取项目根目录下的 config_api.py（API密钥、模型与图片内容检测配置）。
+config_api.py 不存在或缺少某一项时使用默认值，因此该文件可以不提交到版本控制。
+
+构造 FigureContentDetector 时显式传入的参数（如命令行选项）优先于这里的配置。
+
+使用方法：
+    python paper_detect/config_loader.py    # 显示当前加载的配置
+"""
+
+import importlib.util
+import os
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(PROJECT_ROOT, 'config_api.py')
+
+
+class DetectionConfig:
+    """config_api.py 中的配置（未配置的项为默认值）"""
+
+    def __init__(self, path: str = CONFIG_PATH):
+        self.path = path
+        self.loaded = False
+        self.found = False
+
+        self.api_key = None
+        self.api_base = "https://api.siliconflow.cn/v1"
+        self.model = "Qwen/Qwen3-VL-32B-Instruct"
+        self.enable_content_check = False
+        self.save_images = False
+        self.image_dir = "extracted_figures"
+
+        # 图片API录制/回放
+        self.cassette_mode = 'off'
+        self.cassette_path = "api_results/figure_api_cassette.jsonl"
+
+        # 本地图表预分类
+        self.preclassify = True
+        self.preclassify_thresholds = {}
+
+        # 多图批量请求
+        self.batch_size = 1
+        self.max_batch_bytes = 8 * 1024 * 1024
+
+        # 模型级联
+        self.cascade_model = None
+        self.cascade_min_confidence = 0.8
+
+        # 单个文档的图片API预算（0 表示不限）
+        self.budget = {'max_calls': 0, 'max_tokens': 0, 'max_seconds': 0}
+
+    def load(self, verbose: bool = False):
+        """
+        读取配置文件（只读取一次）
+
+        参数:
+            verbose: 是否打印加载结果
+
+        返回:
+            配置对象本身
+        """
+        if self.loaded:
+            return self
+        self.loaded = True
+        if not os.path.isfile(self.path):
+            if verbose:
+                print("警告: 未找到配置文件 (config_api.py)")
+            return self
+
+        spec = importlib.util.spec_from_file_location('config_api', self.path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        self.found = True
+        if verbose:
+            print(f"✓ 已加载配置文件: {self.path}")
+
+        def value(name, default):
+            return getattr(module, name, default)
+
+        self.api_key = value('SILICONFLOW_API_KEY', self.api_key) or None
+        self.api_base = value('SILICONFLOW_API_BASE', self.api_base)
+        self.model = value('SILICONFLOW_MODEL', self.model)
+        self.enable_content_check = value('ENABLE_FIGURE_CONTENT_CHECK', self.enable_content_check)
+        self.save_images = value('SAVE_EXTRACTED_IMAGES', self.save_images)
+        self.image_dir = value('EXTRACTED_IMAGES_DIR', self.image_dir)
+        self.cassette_mode = value('FIGURE_API_CASSETTE_MODE', self.cassette_mode) or 'off'
+        self.cassette_path = value('FIGURE_API_CASSETTE_PATH', self.cassette_path)
+        self.preclassify = value('FIGURE_PRECLASSIFY_ENABLED', self.preclassify)
+        self.preclassify_thresholds = dict(value('FIGURE_PRECLASSIFY_THRESHOLDS', self.preclassify_thresholds) or {})
+        self.batch_size = value('FIGURE_API_BATCH_SIZE', self.batch_size)
+        self.max_batch_bytes = value('FIGURE_API_MAX_BATCH_BYTES', self.max_batch_bytes)
+        self.cascade_model = value('SILICONFLOW_CASCADE_MODEL', self.cascade_model) or None
+        self.cascade_min_confidence = value('FIGURE_CASCADE_MIN_CONFIDENCE', self.cascade_min_confidence)
+        self.budget = {
+            'max_calls': value('FIGURE_API_MAX_CALLS', 0),
+            'max_tokens': value('FIGURE_API_MAX_TOKENS', 0),
+            'max_seconds': value('FIGURE_API_MAX_SECONDS', 0),
+        }
+        return self
+
+    def print_summary(self):
+        """打印当前配置（API密钥只显示前20个字符）"""
+        print("配置项:")
+        print(f"  API密钥: {self.api_key[:20] + '...' if self.api_key else '(未设置)'}")
+        print(f"  API基础URL: {self.api_base}")
+        print(f"  模型名称: {self.model}")
+        print(f"  启用内容检测: {self.enable_content_check}")
+        print(f"  保存图片: {self.save_images}")
+        print(f"  图片目录: {self.image_dir}")
+        print(f"  API cassette: {self.cassette_mode} ({self.cassette_path})")
+        print(f"  图表预分类: {self.preclassify} {self.preclassify_thresholds or ''}")
+        print(f"  批量请求: 每批最多 {self.batch_size} 张图片，{self.max_batch_bytes} 字节")
+        print(f"  模型级联: {self.cascade_model or '(未启用)'}，置信度阈值 {self.cascade_min_confidence}")
+        limits = [f"{key}={value}" for key, value in self.budget.items() if value]
+        print(f"  API预算: {', '.join(limits) if limits else '不限'}")
+
+
+_CONFIG = None
+
+
+def get_config(reload: bool = False) -> DetectionConfig:
+    """
+    获取全局配置对象（调用 load() 时读取 config_api.py）
+
+    参数:
+        reload: 为True时丢弃已读取的配置，下次 load() 重新读取文件
+
+    返回:
+        DetectionConfig 对象
+    """
+    global _CONFIG
+    if _CONFIG is None or reload:
+        _CONFIG = DetectionConfig()
+    return _CONFIG
+
+
+def get_api_key():
+    """配置文件中的API密钥，未配置时返回None"""
+    return get_config().load().api_key
+
+
+if __name__ == '__main__':
+    get_config().load(verbose=True).print_summary()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+=== 图片内容寻址存储模块 ===
+
+【功能说明】
+1. 图片按内容哈希（sha256）保存：<image_dir>/<sha256>.<ext>
+   - 同一张图片（如多篇论文/多个修订版中重复使用的图标、插图）只保存一次
+   - 文件名只取决于图片内容，与段落对象、运行次数无关，结果稳定
+
+2. 索引文件 <image_dir>/index.json
+   - documents: 文档名 -> {图片编号: sha256}
+   - blobs: sha256 -> {文件名、字节数、最近一次分析结果}
+   - 分析结果带有签名（模型 + 提示词），签名一致时可按内容直接复用
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Optional
+
+
+def content_hash(image_bytes: bytes) -> str:
+    """返回图片字节的 sha256 十六进制摘要"""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+class FigureStore:
+    """按内容哈希保存图片，并维护 文档/图片编号 -> 哈希 的索引"""
+
+    INDEX_NAME = 'index.json'
+
+    def __init__(self, image_dir):
+        """
+        初始化存储
+
+        参数:
+            image_dir: 图片保存目录
+        """
+        self.image_dir = Path(image_dir)
+        self.image_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.image_dir / self.INDEX_NAME
+        self.index = {'documents': {}, 'blobs': {}}
+        self._dirty = False
+
+        if self.index_path.is_file():
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    loaded = json.load(f)
+                self.index['documents'].update(loaded.get('documents', {}))
+                self.index['blobs'].update(loaded.get('blobs', {}))
+            except (OSError, ValueError) as e:
+                print(f"  ✗ 图片索引读取失败，将重建: {e}")
+
+    def store(self, image_bytes: bytes, ext: str, digest: str = None) -> Path:
+        """
+        保存图片（内容已存在时不重复写入）
+
+        参数:
+            image_bytes: 图片字节
+            ext: 扩展名（不含点）
+            digest: 预先计算的 sha256（可选）
+
+        返回:
+            图片文件路径
+        """
+        digest = digest or content_hash(image_bytes)
+        image_path = self.image_dir / f"{digest}.{ext}"
+        if not image_path.exists():
+            with open(image_path, 'wb') as f:
+                f.write(image_bytes)
+
+        blob = self.index['blobs'].setdefault(digest, {})
+        if blob.get('file') != image_path.name:
+            blob['file'] = image_path.name
+            blob['size'] = len(image_bytes)
+            self._dirty = True
+        return image_path
+
+    def register(self, doc_name: str, figure_key: str, digest: str):
+        """
+        记录文档中某张图片对应的内容哈希
+
+        参数:
+            doc_name: 文档名（不含扩展名）
+            figure_key: 图片编号（字符串）
+            digest: 图片 sha256
+        """
+        figures = self.index['documents'].setdefault(doc_name, {})
+        if figures.get(figure_key) != digest:
+            figures[figure_key] = digest
+            self._dirty = True
+
+    def cached_analysis(self, digest: str, signature: str) -> Optional[Dict]:
+        """
+        按内容查找已有的分析结果
+
+        参数:
+            digest: 图片 sha256
+            signature: 分析签名（模型 + 提示词），不一致时不复用
+
+        返回:
+            分析结果字典或None
+        """
+        blob = self.index['blobs'].get(digest, {})
+        if blob.get('analysis_signature') == signature:
+            return blob.get('analysis')
+        return None
+
+    def save_analysis(self, digest: str, signature: str, analysis: Dict):
+        """
+        保存某张图片的分析结果
+
+        参数:
+            digest: 图片 sha256
+            signature: 分析签名
+            analysis: 分析结果（需可JSON序列化）
+        """
+        blob = self.index['blobs'].setdefault(digest, {})
+        blob['analysis_signature'] = signature
+        blob['analysis'] = analysis
+        self._dirty = True
+
+    def flush(self):
+        """把索引写回磁盘（无变化时跳过）"""
+        if not self._dirty:
+            return
+        tmp_path = self.index_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, ensure_ascii=False, indent=2)
+        tmp_path.replace(self.index_path)
+        self._dirty = False
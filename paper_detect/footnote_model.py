@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+=== 脚注模型模块 ===
+
+【功能说明】
+每个文档只读取一次 footnotes.xml（直接使用 python-docx 已解析好的 lxml 树，
+不再对 blob 做 UTF-8 解码和第二次解析），整理为脚注模型：
+
+    - 每个脚注的 id、段落文本列表、run 列表（文本、斜体、字号、ascii 字体）与纯文本
+    - 脚注中按文档顺序出现的第一个字号 / ascii 字体设置
+    - 用一个带命名分组的组合正则扫描一遍脚注文本，把脚注归入
+      received / foundation / correspondence / citation 类别
+    - 用 Aho–Corasick 自动机扫描一遍脚注文本，找出各字段的常见拼写错误
+      （structure_rules.footnote_misspellings，条目数量不影响扫描耗时）
+
+check_footnote_structure 与 check_footnote_format 共用同一个模型。
+"""
+
+import re
+import weakref
+from typing import Dict, List, Optional
+
+from lxml import etree
+
+try:
+    from paper_detect.phrase_matcher import PhraseMatcher
+except ImportError:
+    from phrase_matcher import PhraseMatcher
+
+try:
+    from paper_detect.ooxml import W_P, W_R, W_T, W_VAL, w_tag
+except ImportError:
+    from ooxml import W_P, W_R, W_T, W_VAL, w_tag
+
+W_FOOTNOTE = w_tag('footnote')
+W_I = w_tag('i')
+W_SZ = w_tag('sz')
+W_RFONTS = w_tag('rFonts')
+W_ID = w_tag('id')
+W_ASCII = w_tag('ascii')
+
+# 分隔符与延续分隔符脚注
+SEPARATOR_IDS = ('-1', '0')
+
+# 脚注类别 -> (structure_rules 中的键, 默认正则)
+FOOTNOTE_CATEGORIES = (
+    ('received', 'footnote_received_pattern', r'Received date\s*:'),
+    ('foundation', 'footnote_foundation_pattern', r'Foundation item\s*:'),
+    ('correspondence', 'footnote_correspondence_pattern', r'\*\s*Correspondence should be addressed to'),
+    ('citation', 'footnote_citation_pattern', r'Citation\s*:'),
+)
+
+# 各类别字段的正确写法（模板未配置 footnote_field_names 时使用）
+FIELD_NAMES = {
+    'received': 'Received date',
+    'foundation': 'Foundation item',
+    'correspondence': 'Correspondence',
+    'citation': 'Citation',
+}
+
+# 模板未配置 footnote_misspellings 时使用的常见拼写错误
+DEFAULT_MISSPELLINGS = {
+    'received': ['Receive date:'],
+    'foundation': ['Foundation items:'],
+    'correspondence': ['* Corresponding '],
+}
+
+
+class FootnoteRun:
+    """脚注中的一个 run"""
+
+    __slots__ = ('text', 'italic', 'size_pt', 'font_ascii', 'element')
+
+    def __init__(self, r):
+        self.element = r
+        self.text = ''.join(t.text for t in r.iter(W_T) if t.text)
+        # 与原检测一致：run 中出现 w:i 即视为设置了斜体
+        self.italic = next(r.iter(W_I), None) is not None
+        size = next(r.iter(W_SZ), None)
+        size_val = size.get(W_VAL) if size is not None else None
+        self.size_pt = float(size_val) / 2.0 if size_val else None
+        fonts = next(r.iter(W_RFONTS), None)
+        self.font_ascii = fonts.get(W_ASCII) if fonts is not None else None
+
+
+class Footnote:
+    """一个脚注"""
+
+    __slots__ = ('id', 'paragraphs', 'runs', 'text', 'size_pt', 'font_ascii', 'categories', 'misspellings',
+                 'element')
+
+    def __init__(self, element):
+        self.element = element
+        self.id = element.get(W_ID)
+        self.paragraphs: List[str] = [
+            ''.join(t.text for t in p.iter(W_T) if t.text) for p in element.iter(W_P)
+        ]
+        self.runs: List[FootnoteRun] = [FootnoteRun(r) for r in element.iter(W_R)]
+        self.text = ''.join(t.text for t in element.iter(W_T) if t.text)
+
+        # 按文档顺序第一个带取值的字号 / ascii 字体（含段落标记的 run 属性）
+        self.size_pt: Optional[float] = None
+        for sz in element.iter(W_SZ):
+            if sz.get(W_VAL):
+                self.size_pt = float(sz.get(W_VAL)) / 2.0
+                break
+        self.font_ascii: Optional[str] = None
+        for fonts in element.iter(W_RFONTS):
+            if fonts.get(W_ASCII):
+                self.font_ascii = fonts.get(W_ASCII)
+                break
+
+        self.categories = set()
+        self.misspellings: Dict[str, str] = {}   # 类别 -> 文本中第一处错误写法
+
+    def runs_containing(self, text: str) -> List[FootnoteRun]:
+        """文本中包含 text 的 run"""
+        return [run for run in self.runs if text in run.text]
+
+
+class FootnoteModel:
+    """文档的全部脚注（不含分隔符脚注）"""
+
+    def __init__(self, root=None):
+        self.found = root is not None
+        self.total = 0                      # footnotes.xml 中的脚注总数（含分隔符）
+        self.footnotes: List[Footnote] = []
+        self.pattern_key = None
+        if root is None:
+            return
+        for element in root.iter(W_FOOTNOTE):
+            self.total += 1
+            if element.get(W_ID) in SEPARATOR_IDS:
+                continue
+            self.footnotes.append(Footnote(element))
+
+    def __iter__(self):
+        return iter(self.footnotes)
+
+    def __len__(self):
+        return len(self.footnotes)
+
+    def classify(self, structure_rules: dict):
+        """
+        扫描每个脚注的文本，记录其所属类别与各字段的拼写错误
+
+        参数:
+            structure_rules: 模板中的 structure_rules
+        """
+        patterns = tuple(structure_rules.get(key, default) for _, key, default in FOOTNOTE_CATEGORIES)
+        misspellings = structure_rules.get('footnote_misspellings', DEFAULT_MISSPELLINGS)
+        pattern_key = (patterns, tuple((category, tuple(variants)) for category, variants in misspellings.items()))
+        if pattern_key == self.pattern_key:
+            return
+        combined = re.compile('|'.join(
+            f'(?P<{category}>{pattern})'
+            for (category, _, _), pattern in zip(FOOTNOTE_CATEGORIES, patterns)
+        ), re.IGNORECASE)
+        matcher = PhraseMatcher()
+        for category, variants in misspellings.items():
+            for variant in variants:
+                # 报告中显示的错误写法去掉首尾的星号、冒号和空白
+                matcher.add(variant, (category, variant.strip(' *:：')))
+
+        for footnote in self.footnotes:
+            footnote.categories = {
+                name
+                for match in combined.finditer(footnote.text)
+                for name, value in match.groupdict().items() if value is not None
+            }
+            found = {}
+            for start, end, (category, written) in matcher.finditer(footnote.text):
+                # 同一字段取最靠前的错误写法，起点相同时取较长的
+                if category not in found or (start, -end) < found[category][:2]:
+                    found[category] = (start, -end, written)
+            footnote.misspellings = {category: item[2] for category, item in found.items()}
+        self.pattern_key = pattern_key
+
+    def by_category(self, category: str) -> List[Footnote]:
+        """属于某一类别的脚注"""
+        return [footnote for footnote in self.footnotes if category in footnote.categories]
+
+
+def _footnotes_root(doc):
+    """footnotes.xml 的根元素，文档没有脚注部件时返回None"""
+    rels = doc.part.rels
+    for rel in rels.values():
+        if rel.is_external or 'footnotes.xml' not in rel.target_ref:
+            continue
+        part = rel.target_part
+        element = getattr(part, 'element', None)
+        if element is not None:
+            return element
+        # 未注册为 XmlPart 的部件：lxml 直接解析字节，不做解码
+        return etree.fromstring(part.blob)
+    return None
+
+
+_MODELS: Dict = weakref.WeakKeyDictionary()
+
+
+def get_footnote_model(doc, tpl: dict = None) -> FootnoteModel:
+    """
+    获取文档的脚注模型（每个文档只解析一次 footnotes.xml）
+
+    参数:
+        doc: Document对象
+        tpl: 模板字典；提供时按其中的 structure_rules 对脚注分类
+
+    返回:
+        FootnoteModel 对象
+    """
+    part = doc.part
+    model = _MODELS.get(part)
+    if model is None:
+        model = FootnoteModel(_footnotes_root(doc))
+        _MODELS[part] = model
+    if tpl is not None:
+        model.classify(tpl.get('structure_rules', {}))
+    return model
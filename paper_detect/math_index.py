@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+=== 文档公式索引模块 ===
+
+【功能说明】
+对文档正文做一次遍历，找出所有公式对象并归属到所在段落：
+    - m:oMath       Office Math 公式
+    - m:oMathPara   独立成段的公式容器（其中包含 m:oMath）
+    - w:object      嵌入对象（公式编辑器 3.0 / MathType 等，progId 含 Equation 或 MathType）
+
+Formula_detect 只需检查索引中的候选段落，不再对每个段落分别执行多次 xpath 查询。
+"""
+
+from typing import Dict, List
+
+try:
+    from paper_detect.ooxml import O_NS, W_R, m_tag, owner_paragraph, w_tag
+except ImportError:
+    from ooxml import O_NS, W_R, m_tag, owner_paragraph, w_tag
+
+W_OBJECT = w_tag('object')
+W_PROG_ID = w_tag('progId')
+M_OMATH = m_tag('oMath')
+M_OMATH_PARA = m_tag('oMathPara')
+O_OLE_OBJECT = f'{{{O_NS}}}OLEObject'
+
+EQUATION_PROG_IDS = ('Equation', 'MathType')
+
+
+class MathEntry:
+    """一个公式对象在文档中的位置与类型"""
+
+    __slots__ = ('element', 'kind', 'paragraph_index', 'is_equation')
+
+    def __init__(self, element, kind: str, paragraph_index: int, is_equation: bool = True):
+        self.element = element
+        self.kind = kind                        # 'office_math' / 'math_para' / 'embedded_object'
+        self.paragraph_index = paragraph_index
+        self.is_equation = is_equation          # 嵌入对象是否为公式对象（progId 含 Equation/MathType）
+
+
+class MathIndex:
+    """文档中所有公式对象的索引"""
+
+    def __init__(self, entries: List[MathEntry]):
+        self.entries = entries
+        self.by_paragraph: Dict[int, List[MathEntry]] = {}
+        for entry in entries:
+            self.by_paragraph.setdefault(entry.paragraph_index, []).append(entry)
+
+    def office_math(self, paragraph_index: int) -> List:
+        """段落中的 m:oMath 元素（文档顺序）"""
+        return [entry.element for entry in self.by_paragraph.get(paragraph_index, ())
+                if entry.kind == 'office_math']
+
+    def equation_objects(self, paragraph_index: int) -> List:
+        """段落中的 m:oMath 与公式类嵌入对象（用于判断是否为公式段落）"""
+        return [entry.element for entry in self.by_paragraph.get(paragraph_index, ())
+                if entry.kind == 'office_math' or (entry.kind == 'embedded_object' and entry.is_equation)]
+
+    def math_elements(self, paragraph_index: int) -> List:
+        """段落中的 m:oMath 与所有嵌入对象（m:oMath 在前，与 detect_math_objects 的顺序一致）"""
+        entries = self.by_paragraph.get(paragraph_index, ())
+        return ([entry.element for entry in entries if entry.kind == 'office_math'] +
+                [entry.element for entry in entries if entry.kind == 'embedded_object'])
+
+
+def is_equation_object(object_element) -> bool:
+    """判断 w:object 是否为公式对象（progId 可能在 w:object 上，也可能在 o:OLEObject 上）"""
+    prog_id = object_element.get(W_PROG_ID) or ''
+    if not prog_id:
+        ole = object_element.find(O_OLE_OBJECT)
+        prog_id = ole.get('ProgID', '') if ole is not None else ''
+    return any(name in prog_id for name in EQUATION_PROG_IDS)
+
+
+def build_math_index(doc, paragraphs=None) -> MathIndex:
+    """
+    遍历一次正文，建立公式对象索引
+
+    参数:
+        doc: Document对象
+        paragraphs: 已物化的 doc.paragraphs 列表（可选，避免重复构建）
+
+    返回:
+        MathIndex 对象
+    """
+    paragraphs = paragraphs if paragraphs is not None else doc.paragraphs
+    paragraph_positions = {p._element: i for i, p in enumerate(paragraphs)}
+
+    entries = []
+    for element in doc.element.body.iter(M_OMATH, M_OMATH_PARA, W_OBJECT):
+        tag = element.tag
+        if tag == W_OBJECT:
+            parent = element.getparent()
+            if parent is None or parent.tag != W_R:
+                continue
+            kind = 'embedded_object'
+        else:
+            kind = 'office_math' if tag == M_OMATH else 'math_para'
+
+        position = owner_paragraph(element, paragraph_positions)
+        if position is None:
+            continue  # 表格、文本框内的公式不在 doc.paragraphs 中
+        is_equation = is_equation_object(element) if kind == 'embedded_object' else True
+        entries.append(MathEntry(element, kind, position, is_equation))
+
+    return MathIndex(entries)
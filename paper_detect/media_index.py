@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+=== 文档媒体索引模块 ===
+
+【功能说明】
+对文档正文做一次遍历，记录每个图片对象的：
+    - 所在段落索引（doc.paragraphs 中的位置）
+    - 图片关系ID（a:blip 的 r:embed / v:imagedata 的 r:id）
+    - 显示尺寸（wp:extent，单位EMU）
+    - 类型：inline（嵌入型）、anchor（浮动型）、vml（旧格式）
+    - 下方最近的图片标题段落
+
+Figure_detect 与 Figure_content_detect 都从该索引取数据，
+不再对每个段落分别执行多次 xpath 查询，查找图片的代价与检测项数量无关。
+"""
+
+import re
+from typing import Dict, List
+
+try:
+    from paper_detect.ooxml import A_NS, R_NS, V_NS, WP_NS, owner_paragraph, w_tag
+except ImportError:
+    from ooxml import A_NS, R_NS, V_NS, WP_NS, owner_paragraph, w_tag
+
+W_DRAWING = w_tag('drawing')
+W_PICT = w_tag('pict')
+A_BLIP = f'{{{A_NS}}}blip'
+V_IMAGEDATA = f'{{{V_NS}}}imagedata'
+WP_INLINE = f'{{{WP_NS}}}inline'
+WP_ANCHOR = f'{{{WP_NS}}}anchor'
+WP_EXTENT = f'{{{WP_NS}}}extent'
+R_EMBED = f'{{{R_NS}}}embed'
+R_LINK = f'{{{R_NS}}}link'
+R_ID = f'{{{R_NS}}}id'
+
+
+class MediaEntry:
+    """一个图片对象在文档中的位置与属性"""
+
+    __slots__ = ('paragraph', 'paragraph_index', 'rel_id', 'extent', 'kind',
+                 'caption_index', 'caption_match')
+
+    def __init__(self, paragraph, paragraph_index: int, kind: str, extent=None):
+        self.paragraph = paragraph
+        self.paragraph_index = paragraph_index
+        self.kind = kind            # 'inline' / 'anchor' / 'vml' / 'blip'
+        self.extent = extent        # (cx, cy)，单位EMU；未知时为None
+        self.rel_id = None
+        self.caption_index = None
+        self.caption_match = None
+
+
+class MediaIndex:
+    """文档中所有图片对象的索引"""
+
+    def __init__(self, entries: List[MediaEntry]):
+        self.entries = entries
+        self.by_paragraph: Dict[int, List[MediaEntry]] = {}
+        for entry in entries:
+            self.by_paragraph.setdefault(entry.paragraph_index, []).append(entry)
+
+    def picture_paragraphs(self) -> List[MediaEntry]:
+        """返回每个包含图片的段落中的第一个图片对象（按文档顺序）"""
+        return [entries[0] for _, entries in sorted(self.by_paragraph.items())]
+
+    def has_picture(self, paragraph_index: int) -> bool:
+        """判断指定段落是否包含图片对象"""
+        return paragraph_index in self.by_paragraph
+
+
+def build_media_index(doc, caption_pattern: str = None, paragraphs=None,
+                      caption_distance: int = 2) -> MediaIndex:
+    """
+    遍历一次正文，建立图片对象索引
+
+    参数:
+        doc: Document对象
+        caption_pattern: 图片标题正则（提供时为每个图片查找下方的标题段落）
+        paragraphs: 已物化的 doc.paragraphs 列表（可选，避免重复构建）
+        caption_distance: 图片下方查找标题的最大段落数
+
+    返回:
+        MediaIndex 对象
+    """
+    paragraphs = paragraphs if paragraphs is not None else doc.paragraphs
+    paragraph_positions = {p._element: i for i, p in enumerate(paragraphs)}
+
+    entries = []
+    current = None  # 最近一个 w:drawing / w:pict 条目，其后的 blip/imagedata 归属于它
+
+    for element in doc.element.body.iter(W_DRAWING, W_PICT, A_BLIP, V_IMAGEDATA):
+        tag = element.tag
+
+        if tag == W_DRAWING or tag == W_PICT:
+            position = owner_paragraph(element, paragraph_positions)
+            if position is None:
+                current = None  # 表格、文本框内的图片不在 doc.paragraphs 中
+                continue
+
+            if tag == W_DRAWING:
+                extent = None
+                kind = 'inline'
+                if len(element):
+                    container = element[0]
+                    kind = 'anchor' if container.tag == WP_ANCHOR else 'inline'
+                    extent_el = container.find(WP_EXTENT)
+                    if extent_el is not None:
+                        try:
+                            extent = (int(extent_el.get('cx', 0)), int(extent_el.get('cy', 0)))
+                        except ValueError:
+                            extent = None
+                current = MediaEntry(paragraphs[position], position, kind, extent)
+            else:
+                current = MediaEntry(paragraphs[position], position, 'vml')
+            current_element = element
+            entries.append(current)
+            continue
+
+        # a:blip / v:imagedata：补充所属图片对象的关系ID
+        rel_id = (element.get(R_EMBED) or element.get(R_LINK)) if tag == A_BLIP else element.get(R_ID)
+        if current is not None and current.rel_id is None and _is_descendant(element, current_element):
+            current.rel_id = rel_id
+            continue
+
+        position = owner_paragraph(element, paragraph_positions)
+        if position is None:
+            continue
+        entry = MediaEntry(paragraphs[position], position, 'blip' if tag == A_BLIP else 'vml')
+        entry.rel_id = rel_id
+        entries.append(entry)
+
+    index = MediaIndex(entries)
+
+    # 为每个图片段落查找下方的标题
+    if caption_pattern:
+        compiled = re.compile(caption_pattern, re.IGNORECASE)
+        for position, position_entries in index.by_paragraph.items():
+            for i in range(position + 1, min(position + 1 + caption_distance, len(paragraphs))):
+                match = compiled.match(paragraphs[i].text.strip())
+                if match:
+                    for entry in position_entries:
+                        entry.caption_index = i
+                        entry.caption_match = match
+                    break
+
+    return index
+
+
+def _is_descendant(element, ancestor) -> bool:
+    """判断 element 是否位于 ancestor 之内"""
+    node = element.getparent()
+    while node is not None:
+        if node is ancestor:
+            return True
+        node = node.getparent()
+    return False
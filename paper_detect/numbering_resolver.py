@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+=== Word 自动编号解析模块 ===
+
+【功能说明】
+一次性解析 numbering.xml（抽象编号定义、级别覆盖、起始值）与样式中的编号设置，
+再按文档顺序遍历一次段落，计算每个段落在 Word 中实际显示的编号，例如：
+    - lvlText "%1.%2" 的二级段落显示为 "1.2"
+    - 级别计数遇到更高级别时按 lvlRestart 规则重新开始
+    - w:num 的 startOverride 使该编号实例重新从指定值开始
+
+Content_detect 的标题识别与编号连续性检查直接查表，不再逐段落解析 numPr。
+"""
+
+import re
+import weakref
+from typing import Dict, List, Optional
+
+try:
+    from paper_detect.ooxml import MC_NS, W_P, W_VAL, w_tag
+except ImportError:
+    from ooxml import MC_NS, W_P, W_VAL, w_tag
+
+MC_FALLBACK = f'{{{MC_NS}}}Fallback'
+
+MAX_LEVELS = 9
+
+ROMAN_NUMERALS = [
+    (1000, 'M'), (900, 'CM'), (500, 'D'), (400, 'CD'), (100, 'C'), (90, 'XC'),
+    (50, 'L'), (40, 'XL'), (10, 'X'), (9, 'IX'), (5, 'V'), (4, 'IV'), (1, 'I')
+]
+CHINESE_DIGITS = '零一二三四五六七八九'
+LEADING_NUMBER_RE = re.compile(r'\d+(?:\.\d+)*')
+
+
+def _int_val(element, default=None):
+    """读取元素的 w:val 整数值"""
+    if element is None:
+        return default
+    try:
+        return int(element.get(W_VAL))
+    except (TypeError, ValueError):
+        return default
+
+
+def _to_roman(value: int) -> str:
+    result = []
+    for number, numeral in ROMAN_NUMERALS:
+        while value >= number:
+            result.append(numeral)
+            value -= number
+    return ''.join(result)
+
+
+def _to_letter(value: int) -> str:
+    # Word 的字母编号：A..Z, AA..ZZ, AAA...
+    if value <= 0:
+        return ''
+    letter = chr(ord('A') + (value - 1) % 26)
+    return letter * ((value - 1) // 26 + 1)
+
+
+def _to_chinese(value: int) -> str:
+    if value < 10:
+        return CHINESE_DIGITS[value]
+    if value < 100:
+        tens, ones = divmod(value, 10)
+        return ('' if tens == 1 else CHINESE_DIGITS[tens]) + '十' + (CHINESE_DIGITS[ones] if ones else '')
+    return str(value)
+
+
+def format_counter(value: int, num_fmt: str) -> str:
+    """
+    按 numFmt 格式化计数值
+
+    参数:
+        value: 计数值
+        num_fmt: w:numFmt 的取值（decimal、upperRoman、lowerLetter 等）
+
+    返回:
+        格式化后的字符串；不认识的格式按 decimal 处理
+    """
+    if num_fmt == 'none':
+        return ''
+    if num_fmt == 'decimalZero':
+        return f'{value:02d}'
+    if num_fmt == 'upperRoman':
+        return _to_roman(value)
+    if num_fmt == 'lowerRoman':
+        return _to_roman(value).lower()
+    if num_fmt == 'upperLetter':
+        return _to_letter(value)
+    if num_fmt == 'lowerLetter':
+        return _to_letter(value).lower()
+    if num_fmt in ('chineseCounting', 'chineseCountingThousand', 'chineseLegalSimplified'):
+        return _to_chinese(value)
+    return str(value)
+
+
+class LevelDefinition:
+    """抽象编号中一个级别（w:lvl）的定义"""
+
+    __slots__ = ('start', 'num_fmt', 'lvl_text', 'restart', 'is_legal', 'p_style')
+
+    def __init__(self, lvl_element=None):
+        self.start = 1
+        self.num_fmt = 'decimal'
+        self.lvl_text = ''
+        self.restart = None     # lvlRestart：None 表示默认（任一更高级别出现时重新开始），0 表示从不重新开始
+        self.is_legal = False
+        self.p_style = None
+        if lvl_element is not None:
+            self.start = _int_val(lvl_element.find(w_tag('start')), 1)
+            num_fmt = lvl_element.find(w_tag('numFmt'))
+            if num_fmt is not None and num_fmt.get(W_VAL):
+                self.num_fmt = num_fmt.get(W_VAL)
+            lvl_text = lvl_element.find(w_tag('lvlText'))
+            if lvl_text is not None:
+                self.lvl_text = lvl_text.get(W_VAL) or ''
+            self.restart = _int_val(lvl_element.find(w_tag('lvlRestart')))
+            is_legal = lvl_element.find(w_tag('isLgl'))
+            self.is_legal = is_legal is not None and is_legal.get(W_VAL) not in ('0', 'false')
+            p_style = lvl_element.find(w_tag('pStyle'))
+            if p_style is not None:
+                self.p_style = p_style.get(W_VAL)
+
+
+class NumberingLabel:
+    """一个段落的实际显示编号"""
+
+    __slots__ = ('num_id', 'ilvl', 'label', 'number', 'num_fmt')
+
+    def __init__(self, num_id: str, ilvl: int, label: str, number: str, num_fmt: str):
+        self.num_id = num_id
+        self.ilvl = ilvl
+        self.label = label          # 按 lvlText 渲染的编号，如 "1.2."、"(a)"
+        self.number = number        # 数字编号，如 "1.2"（项目符号或无编号格式时为None）
+        self.num_fmt = num_fmt
+
+    def __repr__(self):
+        return f"NumberingLabel(num_id={self.num_id!r}, ilvl={self.ilvl}, label={self.label!r})"
+
+
+class NumberingResolver:
+    """numbering.xml 解析结果与按文档顺序计算的段落编号"""
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.abstract_levels: Dict[str, Dict[int, LevelDefinition]] = {}
+        self.num_abstract: Dict[str, str] = {}
+        self.num_start_overrides: Dict[str, Dict[int, int]] = {}
+        self.num_level_overrides: Dict[str, Dict[int, LevelDefinition]] = {}
+        self.style_numbering: Dict[str, tuple] = {}
+        self.default_style_id = None
+        self._labels: Optional[Dict] = None
+
+        self._parse_numbering()
+        self._parse_styles()
+
+    # ---------- 解析 ----------
+
+    def _parse_numbering(self):
+        try:
+            numbering = self.doc.part.numbering_part.element
+        except (KeyError, NotImplementedError, AttributeError):
+            return  # 文档没有 numbering.xml
+
+        style_link_owner = {}
+        num_style_links = {}
+        for abstract in numbering.iterchildren(w_tag('abstractNum')):
+            abstract_id = str(_int_val_attr(abstract, w_tag('abstractNumId')))
+            self.abstract_levels[abstract_id] = {
+                _int_val_attr(lvl, w_tag('ilvl'), 0): LevelDefinition(lvl)
+                for lvl in abstract.iterchildren(w_tag('lvl'))
+            }
+            style_link = abstract.find(w_tag('styleLink'))
+            if style_link is not None:
+                style_link_owner[style_link.get(W_VAL)] = abstract_id
+            num_style_link = abstract.find(w_tag('numStyleLink'))
+            if num_style_link is not None:
+                num_style_links[abstract_id] = num_style_link.get(W_VAL)
+
+        # numStyleLink 指向编号样式，级别定义在带相同 styleLink 的抽象编号中
+        for abstract_id, style_id in num_style_links.items():
+            owner = style_link_owner.get(style_id)
+            if owner is not None and not self.abstract_levels.get(abstract_id):
+                self.abstract_levels[abstract_id] = self.abstract_levels.get(owner, {})
+
+        for num in numbering.iterchildren(w_tag('num')):
+            num_id = str(_int_val_attr(num, w_tag('numId')))
+            self.num_abstract[num_id] = _int_val_str(num.find(w_tag('abstractNumId')))
+            for override in num.iterchildren(w_tag('lvlOverride')):
+                ilvl = _int_val_attr(override, w_tag('ilvl'), 0)
+                start_override = override.find(w_tag('startOverride'))
+                if start_override is not None:
+                    self.num_start_overrides.setdefault(num_id, {})[ilvl] = _int_val(start_override, 1)
+                lvl = override.find(w_tag('lvl'))
+                if lvl is not None:
+                    self.num_level_overrides.setdefault(num_id, {})[ilvl] = LevelDefinition(lvl)
+
+    def _parse_styles(self):
+        try:
+            styles = self.doc.styles.element
+        except AttributeError:
+            return
+
+        direct = {}
+        based_on = {}
+        for style in styles.iterchildren(w_tag('style')):
+            if style.get(w_tag('type')) != 'paragraph':
+                continue
+            style_id = style.get(w_tag('styleId'))
+            if style.get(w_tag('default')) in ('1', 'true'):
+                self.default_style_id = style_id
+            parent = style.find(w_tag('basedOn'))
+            if parent is not None:
+                based_on[style_id] = parent.get(W_VAL)
+            ppr = style.find(w_tag('pPr'))
+            num_pr = ppr.find(w_tag('numPr')) if ppr is not None else None
+            if num_pr is not None:
+                num_id = _int_val_str(num_pr.find(w_tag('numId')))
+                ilvl = _int_val(num_pr.find(w_tag('ilvl')))
+                direct[style_id] = (num_id, ilvl)
+
+        # 沿 basedOn 链继承编号设置
+        for style_id in set(direct) | set(based_on):
+            current, seen = style_id, set()
+            while current is not None and current not in seen:
+                if current in direct:
+                    self.style_numbering[style_id] = direct[current]
+                    break
+                seen.add(current)
+                current = based_on.get(current)
+
+    # ---------- 查询 ----------
+
+    def _level(self, num_id: str, ilvl: int) -> LevelDefinition:
+        override = self.num_level_overrides.get(num_id, {}).get(ilvl)
+        if override is not None:
+            return override
+        levels = self.abstract_levels.get(self.num_abstract.get(num_id), {})
+        return levels.get(ilvl) or LevelDefinition()
+
+    def _style_level(self, num_id: str, style_id: str) -> int:
+        """样式编号未指定 ilvl 时，取 pStyle 与该样式关联的级别"""
+        levels = self.abstract_levels.get(self.num_abstract.get(num_id), {})
+        for ilvl, level in levels.items():
+            if level.p_style == style_id:
+                return ilvl
+        return 0
+
+    def paragraph_numbering(self, p_element):
+        """
+        读取段落（含样式继承）的编号设置
+
+        参数:
+            p_element: w:p 元素
+
+        返回:
+            (num_id, ilvl)；段落没有编号时返回None
+        """
+        ppr = p_element.pPr if hasattr(p_element, 'pPr') else p_element.find(w_tag('pPr'))
+        style_id = None
+        num_id = ilvl = None
+        if ppr is not None:
+            p_style = ppr.find(w_tag('pStyle'))
+            if p_style is not None:
+                style_id = p_style.get(W_VAL)
+            num_pr = ppr.find(w_tag('numPr'))
+            if num_pr is not None:
+                num_id = _int_val_str(num_pr.find(w_tag('numId')))
+                ilvl = _int_val(num_pr.find(w_tag('ilvl')))
+        if style_id is None:
+            style_id = self.default_style_id
+
+        if num_id is None:
+            style_num = self.style_numbering.get(style_id)
+            if style_num is None:
+                return None
+            num_id = style_num[0]
+            if ilvl is None:
+                ilvl = style_num[1] if style_num[1] is not None else self._style_level(num_id, style_id)
+
+        if num_id is None or num_id == '0' or num_id not in self.num_abstract:
+            return None
+        ilvl = ilvl if ilvl is not None else 0
+        if not 0 <= ilvl < MAX_LEVELS:
+            return None
+        return num_id, ilvl
+
+    def _resolve(self) -> Dict:
+        """按文档顺序遍历一次所有段落，计算编号"""
+        labels = {}
+        counters: Dict[str, List[Optional[int]]] = {}
+        seen_nums = set()
+
+        for p_element in self.doc.element.body.iter(W_P):
+            numbering = self.paragraph_numbering(p_element)
+            if numbering is None:
+                continue
+            if _inside_fallback(p_element):
+                continue  # 兼容内容的备用副本，Word 不会重复计数
+            num_id, ilvl = numbering
+
+            # 使用同一抽象编号的编号实例共享计数；带 startOverride 的实例首次出现时重新开始
+            key = self.num_abstract[num_id]
+            state = counters.setdefault(key, [None] * MAX_LEVELS)
+            if num_id not in seen_nums:
+                seen_nums.add(num_id)
+                for override_ilvl, start in self.num_start_overrides.get(num_id, {}).items():
+                    if 0 <= override_ilvl < MAX_LEVELS:
+                        state[override_ilvl] = start - 1
+
+            level = self._level(num_id, ilvl)
+            state[ilvl] = level.start if state[ilvl] is None else state[ilvl] + 1
+            for deeper in range(ilvl + 1, MAX_LEVELS):
+                restart = self._level(num_id, deeper).restart
+                restart = deeper if restart is None else restart
+                if restart > 0 and ilvl < restart:
+                    state[deeper] = None
+
+            values = [state[i] if state[i] is not None else self._level(num_id, i).start
+                      for i in range(ilvl + 1)]
+            label = level.lvl_text
+            for i in range(ilvl, -1, -1):
+                fmt = 'decimal' if level.is_legal else self._level(num_id, i).num_fmt
+                label = label.replace(f'%{i + 1}', format_counter(values[i], fmt))
+            number = None
+            if level.num_fmt not in ('bullet', 'none'):
+                # lvlText 可能带固定前缀（如 "3.%1"），优先取显示文本开头的数字编号
+                leading = LEADING_NUMBER_RE.match(label.strip())
+                number = leading.group(0) if leading else '.'.join(str(v) for v in values)
+            labels[p_element] = NumberingLabel(num_id, ilvl, label, number, level.num_fmt)
+
+        return labels
+
+    def label_for(self, paragraph) -> Optional[NumberingLabel]:
+        """
+        获取段落的实际显示编号
+
+        参数:
+            paragraph: Paragraph 对象或 w:p 元素
+
+        返回:
+            NumberingLabel；段落没有编号时返回None
+        """
+        if self._labels is None:
+            self._labels = self._resolve()
+        element = getattr(paragraph, '_p', paragraph)
+        return self._labels.get(element)
+
+    def labels(self, paragraphs) -> List[Optional[NumberingLabel]]:
+        """按段落列表顺序返回每个段落的编号（无编号为None）"""
+        return [self.label_for(paragraph) for paragraph in paragraphs]
+
+
+def _int_val_attr(element, attr: str, default=None):
+    try:
+        return int(element.get(attr))
+    except (TypeError, ValueError):
+        return default
+
+
+def _int_val_str(element) -> Optional[str]:
+    """读取 w:val 并规范为整数字符串（numId、abstractNumId 使用）"""
+    value = _int_val(element)
+    return str(value) if value is not None else None
+
+
+def _inside_fallback(element) -> bool:
+    node = element.getparent()
+    while node is not None:
+        if node.tag == MC_FALLBACK:
+            return True
+        node = node.getparent()
+    return False
+
+
+_RESOLVERS = weakref.WeakKeyDictionary()
+
+
+def get_numbering_resolver(doc) -> NumberingResolver:
+    """
+    获取文档的编号解析器（每个文档只解析一次 numbering.xml）
+
+    参数:
+        doc: Document对象
+
+    返回:
+        NumberingResolver 对象
+    """
+    part = doc.part
+    resolver = _RESOLVERS.get(part)
+    if resolver is None:
+        resolver = NumberingResolver(doc)
+        _RESOLVERS[part] = resolver
+    return resolver
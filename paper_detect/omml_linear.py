@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+=== OMML 公式线性化模块 ===
+
+【功能说明】
+把 Office Math（OMML）转换为 UnicodeMath 风格的线性文本，保留公式结构：
+    - 分式 m:f            →  (a+b)/c
+    - 上下标 m:sSup/m:sSub →  x^2、x_i、x_i^2
+    - 根式 m:rad          →  √(x)、∛(x)
+    - 大型运算符 m:nary    →  ∑_(i=1)^n x_i
+    - 括号 m:d、矩阵 m:m、方程组 m:eqArr 等
+
+转换时同时收集公式中的文本片段（m:r）及其字体、样式（m:sty），
+供字体与斜体检查使用，不必再次遍历公式XML。
+
+结果按元素的XML序列化缓存：同一篇论文中重复出现的公式只转换一次。
+"""
+
+import re
+from collections import OrderedDict
+from typing import List
+
+from lxml import etree
+
+try:
+    from paper_detect.ooxml import m_tag, w_tag
+except ImportError:
+    from ooxml import m_tag, w_tag
+
+M_VAL = m_tag('val')
+W_RFONTS = w_tag('rFonts')
+RFONTS_ATTRS = (w_tag('ascii'), w_tag('hAnsi'), w_tag('eastAsia'), w_tag('cs'))
+
+LINEAR_CACHE_SIZE = 1024
+_LINEAR_CACHE = OrderedDict()
+
+# 无需加括号的简单操作数：单个字符（可带组合附加符号，如 ẋ）、数字或字母串
+SIMPLE_OPERAND_RE = re.compile(r'^(?:.[\u0300-\u036f]*|[\w.]+)$')
+
+NARY_DEFAULT_CHR = '∫'
+ACCENT_DEFAULT_CHR = '̂'
+BAR_CHR = '̅'
+
+
+class MathRun:
+    """公式中的一个文本片段（m:r）"""
+
+    __slots__ = ('text', 'font', 'style', 'normal_text')
+
+    def __init__(self, text: str, font: str, style: str, normal_text: bool):
+        self.text = text
+        self.font = font            # w:rPr/w:rFonts 中的字体，未设置时为None（Word 默认 Cambria Math）
+        self.style = style          # m:sty：'p' 正体、'b' 粗体、'i' 斜体、'bi' 粗斜体；None 为默认（字母斜体）
+        self.normal_text = normal_text  # m:nor：按普通文本排版
+
+    @property
+    def is_upright(self) -> bool:
+        """是否为正体显示"""
+        return self.normal_text or self.style in ('p', 'b')
+
+
+class LinearMath:
+    """一个公式的线性文本及其文本片段"""
+
+    __slots__ = ('text', 'runs', 'fonts')
+
+    def __init__(self, text: str, runs: List[MathRun], fonts: set):
+        self.text = text
+        self.runs = runs
+        self.fonts = fonts          # 公式内出现的所有字体名称
+
+
+def _val(element, default=None):
+    return element.get(M_VAL, default) if element is not None else default
+
+
+def _prop(element, pr_tag: str, child_tag: str, default=None):
+    """读取 <xxxPr><child m:val="..."/></xxxPr> 形式的属性"""
+    pr = element.find(m_tag(pr_tag))
+    if pr is None:
+        return default
+    return _val(pr.find(m_tag(child_tag)), default)
+
+
+def _group(text: str) -> str:
+    """复合操作数加括号"""
+    return text if SIMPLE_OPERAND_RE.match(text) else f'({text})'
+
+
+class _Converter:
+    """OMML → 线性文本（一次遍历，同时收集文本片段）"""
+
+    def __init__(self):
+        self.runs: List[MathRun] = []
+
+    def children(self, element) -> str:
+        return ''.join(self.convert(child) for child in element if not child.tag.endswith('Pr'))
+
+    def part(self, element, tag: str) -> str:
+        child = element.find(m_tag(tag))
+        return self.children(child) if child is not None else ''
+
+    def convert(self, element) -> str:
+        if not isinstance(element.tag, str):
+            return ''  # 注释、处理指令
+        tag = element.tag.rsplit('}', 1)[-1]
+        handler = getattr(self, f'_{tag}', None)
+        if handler is not None:
+            return handler(element)
+        return self.children(element)
+
+    def _r(self, element):
+        text = ''.join(t.text or '' for t in element.iter(m_tag('t'), w_tag('t')))
+        font = None
+        rpr = element.find(w_tag('rPr'))
+        if rpr is not None:
+            rfonts = rpr.find(W_RFONTS)
+            if rfonts is not None:
+                font = rfonts.get(w_tag('ascii')) or rfonts.get(w_tag('hAnsi'))
+        style = _prop(element, 'rPr', 'sty')
+        mrpr = element.find(m_tag('rPr'))
+        normal_text = mrpr is not None and mrpr.find(m_tag('nor')) is not None
+        if text:
+            self.runs.append(MathRun(text, font, style, normal_text))
+        return text
+
+    def _oMathPara(self, element):
+        return '\n'.join(self.convert(child) for child in element.iterchildren(m_tag('oMath')))
+
+    def _f(self, element):
+        num = self.part(element, 'num')
+        den = self.part(element, 'den')
+        if _prop(element, 'fPr', 'type') == 'noBar':
+            return f'{_group(num)}¦{_group(den)}'
+        return f'{_group(num)}/{_group(den)}'
+
+    def _sSup(self, element):
+        return f"{_group(self.part(element, 'e'))}^{_group(self.part(element, 'sup'))}"
+
+    def _sSub(self, element):
+        return f"{_group(self.part(element, 'e'))}_{_group(self.part(element, 'sub'))}"
+
+    def _sSubSup(self, element):
+        return (f"{_group(self.part(element, 'e'))}_{_group(self.part(element, 'sub'))}"
+                f"^{_group(self.part(element, 'sup'))}")
+
+    def _sPre(self, element):
+        return (f"_{_group(self.part(element, 'sub'))}^{_group(self.part(element, 'sup'))}"
+                f"{_group(self.part(element, 'e'))}")
+
+    def _rad(self, element):
+        degree = self.part(element, 'deg')
+        body = self.part(element, 'e')
+        if not degree or _prop(element, 'radPr', 'degHide') in ('1', 'on', 'true'):
+            return f'√{_group(body)}'
+        if degree == '3':
+            return f'∛{_group(body)}'
+        if degree == '4':
+            return f'∜{_group(body)}'
+        return f'√({degree}&{body})'
+
+    def _nary(self, element):
+        symbol = _prop(element, 'naryPr', 'chr', NARY_DEFAULT_CHR)
+        sub = self.part(element, 'sub')
+        sup = self.part(element, 'sup')
+        text = symbol
+        if sub:
+            text += f'_{_group(sub)}'
+        if sup:
+            text += f'^{_group(sup)}'
+        return f"{text} {self.part(element, 'e')}"
+
+    def _d(self, element):
+        begin = _prop(element, 'dPr', 'begChr', '(')
+        end = _prop(element, 'dPr', 'endChr', ')')
+        separator = _prop(element, 'dPr', 'sepChr', '|')
+        items = [self.children(e) for e in element.iterchildren(m_tag('e'))]
+        return f'{begin}{separator.join(items)}{end}'
+
+    def _func(self, element):
+        return f"{self.part(element, 'fName')} {self.part(element, 'e')}".rstrip()
+
+    def _acc(self, element):
+        return f"{_group(self.part(element, 'e'))}{_prop(element, 'accPr', 'chr', ACCENT_DEFAULT_CHR)}"
+
+    def _bar(self, element):
+        return f"{_group(self.part(element, 'e'))}{BAR_CHR}"
+
+    def _limLow(self, element):
+        return f"{self.part(element, 'e')}_{_group(self.part(element, 'lim'))}"
+
+    def _limUpp(self, element):
+        return f"{self.part(element, 'e')}^{_group(self.part(element, 'lim'))}"
+
+    def _m(self, element):
+        rows = ['&'.join(self.children(e) for e in row.iterchildren(m_tag('e')))
+                for row in element.iterchildren(m_tag('mr'))]
+        return f"■({'@'.join(rows)})"
+
+    def _eqArr(self, element):
+        return f"█({'@'.join(self.children(e) for e in element.iterchildren(m_tag('e')))})"
+
+
+def _collect_fonts(element) -> set:
+    fonts = set()
+    for rfonts in element.iter(W_RFONTS):
+        for attr in RFONTS_ATTRS:
+            value = rfonts.get(attr)
+            if value:
+                fonts.add(value)
+    return fonts
+
+
+def omml_to_linear(element) -> LinearMath:
+    """
+    将 m:oMath / m:oMathPara 转换为线性文本（按XML序列化缓存）
+
+    参数:
+        element: m:oMath 或 m:oMathPara 元素
+
+    返回:
+        LinearMath 对象（缓存共享，调用方不要修改）
+    """
+    signature = etree.tostring(element)
+    cached = _LINEAR_CACHE.get(signature)
+    if cached is not None:
+        _LINEAR_CACHE.move_to_end(signature)
+        return cached
+
+    converter = _Converter()
+    text = converter.convert(element).strip()
+    result = LinearMath(text, converter.runs, _collect_fonts(element))
+
+    _LINEAR_CACHE[signature] = result
+    if len(_LINEAR_CACHE) > LINEAR_CACHE_SIZE:
+        _LINEAR_CACHE.popitem(last=False)
+    return result
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+=== OOXML 公共定义模块 ===
+
+【功能说明】
+直接遍历 lxml 树的各索引/解析模块共用的定义：
+    - WordprocessingML、Office Math、DrawingML、VML 等命名空间
+    - w_tag() / m_tag()：生成带命名空间的元素名与属性名（Clark 记法 {ns}tag）
+    - 常用元素名 W_P / W_R / W_T / W_TBL / W_VAL
+    - owner_paragraph()：向上查找元素所属的正文段落
+"""
+
+from typing import Dict, Optional
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+M_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/math'
+MC_NS = 'http://schemas.openxmlformats.org/markup-compatibility/2006'
+WP_NS = 'http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing'
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+V_NS = 'urn:schemas-microsoft-com:vml'
+O_NS = 'urn:schemas-microsoft-com:office:office'
+
+
+def w_tag(tag: str) -> str:
+    """WordprocessingML 命名空间下的元素名/属性名，如 w_tag('p') -> '{...main}p'"""
+    return f'{{{W_NS}}}{tag}'
+
+
+def m_tag(tag: str) -> str:
+    """Office Math 命名空间下的元素名/属性名"""
+    return f'{{{M_NS}}}{tag}'
+
+
+W_P = w_tag('p')
+W_R = w_tag('r')
+W_T = w_tag('t')
+W_TBL = w_tag('tbl')
+W_VAL = w_tag('val')
+
+
+def owner_paragraph(element, paragraph_positions: Dict) -> Optional[int]:
+    """
+    向上查找元素所属的正文段落
+
+    参数:
+        element: lxml 元素（图片、公式等）
+        paragraph_positions: 段落元素 -> 段落索引 的映射
+
+    返回:
+        所属段落在 doc.paragraphs 中的索引，不在正文段落中时返回None
+    """
+    node = element.getparent()
+    while node is not None:
+        if node.tag == W_P:
+            position = paragraph_positions.get(node)
+            if position is not None:
+                return position
+        node = node.getparent()
+    return None
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+=== 多短语匹配模块（Aho–Corasick） ===
+
+【功能说明】
+把任意数量的短语编译为一个 Aho–Corasick 自动机，对文本只扫描一遍即可找出
+所有出现的短语，扫描耗时与短语数量无关（脚注字段的常见拼写错误列表可以
+扩充到数百条而不拖慢检测）。
+
+匹配前文本与短语都做同样的规范化：
+    - 忽略大小写
+    - 连续空白合并为一个空格
+    - 冒号前、星号后的空白去掉（"Receive date :" 与 "Receive date:" 等价）
+"""
+
+import re
+from collections import deque
+from typing import Dict, Iterator, List, Tuple
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_SPACE_BEFORE_COLON_RE = re.compile(r' (?=[:：])')
+_SPACE_AFTER_STAR_RE = re.compile(r'(?<=\*) ')
+
+
+def normalize_phrase_text(text: str) -> str:
+    """短语匹配使用的规范化文本"""
+    text = _WHITESPACE_RE.sub(' ', text.casefold())
+    text = _SPACE_BEFORE_COLON_RE.sub('', text)
+    return _SPACE_AFTER_STAR_RE.sub('', text)
+
+
+class PhraseMatcher:
+    """
+    多短语匹配器
+
+    用法:
+        matcher = PhraseMatcher()
+        matcher.add('Receive date:', 'received')
+        for start, end, value in matcher.finditer(text):
+            ...
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._phrases: List[List[Tuple[int, object]]] = [[]]   # 状态 -> 在该状态结束的 [(短语长度, 值)]
+        self._outputs: List[List[Tuple[int, object]]] = [[]]   # 状态 -> 含失败链在内的全部输出
+        self._built = True
+
+    def __len__(self):
+        return sum(len(phrases) for phrases in self._phrases)
+
+    def add(self, phrase: str, value) -> None:
+        """
+        添加一个短语
+
+        参数:
+            phrase: 短语（按 normalize_phrase_text 规范化后匹配）
+            value: 匹配到该短语时返回的值
+        """
+        phrase = normalize_phrase_text(phrase)
+        if not phrase:
+            return
+        state = 0
+        for char in phrase:
+            following = self._goto[state].get(char)
+            if following is None:
+                following = len(self._goto)
+                self._goto[state][char] = following
+                self._goto.append({})
+                self._fail.append(0)
+                self._phrases.append([])
+            state = following
+        self._phrases[state].append((len(phrase), value))
+        self._built = False
+
+    def _build(self) -> None:
+        # 按层次遍历计算失败指针，并把失败链上的输出合并到当前状态
+        self._outputs = [list(phrases) for phrases in self._phrases]
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+        while queue:
+            state = queue.popleft()
+            for char, following in self._goto[state].items():
+                queue.append(following)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[following] = target if target != following else 0
+                self._outputs[following] = self._outputs[following] + self._outputs[self._fail[following]]
+        self._built = True
+
+    def finditer(self, text: str, word_start: bool = False) -> Iterator[Tuple[int, int, object]]:
+        """
+        扫描一遍文本，按结束位置顺序给出所有匹配
+
+        参数:
+            text: 待匹配文本（内部做规范化）
+            word_start: 为True时，以字母数字开头的短语必须出现在单词开头
+
+        返回:
+            (起始位置, 结束位置, 值) 的迭代器，位置相对于规范化后的文本
+        """
+        if not self._built:
+            self._build()
+        text = normalize_phrase_text(text)
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, value in outputs[state]:
+                start = index + 1 - length
+                if (word_start and start > 0 and text[start].isalnum()
+                        and text[start - 1].isalnum()):
+                    continue
+                yield start, index + 1, value
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+=== 检测进度事件模块 ===
+
+【功能说明】
+检测流程在执行过程中发出带类型的事件，调用方订阅感兴趣的事件即可：
+    - module_started:   模块开始检测        {'template'}
+    - issue_found:      发现一个问题        {'issue'}（同 parse_issues_from_reports 的条目）
+    - module_finished:  模块检测完成        {'report', 'elapsed_seconds', 'error'}
+    - figure_api_call:  一次图片API请求完成  {用量记录：model、images、tokens、latency_seconds...}
+    - run_finished:     全部模块检测完成    {'elapsed_seconds'}
+
+内置订阅者：
+    - ConsoleSubscriber: 控制台输出（原 run_all_detections 中的打印）
+    - JsonReportWriter:  每个模块完成时立即改写 JSON 报告，前端可先展示已完成模块
+    - IssueCollector:    收集问题列表，供添加批注使用
+
+事件可能来自不同线程（图片API检测在后台线程执行），EventBus 串行分发，
+订阅者无需自行加锁。
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+MODULE_STARTED = 'module_started'
+ISSUE_FOUND = 'issue_found'
+MODULE_FINISHED = 'module_finished'
+FIGURE_API_CALL = 'figure_api_call'
+RUN_FINISHED = 'run_finished'
+
+EVENT_TYPES = (MODULE_STARTED, ISSUE_FOUND, MODULE_FINISHED, FIGURE_API_CALL, RUN_FINISHED)
+
+
+class DetectionEvent:
+    """一个检测进度事件"""
+
+    __slots__ = ('type', 'module', 'data', 'timestamp')
+
+    def __init__(self, event_type: str, module: str = None, data: Dict = None):
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"未知的事件类型: {event_type}")
+        self.type = event_type
+        self.module = module
+        self.data = data or {}
+        self.timestamp = time.time()
+
+    def to_dict(self) -> Dict:
+        """转换为可JSON序列化的字典"""
+        return {
+            'type': self.type,
+            'module': self.module,
+            'timestamp': self.timestamp,
+            'data': self.data
+        }
+
+
+class EventBus:
+    """事件分发器：按订阅顺序把事件交给每个订阅者"""
+
+    def __init__(self):
+        self._subscribers: List[Callable[[DetectionEvent], None]] = []
+        self._lock = threading.RLock()
+
+    def subscribe(self, callback: Callable[[DetectionEvent], None]):
+        """
+        添加订阅者
+
+        参数:
+            callback: 接收 DetectionEvent 的可调用对象
+
+        返回:
+            callback（便于链式使用）
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+        return callback
+
+    def emit(self, event_type: str, module: str = None, **data) -> DetectionEvent:
+        """
+        发出事件
+
+        参数:
+            event_type: 事件类型（EVENT_TYPES 之一）
+            module: 模块名（与模块无关的事件为None）
+            **data: 事件数据
+
+        返回:
+            DetectionEvent 对象
+        """
+        event = DetectionEvent(event_type, module, data)
+        with self._lock:
+            for callback in list(self._subscribers):
+                try:
+                    callback(event)
+                except Exception as e:
+                    # 订阅者出错不影响检测流程
+                    print(f"  ✗ 事件订阅者处理 {event_type} 失败: {e}")
+        return event
+
+    def scoped(self) -> 'ScopedEmitter':
+        """
+        创建一个可关闭的发送端（用于可能超时的后台任务）
+
+        返回:
+            ScopedEmitter 对象
+        """
+        return ScopedEmitter(self)
+
+
+class ScopedEmitter:
+    """
+    转发事件到 EventBus 的发送端：close() 之后发出的事件直接丢弃
+
+    截止时间到达后，仍在后台运行的图片API检测不能再向订阅者发出事件，
+    否则会在回退结果与 run_finished 之后重复写入问题和报告。
+    """
+
+    def __init__(self, bus: EventBus):
+        self._bus = bus
+        self._closed = False
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def close(self):
+        """关闭发送端；正在分发的事件处理完后才返回"""
+        with self._bus._lock:
+            self._closed = True
+
+    def emit(self, event_type: str, module: str = None, **data):
+        """同 EventBus.emit；发送端已关闭时不分发并返回None"""
+        with self._bus._lock:
+            if self._closed:
+                return None
+            return self._bus.emit(event_type, module, **data)
+
+
+def _json_default(obj):
+    """JSON序列化兜底：集合转列表，其余对象（如段落对象）转字符串"""
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    return str(obj)
+
+
+class ConsoleSubscriber:
+    """把事件打印到控制台"""
+
+    def __call__(self, event: DetectionEvent):
+        if event.type == MODULE_STARTED:
+            print(f"\n【{event.module} 检测】")
+            print(f"  使用模板: {event.data.get('template')}")
+
+        elif event.type == MODULE_FINISHED:
+            report = event.data.get('report')
+            elapsed = event.data.get('elapsed_seconds', 0.0)
+            if event.data.get('error'):
+                print(f"  ✗ 检测失败: {event.data['error']}")
+            elif isinstance(report, dict):
+                # 统计ok状态
+                ok_count = sum(1 for key, value in report.items()
+                               if isinstance(value, dict) and value.get('ok', False))
+                total_count = sum(1 for key, value in report.items()
+                                  if isinstance(value, dict) and 'ok' in value)
+                print(f"  结果: {ok_count}/{total_count} 项检测通过")
+            else:
+                print(f"  结果: 已完成")
+
+            # Figure模块同时给出API耗时占比
+            summary = report.get('summary') if isinstance(report, dict) else None
+            api_usage = summary.get('api_usage') if isinstance(summary, dict) else None
+            if api_usage:
+                print(f"  耗时: {elapsed:.2f}s（其中图片API {api_usage['api_seconds']:.2f}s，"
+                      f"{api_usage['calls']} 次调用，{api_usage['prompt_tokens'] + api_usage['completion_tokens']} tokens）")
+            else:
+                print(f"  耗时: {elapsed:.2f}s")
+
+        elif event.type == FIGURE_API_CALL:
+            status = '完成' if event.data.get('ok') else '失败'
+            print(f"    · 图片API请求{status}（{event.data.get('images', 0)} 张图片，"
+                  f"{event.data.get('latency_seconds', 0.0):.2f}s）")
+
+
+class IssueCollector:
+    """收集 issue_found 事件中的问题"""
+
+    def __init__(self):
+        self.issues_by_module: Dict[str, List[Dict]] = {}
+
+    def __call__(self, event: DetectionEvent):
+        if event.type == ISSUE_FOUND:
+            self.issues_by_module.setdefault(event.module, []).append(event.data['issue'])
+
+    def issues(self, module_order: List[str]) -> List[Dict]:
+        """
+        按模块顺序返回所有问题
+
+        参数:
+            module_order: 模块顺序（如 DETECTION_ORDER）
+
+        返回:
+            问题列表（与 parse_issues_from_reports 的结果一致）
+        """
+        return [issue for module in module_order for issue in self.issues_by_module.get(module, [])]
+
+
+class JsonReportWriter:
+    """增量写出 JSON 报告：模块开始/完成时立即改写文件"""
+
+    def __init__(self, output_path, docx_path: str = None):
+        """
+        初始化
+
+        参数:
+            output_path: JSON 报告路径
+            docx_path: 被检测的文档路径（写入报告头）
+        """
+        self.output_path = Path(output_path)
+        self.state = {
+            'document': docx_path,
+            'status': 'running',
+            'started_at': time.time(),
+            'modules': {},
+            'figure_api_calls': 0
+        }
+        self._write()
+
+    def _module(self, name: str) -> Dict:
+        return self.state['modules'].setdefault(name, {'status': 'pending', 'issues': []})
+
+    def __call__(self, event: DetectionEvent):
+        if event.type == MODULE_STARTED:
+            module = self._module(event.module)
+            module['status'] = 'running'
+            module['issues'] = []
+            self._write()
+
+        elif event.type == ISSUE_FOUND:
+            issue = event.data['issue']
+            self._module(event.module)['issues'].append({
+                'section': issue.get('section'),
+                'messages': issue.get('messages', [])
+            })
+
+        elif event.type == MODULE_FINISHED:
+            module = self._module(event.module)
+            module['status'] = 'error' if event.data.get('error') else 'finished'
+            module['elapsed_seconds'] = event.data.get('elapsed_seconds')
+            module['report'] = event.data.get('report')
+            self._write()
+
+        elif event.type == FIGURE_API_CALL:
+            self.state['figure_api_calls'] += 1
+
+        elif event.type == RUN_FINISHED:
+            self.state['status'] = 'finished'
+            self.state['elapsed_seconds'] = event.data.get('elapsed_seconds')
+            self._write()
+
+    def _write(self):
+        """原子写出（先写临时文件再替换），读取方不会看到半个文件"""
+        tmp_path = self.output_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2, default=_json_default)
+        tmp_path.replace(self.output_path)
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+=== 拼写检查词典索引模块（SymSpell 删除索引） ===
+
+【功能说明】
+把词表（内置英文词表 + 用户领域词表）构建为 SymSpell 风格的删除索引：
+    - 每个单词取前 prefix_length 个字符，生成删除 1..max_edit_distance 个字符后的所有变体，
+      变体 -> 单词编号 写入倒排表
+    - 查询时对待查单词做同样的删除，每个变体查一次哈希表得到候选词，
+      再用编辑距离（含相邻字符交换）核对；查询次数只与单词长度有关，与词表大小无关
+
+索引只构建一次并保存为磁盘文件，之后以只读 mmap 方式打开：
+    - 不把词表读入进程内存，多个检测进程通过操作系统页缓存共享同一份数据
+    - 文件名包含词表内容与参数的摘要，词表或参数变化时自动重建
+
+【文件格式】（小端序）
+    头部         MAGIC、版本、参数、各区段偏移、输入摘要
+    单词偏移     (单词数 + 1) 个 uint32，指向单词文本区
+    单词文本     按字典序排列的 UTF-8 单词
+    单词哈希表   开放寻址，每项 (uint64 哈希, uint32 单词编号)
+    删除哈希表   开放寻址，每项 (uint64 哈希, uint32 倒排起点, uint32 倒排长度)
+    倒排表       uint32 单词编号
+
+哈希表只保存 64 位哈希而不保存删除变体本身：哈希冲突只会多出几个候选词，
+候选词最终都要计算编辑距离，不影响结果。
+"""
+
+import gzip
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MAGIC = b'PDSPELL\x01'
+FORMAT_VERSION = 1
+
+DEFAULT_MAX_EDIT_DISTANCE = 2
+DEFAULT_PREFIX_LENGTH = 7
+
+# 头部：MAGIC, 版本, 最大编辑距离, 前缀长度, 单词数, 单词表槽数, 删除表槽数,
+#       单词偏移/单词文本/单词表/删除表/倒排表 的文件偏移, 输入摘要
+_HEADER = struct.Struct('<8s6I5Q32s')
+_WORD_SLOT = struct.Struct('<QI')
+_DELETE_SLOT = struct.Struct('<QII')
+
+
+def _hash64(text: str) -> int:
+    """跨进程稳定的 64 位哈希（0 保留给空槽）"""
+    value = int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+    return value or 1
+
+
+def _table_size(count: int) -> int:
+    """装载因子不超过 0.5 的 2 的幂"""
+    size = 8
+    while size < count * 2:
+        size <<= 1
+    return size
+
+
+def deletes(word: str, max_distance: int) -> set:
+    """
+    单词删除 1..max_distance 个字符得到的所有变体（含单词本身）
+
+    参数:
+        word: 单词（通常已截取前缀）
+        max_distance: 最多删除的字符数
+
+    返回:
+        变体集合
+    """
+    result = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        following = set()
+        for item in frontier:
+            if len(item) <= 1:
+                continue
+            for index in range(len(item)):
+                following.add(item[:index] + item[index + 1:])
+        following -= result
+        result |= following
+        frontier = following
+    return result
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    编辑距离（插入、删除、替换、相邻交换），超过 max_distance 时提前返回 max_distance + 1
+    """
+    if a == b:
+        return 0
+    len_a, len_b = len(a), len(b)
+    if abs(len_a - len_b) > max_distance:
+        return max_distance + 1
+    previous_previous = None
+    previous = list(range(len_b + 1))
+    for i in range(1, len_a + 1):
+        current = [i] + [0] * len_b
+        row_minimum = i
+        char_a = a[i - 1]
+        for j in range(1, len_b + 1):
+            cost = 0 if char_a == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and j > 1 and char_a == b[j - 2]
+                    and a[i - 2] == b[j - 1]):
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            if value < row_minimum:
+                row_minimum = value
+        if row_minimum > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return min(previous[len_b], max_distance + 1)
+
+
+# ---------- 词表读取 ----------
+def read_word_file(path: str) -> List[str]:
+    """
+    读取词表文件（每行一个单词，# 开头为注释；.gz 文件自动解压）
+
+    返回:
+        小写单词列表
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    words = []
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            word = line.split('#', 1)[0].strip()
+            if word:
+                words.append(word.replace('’', "'").lower())
+    return words
+
+
+def sources_digest(paths: Iterable[str], max_edit_distance: int, prefix_length: int) -> bytes:
+    """词表文件内容与索引参数的摘要（用于判断索引是否需要重建）"""
+    digest = hashlib.sha256(f'{FORMAT_VERSION}:{max_edit_distance}:{prefix_length}'.encode())
+    for path in paths:
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest.update(len(data).to_bytes(8, 'little'))
+        digest.update(data)
+    return digest.digest()
+
+
+# ---------- 索引构建 ----------
+def build_index_file(words: Iterable[str], output_path: str, max_edit_distance: int = DEFAULT_MAX_EDIT_DISTANCE,
+                     prefix_length: int = DEFAULT_PREFIX_LENGTH, digest: bytes = b'') -> str:
+    """
+    构建删除索引并写入文件（先写临时文件再原子替换，并发构建时不会读到半个文件）
+
+    参数:
+        words: 单词（小写）
+        output_path: 索引文件路径
+        max_edit_distance: 最大编辑距离
+        prefix_length: 生成删除变体时截取的前缀长度
+        digest: 输入摘要，写入头部
+
+    返回:
+        索引文件路径
+    """
+    word_list = sorted(set(words))
+
+    # 单词文本与偏移
+    encoded = [word.encode('utf-8') for word in word_list]
+    offsets = array('I', [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    blob = b''.join(encoded)
+
+    # 单词哈希表
+    word_slots = _table_size(len(word_list))
+    word_table = bytearray(word_slots * _WORD_SLOT.size)
+    mask = word_slots - 1
+    for word_id, word in enumerate(word_list):
+        key = _hash64(word)
+        slot = key & mask
+        while _WORD_SLOT.unpack_from(word_table, slot * _WORD_SLOT.size)[0]:
+            slot = (slot + 1) & mask
+        _WORD_SLOT.pack_into(word_table, slot * _WORD_SLOT.size, key, word_id)
+
+    # 删除变体 -> 单词编号（相同前缀的单词共用一次删除计算）
+    postings_by_key: Dict[int, array] = {}
+    prefix_keys: Dict[str, List[int]] = {}
+    for word_id, word in enumerate(word_list):
+        prefix = word[:prefix_length]
+        keys = prefix_keys.get(prefix)
+        if keys is None:
+            keys = [_hash64(item) for item in deletes(prefix, max_edit_distance)]
+            prefix_keys[prefix] = keys
+        for key in keys:
+            postings = postings_by_key.get(key)
+            if postings is None:
+                postings = postings_by_key[key] = array('I')
+            postings.append(word_id)
+
+    delete_slots = _table_size(len(postings_by_key))
+    delete_table = bytearray(delete_slots * _DELETE_SLOT.size)
+    mask = delete_slots - 1
+    postings_data = array('I')
+    for key, postings in postings_by_key.items():
+        slot = key & mask
+        while _DELETE_SLOT.unpack_from(delete_table, slot * _DELETE_SLOT.size)[0]:
+            slot = (slot + 1) & mask
+        _DELETE_SLOT.pack_into(delete_table, slot * _DELETE_SLOT.size, key, len(postings_data), len(postings))
+        postings_data.extend(postings)
+
+    if array('I').itemsize != 4:
+        raise RuntimeError('unsigned int 不是 4 字节，无法写入索引')
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+        postings_data.byteswap()
+
+    offsets_offset = _HEADER.size
+    blob_offset = offsets_offset + len(offsets) * 4
+    word_table_offset = blob_offset + len(blob)
+    delete_table_offset = word_table_offset + len(word_table)
+    postings_offset = delete_table_offset + len(delete_table)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, max_edit_distance, prefix_length, len(word_list),
+                          word_slots, delete_slots, offsets_offset, blob_offset, word_table_offset,
+                          delete_table_offset, postings_offset, digest.ljust(32, b'\0')[:32])
+
+    directory = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix='.spell_index_', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            f.write(offsets.tobytes())
+            f.write(blob)
+            f.write(word_table)
+            f.write(delete_table)
+            f.write(postings_data.tobytes())
+        # mkstemp 创建的文件仅属主可读，放宽为所有检测进程可读
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return output_path
+
+
+# ---------- 索引查询 ----------
+class SpellIndex:
+    """只读 mmap 方式打开的删除索引"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.max_edit_distance, self.prefix_length, self.word_count,
+         self._word_slots, self._delete_slots, self._offsets_offset, self._blob_offset,
+         self._word_table_offset, self._delete_table_offset, self._postings_offset,
+         self.digest) = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._map.close()
+            raise ValueError(f"不是有效的拼写索引文件: {path}")
+
+    def __len__(self):
+        return self.word_count
+
+    def close(self):
+        self._map.close()
+
+    def word(self, word_id: int) -> str:
+        """按编号取单词"""
+        start, end = struct.unpack_from('<II', self._map, self._offsets_offset + word_id * 4)
+        return self._map[self._blob_offset + start:self._blob_offset + end].decode('utf-8')
+
+    def __contains__(self, word: str) -> bool:
+        key = _hash64(word)
+        mask = self._word_slots - 1
+        slot = key & mask
+        while True:
+            stored, word_id = _WORD_SLOT.unpack_from(self._map, self._word_table_offset + slot * _WORD_SLOT.size)
+            if not stored:
+                return False
+            if stored == key and self.word(word_id) == word:
+                return True
+            slot = (slot + 1) & mask
+
+    def _postings(self, text: str) -> Iterable[int]:
+        key = _hash64(text)
+        mask = self._delete_slots - 1
+        slot = key & mask
+        while True:
+            stored, start, count = _DELETE_SLOT.unpack_from(
+                self._map, self._delete_table_offset + slot * _DELETE_SLOT.size)
+            if not stored:
+                return ()
+            if stored == key:
+                offset = self._postings_offset + start * 4
+                return struct.unpack_from(f'<{count}I', self._map, offset)
+            slot = (slot + 1) & mask
+
+    def suggest(self, word: str, max_distance: Optional[int] = None, limit: int = 3) -> List[Tuple[str, int]]:
+        """
+        拼写建议
+
+        参数:
+            word: 待查单词（小写）
+            max_distance: 最大编辑距离（不超过索引构建时的距离）
+            limit: 最多返回的建议数
+
+        返回:
+            [(建议单词, 编辑距离)]，按距离排序；单词已收录时返回 [(word, 0)]
+        """
+        if word in self:
+            return [(word, 0)]
+        if max_distance is None or max_distance > self.max_edit_distance:
+            max_distance = self.max_edit_distance
+
+        candidates = set()
+        for item in deletes(word[:self.prefix_length], max_distance):
+            candidates.update(self._postings(item))
+
+        found = []
+        letters = sorted(word)
+        for word_id in candidates:
+            candidate = self.word(word_id)
+            distance = edit_distance(word, candidate, max_distance)
+            if distance <= max_distance:
+                # 同距离时优先：字母相同仅顺序不同（交换）、首字母相同、长度接近
+                found.append((distance, sorted(candidate) != letters, candidate[:1] != word[:1],
+                              abs(len(candidate) - len(word)), candidate))
+        found.sort()
+        return [(item[-1], item[0]) for item in found[:limit]]
+
+
+_INDEXES: Dict[str, SpellIndex] = {}
+
+
+def open_spell_index(word_files: List[str], index_dir: str, max_edit_distance: int = DEFAULT_MAX_EDIT_DISTANCE,
+                     prefix_length: int = DEFAULT_PREFIX_LENGTH) -> SpellIndex:
+    """
+    打开（必要时先构建）词表对应的索引；同一进程内重复调用直接复用已打开的 mmap
+
+    参数:
+        word_files: 词表文件路径列表（内置词表与领域词表）
+        index_dir: 索引文件保存目录
+        max_edit_distance: 最大编辑距离
+        prefix_length: 前缀长度
+
+    返回:
+        SpellIndex 对象
+    """
+    digest = sources_digest(word_files, max_edit_distance, prefix_length)
+    path = os.path.join(index_dir, f'spell_index_{digest.hex()[:16]}.bin')
+    index = _INDEXES.get(path)
+    if index is not None:
+        return index
+    if not os.path.isfile(path):
+        words = []
+        for word_file in word_files:
+            words.extend(read_word_file(word_file))
+        build_index_file(words, path, max_edit_distance, prefix_length, digest)
+    index = SpellIndex(path)
+    _INDEXES[path] = index
+    return index
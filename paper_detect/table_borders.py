@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+=== 表格有效边框矩阵模块 ===
+
+【功能说明】
+Word 中一条表格线可能来自多个层级，优先级从低到高为：
+    1. 表格样式的 tblBorders（含 basedOn 继承链）
+    2. 表格直接格式 w:tblPr/w:tblBorders
+    3. 行级例外 w:trPr/w:tblPrEx/w:tblBorders
+    4. 表格样式的条件格式 w:tblStylePr（整表、镶边行/列、首/末行列、角单元格）
+       中的 tcBorders，受 w:tblLook 开关控制
+    5. 单元格直接格式 w:tcPr/w:tcBorders
+
+本模块对每个网格位置合并上述来源，得到：
+    - horizontal[k][列]：第 k 条横线（k=0 为表格顶边，k=行数 为表格底边）
+    - vertical[行][k]：第 k 条竖线（k=0 为左边框，k=列数 为右边框）
+每个元素为 (线型, 宽度磅值) 或 None（无线）。相邻单元格都设置了边框时取较粗者；
+纵向/横向合并单元格内部不存在的线为 None。
+
+整张表只遍历一次，耗时与单元格数量成线性关系。
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from paper_detect.ooxml import W_VAL, w_tag
+except ImportError:
+    from ooxml import W_VAL, w_tag
+
+W_SZ = w_tag('sz')
+W_TYPE = w_tag('type')
+W_STYLE_ID = w_tag('styleId')
+W_DEFAULT = w_tag('default')
+
+BORDER_SIDES = ('top', 'bottom', 'left', 'right', 'insideH', 'insideV')
+NO_LINE_VALUES = ('none', 'nil')
+
+# 条件格式的应用顺序（后者覆盖前者）
+CONDITIONAL_ORDER = ('wholeTable', 'band1Vert', 'band2Vert', 'band1Horz', 'band2Horz',
+                     'firstCol', 'lastCol', 'firstRow', 'lastRow',
+                     'nwCell', 'neCell', 'swCell', 'seCell')
+
+# w:tblLook 旧格式十六进制位掩码
+TBL_LOOK_BITS = {'firstRow': 0x0020, 'lastRow': 0x0040, 'firstColumn': 0x0080,
+                 'lastColumn': 0x0100, 'noHBand': 0x0200, 'noVBand': 0x0400}
+# 未设置 w:tblLook 时 Word 的默认值
+TBL_LOOK_DEFAULT = {'firstRow': True, 'lastRow': False, 'firstColumn': True,
+                    'lastColumn': False, 'noHBand': False, 'noVBand': True}
+
+# (线型, 宽度磅值, 层级)：层级 0 为表格级（tblBorders），1 为单元格级（tcBorders）
+BorderSpec = Tuple[Optional[str], Optional[float], int]
+
+
+def _read_borders(container, level: int) -> Dict[str, BorderSpec]:
+    """读取 tblBorders / tcBorders 中各边的设置"""
+    borders = {}
+    if container is None:
+        return borders
+    for side in BORDER_SIDES:
+        border = container.find(w_tag(side))
+        if border is None:
+            continue
+        sz = border.get(W_SZ)
+        borders[side] = (border.get(W_VAL), float(sz) / 8.0 if sz else None, level)
+    return borders
+
+
+def _find_path(element, *path):
+    node = element
+    for tag in path:
+        if node is None:
+            return None
+        node = node.find(w_tag(tag))
+    return node
+
+
+def _is_line(spec: Optional[BorderSpec]) -> bool:
+    return spec is not None and spec[0] not in NO_LINE_VALUES
+
+
+def _weight(spec: BorderSpec) -> float:
+    if not _is_line(spec):
+        return -1.0
+    return spec[1] if spec[1] is not None else 0.0
+
+
+def _table_style_chain(styles_element, style_id: Optional[str]) -> List:
+    """表格样式及其 basedOn 链（根样式在前）；未指定样式时使用默认表格样式"""
+    if styles_element is None:
+        return []
+    table_styles = {}
+    default_style = None
+    for style in styles_element.iterchildren(w_tag('style')):
+        if style.get(W_TYPE) != 'table':
+            continue
+        table_styles[style.get(W_STYLE_ID)] = style
+        if style.get(W_DEFAULT) in ('1', 'true', 'on'):
+            default_style = style
+
+    style = table_styles.get(style_id) if style_id else default_style
+    chain = []
+    seen = set()
+    while style is not None and id(style) not in seen:
+        seen.add(id(style))
+        chain.append(style)
+        based_on = _find_path(style, 'basedOn')
+        style = table_styles.get(based_on.get(W_VAL)) if based_on is not None else None
+    chain.reverse()
+    return chain
+
+
+def _table_look(tbl_pr) -> Dict[str, bool]:
+    look = dict(TBL_LOOK_DEFAULT)
+    element = _find_path(tbl_pr, 'tblLook')
+    if element is None:
+        return look
+    mask = element.get(W_VAL)
+    if mask:
+        try:
+            bits = int(mask, 16)
+            look = {name: bool(bits & bit) for name, bit in TBL_LOOK_BITS.items()}
+        except ValueError:
+            pass
+    for name in TBL_LOOK_BITS:
+        value = element.get(w_tag(name))
+        if value is not None:
+            look[name] = value in ('1', 'true', 'on')
+    return look
+
+
+class _TableBorderSources:
+    """一张表格各层级的边框来源（样式链合并后）"""
+
+    def __init__(self, tbl, styles_element):
+        tbl_pr = _find_path(tbl, 'tblPr')
+        style_element = _find_path(tbl_pr, 'tblStyle')
+        chain = _table_style_chain(styles_element, style_element.get(W_VAL) if style_element is not None else None)
+
+        self.table_borders: Dict[str, BorderSpec] = {}
+        self.conditional: Dict[str, Dict[str, BorderSpec]] = {}
+        row_band_size = 1
+        column_band_size = 1
+        for style in chain:
+            self.table_borders.update(_read_borders(_find_path(style, 'tblPr', 'tblBorders'), 0))
+            whole = _read_borders(_find_path(style, 'tcPr', 'tcBorders'), 1)
+            if whole:
+                self.conditional.setdefault('wholeTable', {}).update(whole)
+            for band_tag, attr in (('tblStyleRowBandSize', 'row'), ('tblStyleColBandSize', 'col')):
+                band = _find_path(style, 'tblPr', band_tag)
+                if band is not None and (band.get(W_VAL) or '').isdigit():
+                    if attr == 'row':
+                        row_band_size = max(int(band.get(W_VAL)), 1)
+                    else:
+                        column_band_size = max(int(band.get(W_VAL)), 1)
+            for style_pr in style.iterchildren(w_tag('tblStylePr')):
+                kind = style_pr.get(W_TYPE)
+                borders = _read_borders(_find_path(style_pr, 'tcPr', 'tcBorders'), 1)
+                if kind == 'wholeTable':
+                    self.table_borders.update(_read_borders(_find_path(style_pr, 'tblPr', 'tblBorders'), 0))
+                if borders:
+                    self.conditional.setdefault(kind, {}).update(borders)
+        self.table_borders.update(_read_borders(_find_path(tbl_pr, 'tblBorders'), 0))
+        self.look = _table_look(tbl_pr)
+        self.row_band_size = row_band_size
+        self.column_band_size = column_band_size
+
+    def conditions(self, row: int, column: int, row_count: int, column_count: int):
+        """
+        某个网格位置适用的条件格式
+
+        返回:
+            [(类型, (起始行, 结束行, 起始列, 结束列))]，按应用顺序排列
+        """
+        look = self.look
+        first_row = look['firstRow'] and row_count > 1
+        last_row = look['lastRow'] and row_count > 1
+        first_col = look['firstColumn'] and column_count > 1
+        last_col = look['lastColumn'] and column_count > 1
+        all_rows = (0, row_count - 1)
+        all_cols = (0, column_count - 1)
+
+        applicable = {'wholeTable': all_rows + all_cols}
+        if not look['noVBand']:
+            band_col = column - (1 if first_col else 0)
+            if band_col >= 0 and not (last_col and column == column_count - 1):
+                kind = 'band1Vert' if (band_col // self.column_band_size) % 2 == 0 else 'band2Vert'
+                applicable[kind] = all_rows + (column, column)
+        if not look['noHBand']:
+            band_row = row - (1 if first_row else 0)
+            if band_row >= 0 and not (last_row and row == row_count - 1):
+                kind = 'band1Horz' if (band_row // self.row_band_size) % 2 == 0 else 'band2Horz'
+                applicable[kind] = (row, row) + all_cols
+        if first_col and column == 0:
+            applicable['firstCol'] = all_rows + (0, 0)
+        if last_col and column == column_count - 1:
+            applicable['lastCol'] = all_rows + (column, column)
+        if first_row and row == 0:
+            applicable['firstRow'] = (0, 0) + all_cols
+        if last_row and row == row_count - 1:
+            applicable['lastRow'] = (row, row) + all_cols
+        corners = {'nwCell': (0, 0), 'neCell': (0, column_count - 1),
+                   'swCell': (row_count - 1, 0), 'seCell': (row_count - 1, column_count - 1)}
+        for kind, (corner_row, corner_col) in corners.items():
+            if row == corner_row and column == corner_col:
+                applicable[kind] = (row, row, column, column)
+
+        return [(kind, applicable[kind]) for kind in CONDITIONAL_ORDER
+                if kind in applicable and kind in self.conditional]
+
+
+def _region_sides(borders: Dict[str, BorderSpec], row: int, column: int, region) -> Dict[str, BorderSpec]:
+    """区域边框映射到单元格四边：区域边缘用 top/bottom/left/right，内部用 insideH/insideV"""
+    row_start, row_end, col_start, col_end = region
+    mapping = {
+        'top': 'top' if row == row_start else 'insideH',
+        'bottom': 'bottom' if row == row_end else 'insideH',
+        'left': 'left' if column == col_start else 'insideV',
+        'right': 'right' if column == col_end else 'insideV',
+    }
+    return {side: borders[source] for side, source in mapping.items() if source in borders}
+
+
+class BorderMatrix:
+    """表格的有效横线、竖线矩阵"""
+
+    __slots__ = ('row_count', 'column_count', 'horizontal', 'vertical')
+
+    def __init__(self, row_count: int, column_count: int):
+        self.row_count = row_count
+        self.column_count = column_count
+        self.horizontal: List[List[Optional[Tuple[str, Optional[float]]]]] = []
+        self.vertical: List[List[Optional[Tuple[str, Optional[float]]]]] = []
+
+
+def _resolve_edge(first: Optional[BorderSpec], second: Optional[BorderSpec]):
+    """相邻两侧的边框取有效值：单元格级优先于表格级，同级取较粗者"""
+    candidates = [spec for spec in (first, second) if spec is not None]
+    if not candidates:
+        return None
+    top_level = max(spec[2] for spec in candidates)
+    spec = max((spec for spec in candidates if spec[2] == top_level), key=_weight)
+    return (spec[0], spec[1]) if _is_line(spec) else None
+
+
+def build_border_matrix(tbl, grid, styles_element=None) -> BorderMatrix:
+    """
+    计算表格每条横线、竖线的有效边框
+
+    参数:
+        tbl: w:tbl 元素
+        grid: read_table_grid 构建的 TableGrid
+        styles_element: styles.xml 根元素（用于表格样式，可选）
+
+    返回:
+        BorderMatrix 对象
+    """
+    sources = _TableBorderSources(tbl, styles_element)
+    row_count, column_count = grid.row_count, grid.column_count
+    matrix = BorderMatrix(row_count, column_count)
+    if row_count == 0 or column_count == 0:
+        return matrix
+
+    # 各网格位置的四边设置
+    sides_grid = []
+    for row_index, (tr, tcs) in enumerate(zip(tbl.iterchildren(w_tag('tr')), grid.tc_grid)):
+        table_level = dict(sources.table_borders)
+        table_level.update(_read_borders(_find_path(tr, 'tblPrEx', 'tblBorders'), 0))
+        whole_region = (0, row_count - 1, 0, column_count - 1)
+
+        row_sides = []
+        for column in range(column_count):
+            tc = tcs[column] if column < len(tcs) else None
+            if tc is None:
+                row_sides.append(None)
+                continue
+            sides = _region_sides(table_level, row_index, column, whole_region)
+            for kind, region in sources.conditions(row_index, column, row_count, column_count):
+                sides.update(_region_sides(sources.conditional[kind], row_index, column, region))
+            direct = _read_borders(_find_path(tc, 'tcPr', 'tcBorders'), 1)
+            for side in ('top', 'bottom', 'left', 'right'):
+                if side in direct:
+                    sides[side] = direct[side]
+            row_sides.append(sides)
+        sides_grid.append(row_sides)
+
+    def cell_at(row, column):
+        cells = grid.grid[row]
+        return cells[column] if column < len(cells) else -1
+
+    def side(row, column, name):
+        sides = sides_grid[row][column]
+        return sides.get(name) if sides is not None else None
+
+    # 横线：第 k 条线位于第 k-1 行与第 k 行之间
+    for edge in range(row_count + 1):
+        line = []
+        for column in range(column_count):
+            if 0 < edge < row_count and cell_at(edge - 1, column) == cell_at(edge, column) >= 0:
+                line.append(None)  # 纵向合并单元格内部
+                continue
+            above = side(edge - 1, column, 'bottom') if edge > 0 else None
+            below = side(edge, column, 'top') if edge < row_count else None
+            line.append(_resolve_edge(above, below))
+        matrix.horizontal.append(line)
+
+    # 竖线：第 k 条线位于第 k-1 列与第 k 列之间
+    for row in range(row_count):
+        line = []
+        for edge in range(column_count + 1):
+            if 0 < edge < column_count and cell_at(row, edge - 1) == cell_at(row, edge) >= 0:
+                line.append(None)  # 横向合并单元格内部
+                continue
+            left = side(row, edge - 1, 'right') if edge > 0 else None
+            right = side(row, edge, 'left') if edge < column_count else None
+            line.append(_resolve_edge(left, right))
+        matrix.vertical.append(line)
+
+    return matrix
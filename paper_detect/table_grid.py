@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+=== 表格网格读取模块 ===
+
+【功能说明】
+直接遍历一次 w:tbl 中的 w:tr / w:tc，把 gridSpan（横向合并）和 vMerge（纵向合并）
+解析为紧凑的单元格网格：
+
+    - 每个实际单元格（合并区域只算一个）按行优先顺序编号
+    - 各单元格的起始行列、跨行跨列数、文本、首个非空段落的对齐方式、单元格边框
+      分别保存在等长的数组中
+    - grid[行][列] 为该网格位置所属的单元格编号；gridBefore / gridAfter 跳过的位置与
+      单元格数不足的行尾都是空位置（-1），每行都补齐到表格的总列数
+
+python-docx 的 row.cells 每次访问都要重新计算合并关系（纵向合并还要逐行向上查找），
+大表格逐行读取时代价为 O(行数²)；这里整张表只遍历一次。
+"""
+
+from typing import Callable, List, Optional
+
+from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+
+try:
+    from paper_detect.ooxml import W_P, W_R, W_T, W_VAL, w_tag
+except ImportError:
+    from ooxml import W_P, W_R, W_T, W_VAL, w_tag
+
+W_TR = w_tag('tr')
+W_TC = w_tag('tc')
+W_BR = w_tag('br')
+W_HYPERLINK = w_tag('hyperlink')
+W_SZ = w_tag('sz')
+W_TYPE = w_tag('type')
+
+# 与 python-docx 的 run.text 一致的特殊字符元素
+RUN_CHARACTERS = {w_tag('tab'): '\t', w_tag('ptab'): '\t', w_tag('cr'): '\n', w_tag('noBreakHyphen'): '-'}
+
+BORDER_SIDES = ('top', 'bottom', 'left', 'right', 'insideH', 'insideV')
+
+# w:jc 取值 -> WD_PARAGRAPH_ALIGNMENT 数值
+JC_ALIGNMENTS = {member.xml_value: int(member) for member in WD_PARAGRAPH_ALIGNMENT if member.xml_value}
+
+
+def _child_val(parent, *path):
+    """读取 parent/path[0]/path[1]/... 上的 w:val，任一层缺失时返回None"""
+    node = parent
+    for tag in path:
+        if node is None:
+            return None
+        node = node.find(w_tag(tag))
+    return node.get(W_VAL) if node is not None else None
+
+
+def _run_text(r) -> str:
+    parts = []
+    for child in r:
+        tag = child.tag
+        if tag == W_T:
+            parts.append(child.text or '')
+        elif tag == W_BR:
+            if child.get(W_TYPE, 'textWrapping') == 'textWrapping':
+                parts.append('\n')
+        elif tag in RUN_CHARACTERS:
+            parts.append(RUN_CHARACTERS[tag])
+    return ''.join(parts)
+
+
+def paragraph_text(p_element) -> str:
+    """段落文本（与 python-docx 的 paragraph.text 一致，但不经过 xpath）"""
+    parts = []
+    for child in p_element:
+        if child.tag == W_R:
+            parts.append(_run_text(child))
+        elif child.tag == W_HYPERLINK:
+            parts.extend(_run_text(r) for r in child.iterchildren(W_R))
+    return ''.join(parts)
+
+
+def paragraph_direct_alignment(p_element) -> Optional[int]:
+    """段落直接格式中的对齐方式（WD_PARAGRAPH_ALIGNMENT 数值），未设置时返回None"""
+    return JC_ALIGNMENTS.get(_child_val(p_element, 'pPr', 'jc'))
+
+
+def read_cell_borders(tc) -> dict:
+    """
+    读取单元格边框（w:tcPr/w:tcBorders）
+
+    返回:
+        {边: (线型, 宽度磅值)}，宽度未设置时为None
+    """
+    borders = {}
+    tc_borders = tc.find(w_tag('tcPr'))
+    if tc_borders is not None:
+        tc_borders = tc_borders.find(w_tag('tcBorders'))
+    if tc_borders is None:
+        return borders
+    for side in BORDER_SIDES:
+        border = tc_borders.find(w_tag(side))
+        if border is None:
+            continue
+        sz = border.get(W_SZ)
+        borders[side] = (border.get(W_VAL), float(sz) / 8.0 if sz else None)
+    return borders
+
+
+class TableGrid:
+    """一张表格的单元格网格（各属性按单元格编号存放在数组中）"""
+
+    __slots__ = ('row_count', 'column_count', 'grid', 'tc_grid', 'row_cells', 'repeat_header_rows',
+                 'cell_rows', 'cell_columns', 'row_spans', 'column_spans',
+                 'texts', 'alignments', 'borders', 'elements')
+
+    def __init__(self):
+        self.row_count = 0
+        self.column_count = 0
+        self.grid: List[List[int]] = []         # grid[行][网格列] -> 单元格编号（-1 为空位置）；每行都补齐到 column_count 列
+        self.tc_grid: List[List] = []           # tc_grid[行][网格列] -> 该位置实际的 w:tc（含纵向合并的后续单元格，空位置为None）
+        self.row_cells: List[List[int]] = []    # 每行起始于该行的单元格编号（按列顺序）
+        self.repeat_header_rows = 0             # 开头连续设置了"标题行重复"（w:tblHeader）的行数
+        self.cell_rows: List[int] = []          # 单元格起始行
+        self.cell_columns: List[int] = []       # 单元格起始网格列
+        self.row_spans: List[int] = []
+        self.column_spans: List[int] = []
+        self.texts: List[str] = []              # 与 python-docx 的 cell.text 一致
+        self.alignments: List[Optional[int]] = []  # 首个非空段落的对齐方式；全空单元格为None
+        self.borders: List[dict] = []           # read_cell_borders 的结果
+        self.elements: List = []                # w:tc 元素
+
+    def __len__(self):
+        return len(self.texts)
+
+    def header_row_count(self) -> int:
+        """表头行数：首行单元格纵向合并覆盖的行数与标题行重复设置中的较大者"""
+        if self.row_count == 0:
+            return 0
+        spanned = max((self.row_spans[cell] for cell in self.row_cells[0]), default=1)
+        return min(max(spanned, self.repeat_header_rows, 1), self.row_count)
+
+    def first_cell_of_row(self, row: int) -> Optional[int]:
+        """该行第一个网格位置上的单元格编号（纵向合并时为合并区域的起始单元格）"""
+        for cell in self.grid[row]:
+            if cell >= 0:
+                return cell
+        return None
+
+
+def read_table_grid(tbl, fallback_alignment: Callable = None) -> TableGrid:
+    """
+    遍历一次表格XML，构建单元格网格
+
+    参数:
+        tbl: w:tbl 元素（table._tbl）
+        fallback_alignment: 段落没有直接对齐格式时的取值函数 f(p_element) -> int，
+                            用于按段落样式取对齐方式；不提供时视为左对齐
+
+    返回:
+        TableGrid 对象
+    """
+    grid = TableGrid()
+    previous_row: List[int] = []
+
+    for tr in tbl.iterchildren(W_TR):
+        row_index = grid.row_count
+        tr_pr = tr.find(w_tag('trPr'))
+        tbl_header = tr_pr.find(w_tag('tblHeader')) if tr_pr is not None else None
+        if (grid.repeat_header_rows == row_index and tbl_header is not None
+                and tbl_header.get(W_VAL) not in ('0', 'false', 'off')):
+            grid.repeat_header_rows += 1
+        grid_before = _child_val(tr, 'trPr', 'gridBefore')
+        column = int(grid_before) if grid_before and grid_before.isdigit() else 0
+        row = [-1] * column
+        tcs = [None] * column
+        starts = []
+
+        for tc in tr.iterchildren(W_TC):
+            span_value = _child_val(tc, 'tcPr', 'gridSpan')
+            span = int(span_value) if span_value and span_value.isdigit() else 1
+            tc_pr = tc.find(w_tag('tcPr'))
+            v_merge = tc_pr.find(w_tag('vMerge')) if tc_pr is not None else None
+
+            above = previous_row[column] if column < len(previous_row) else -1
+            if v_merge is not None and v_merge.get(W_VAL, 'continue') == 'continue' and above >= 0:
+                # 纵向合并的后续单元格：归入上方单元格
+                cell = above
+                if grid.cell_rows[cell] + grid.row_spans[cell] == row_index:
+                    grid.row_spans[cell] += 1
+            else:
+                cell = len(grid.texts)
+                paragraphs = list(tc.iterchildren(W_P))
+                texts = [paragraph_text(p) for p in paragraphs]
+                alignment = None
+                for p, text in zip(paragraphs, texts):
+                    if text.strip():
+                        alignment = paragraph_direct_alignment(p)
+                        if alignment is None:
+                            alignment = fallback_alignment(p) if fallback_alignment else 0
+                        break
+                grid.cell_rows.append(row_index)
+                grid.cell_columns.append(column)
+                grid.row_spans.append(1)
+                grid.column_spans.append(span)
+                grid.texts.append('\n'.join(texts))
+                grid.alignments.append(alignment)
+                grid.borders.append(read_cell_borders(tc))
+                grid.elements.append(tc)
+                starts.append(cell)
+
+            row.extend([cell] * span)
+            tcs.extend([tc] * span)
+            column += span
+
+        # 行尾 gridAfter 跳过的网格列为空位置
+        grid_after = _child_val(tr, 'trPr', 'gridAfter')
+        if grid_after and grid_after.isdigit():
+            row.extend([-1] * int(grid_after))
+            tcs.extend([None] * int(grid_after))
+
+        grid.grid.append(row)
+        grid.tc_grid.append(tcs)
+        grid.row_cells.append(starts)
+        grid.column_count = max(grid.column_count, len(row))
+        grid.row_count += 1
+        previous_row = row
+
+    # 单元格数不足的行在行尾补空位置，使 grid[行][列] 对任意行列都有效
+    for row, tcs in zip(grid.grid, grid.tc_grid):
+        missing = grid.column_count - len(row)
+        if missing > 0:
+            row.extend([-1] * missing)
+            tcs.extend([None] * missing)
+
+    return grid
@@ -14,16 +14,27 @@
 
 输出：
     - <filename>_report.txt - 综合检测报告
+    - <filename>_report.json - JSON报告（每个模块完成时即更新，可用于前端实时展示）
     - <filename>_annotated.docx - 带批注的文档副本
 """
 
 import os
 import sys
+import time
 import shutil
 import re
+import asyncio
+import threading
+import concurrent.futures
+import queue
 from datetime import datetime
 from docx import Document
 
+from paper_detect.progress_events import (
+    EventBus, ConsoleSubscriber, IssueCollector, JsonReportWriter,
+    MODULE_STARTED, ISSUE_FOUND, MODULE_FINISHED, FIGURE_API_CALL, RUN_FINISHED
+)
+
 # 模板配置映射：模块名 -> (检测函数所在模块, 检测函数名, 模板JSON路径)
 TEMPLATE_MAPPING = {
     'Title': ('paper_detect.Title_detect', 'check_doc_with_template', 'templates/Title.json'),
@@ -33,10 +44,31 @@ TEMPLATE_MAPPING = {
     'Formula': ('paper_detect.Formula_detect', 'check_doc_with_template', 'templates/Formula.json'),
     'Figure': ('paper_detect.Figure_detect', 'check_doc_with_template', 'templates/Figure.json'),
     'Table': ('paper_detect.Table_detect', 'check_doc_with_template', 'templates/Table.json'),
+    'CrossRef': ('paper_detect.CrossRef_detect', 'check_doc_with_template', 'templates/CrossRef.json'),
+    'References': ('paper_detect.References_detect', 'check_doc_with_template', 'templates/References.json'),
+    'Spelling': ('paper_detect.Spelling_detect', 'check_doc_with_template', 'templates/Spelling.json'),
 }
 
 # 检测模块执行顺序
-DETECTION_ORDER = ['Title', 'Abstract', 'Keywords', 'Content', 'Formula', 'Figure', 'Table']
+DETECTION_ORDER = ['Title', 'Abstract', 'Keywords', 'Content', 'Formula', 'Figure', 'Table', 'CrossRef', 'References',
+                   'Spelling']
+
+# 默认不执行、需通过命令行参数启用的模块
+OPTIONAL_MODULES = {'Spelling'}
+
+# 问题带段落索引的模块：模块名 -> 报告中的检查项（批注按段落合并）
+PARAGRAPH_SECTION_KEYS = {
+    'CrossRef': ['dangling_references', 'uncited_items', 'citation_order'],
+    'References': ['entry_format', 'numbering', 'dangling_citations', 'uncited_entries', 'citation_order'],
+    'Spelling': ['spelling'],
+}
+
+# 图片API预算参数 -> FigureContentDetector budget 键
+BUDGET_ARGUMENTS = {
+    '--figure-api-max-calls': 'max_calls',
+    '--figure-api-max-tokens': 'max_tokens',
+    '--figure-api-max-seconds': 'max_seconds',
+}
 
 # 全局检测配置（用于在各模块中访问）
 GLOBAL_DETECTION_CONFIG = {
@@ -64,6 +96,15 @@ def print_usage():
     print("    python run_all_detections.py <docx文件路径> [选项]")
     print("\n选项说明：")
     print("    --enable-figure-api         启用图片内容API检测（会调用API分析图表）")
+    print("    --enable-spell-check        启用英文拼写检测（首次使用时构建词典索引）")
+    print("    --record-api <file>         录制图片API请求/响应到cassette文件（密钥脱敏）")
+    print("    --replay-api <file>         从cassette文件回放图片API响应（离线、零成本）")
+    print("    --figure-batch-size <n>     每个图片API请求最多打包n张图片（默认1）")
+    print("    --cascade-model <model>     先用该小模型检查图片，有疑问时再交给大模型")
+    print("    --figure-api-max-calls <n>  每个文档最多n次图片API调用，超出后剩余检查标记为跳过")
+    print("    --figure-api-max-tokens <n> 每个文档最多使用n个token")
+    print("    --figure-api-max-seconds <s> 每个文档的图片API耗时上限（秒）")
+    print("    --deadline <s>              整体截止时间（秒），图片API未返回的检查标记为待定（需启用图片API）")
     print("    --skip-font-size            跳过字体大小检测")
     print("    --skip-bold                 跳过加粗检测")
     print("    --skip-italic               跳过斜体检测")
@@ -76,6 +117,9 @@ def print_usage():
     print("    python run_all_detections.py template/test.docx --skip-font-size")
     print("    python run_all_detections.py template/test.docx --skip-module Content")
     print("    python run_all_detections.py template/test.docx --skip-bold --skip-italic")
+    print("    python run_all_detections.py template/test.docx --replay-api api_results/test.jsonl")
+    print("    python run_all_detections.py template/test.docx --enable-figure-api --deadline 60")
+    print("    python run_all_detections.py template/test.docx --enable-spell-check")
 
 
 def parse_arguments():
@@ -85,6 +129,15 @@ def parse_arguments():
     
     支持的参数：
         --enable-figure-api         启用图片内容API检测
+        --enable-spell-check        启用英文拼写检测
+        --record-api <file>         录制图片API请求/响应到cassette文件
+        --replay-api <file>         从cassette文件回放图片API响应（隐含 --enable-figure-api）
+        --figure-batch-size <n>     每个图片API请求最多打包n张图片
+        --cascade-model <model>     模型级联中先调用的小模型
+        --figure-api-max-calls <n>  每个文档的图片API调用次数上限
+        --figure-api-max-tokens <n> 每个文档的图片API token上限
+        --figure-api-max-seconds <s> 每个文档的图片API耗时上限（秒）
+        --deadline <s>              整体截止时间（秒），到时未返回的图片内容检测标记为待定（需启用图片API）
         --skip-font-size            跳过字体大小检测
         --skip-bold                 跳过加粗检测
         --skip-italic               跳过斜体检测
@@ -105,6 +158,9 @@ def parse_arguments():
         'enable_figure_api': False,
         'skip_checks': set(),  # 要跳过的检测项
         'skip_modules': set(),  # 要跳过的模块
+        'enable_modules': set(),  # 要启用的可选模块
+        'figure_api_options': {},  # 传递给 FigureContentDetector 的额外参数
+        'deadline': None,  # 整体截止时间（秒）
     }
     
     # 解析其他参数
@@ -115,6 +171,44 @@ def parse_arguments():
             detection_config['enable_figure_api'] = True
             print("注意：已启用图片内容API检测")
         
+        elif arg == '--enable-spell-check':
+            detection_config['enable_modules'].add('Spelling')
+            print("注意：已启用英文拼写检测")
+        
+        elif arg in ('--record-api', '--replay-api') and i + 1 < len(sys.argv):
+            mode = 'record' if arg == '--record-api' else 'replay'
+            detection_config['enable_figure_api'] = True
+            detection_config['figure_api_options']['cassette_mode'] = mode
+            detection_config['figure_api_options']['cassette_path'] = sys.argv[i + 1]
+            print(f"注意：图片API cassette {mode} 模式: {sys.argv[i + 1]}")
+        
+        elif arg == '--figure-batch-size' and i + 1 < len(sys.argv):
+            try:
+                detection_config['figure_api_options']['batch_size'] = max(1, int(sys.argv[i + 1]))
+                print(f"注意：图片API每批最多 {sys.argv[i + 1]} 张图片")
+            except ValueError:
+                print(f"警告：无效的批大小 '{sys.argv[i + 1]}'，将忽略")
+        
+        elif arg == '--cascade-model' and i + 1 < len(sys.argv):
+            detection_config['figure_api_options']['cascade_model'] = sys.argv[i + 1]
+            print(f"注意：图片API模型级联，先使用 {sys.argv[i + 1]}")
+        
+        elif arg in BUDGET_ARGUMENTS and i + 1 < len(sys.argv):
+            budget_key = BUDGET_ARGUMENTS[arg]
+            try:
+                value = float(sys.argv[i + 1]) if budget_key == 'max_seconds' else int(sys.argv[i + 1])
+                detection_config['figure_api_options'].setdefault('budget', {})[budget_key] = value
+                print(f"注意：图片API预算 {budget_key} = {value}")
+            except ValueError:
+                print(f"警告：无效的预算值 '{sys.argv[i + 1]}'，将忽略")
+        
+        elif arg == '--deadline' and i + 1 < len(sys.argv):
+            try:
+                detection_config['deadline'] = float(sys.argv[i + 1])
+                print(f"注意：整体截止时间 {sys.argv[i + 1]}s")
+            except ValueError:
+                print(f"警告：无效的截止时间 '{sys.argv[i + 1]}'，将忽略")
+        
         elif arg == '--skip-font-size':
             detection_config['skip_checks'].add('font_size')
             print("注意：已跳过字体大小检测")
@@ -187,7 +281,15 @@ def import_detection_modules():
     return detection_functions
 
 
-def run_all_detections(docx_path, detection_functions, enable_figure_api=False, detection_config=None):
+def console_event_bus():
+    """返回只带控制台输出订阅者的事件分发器"""
+    events = EventBus()
+    events.subscribe(ConsoleSubscriber())
+    return events
+
+
+def run_all_detections(docx_path, detection_functions, enable_figure_api=False, detection_config=None,
+                       events=None):
     """
     调用所有检测模块并收集报告
     
@@ -197,71 +299,295 @@ def run_all_detections(docx_path, detection_functions, enable_figure_api=False,
         enable_figure_api: 是否启用Figure模块的API内容检测
         detection_config: 检测配置字典，指定启用哪些模块
                          例如：{'Title': True, 'Abstract': True, 'Content': False}
-                         如果为None，则执行所有模块
+                         如果为None，则执行除可选模块（OPTIONAL_MODULES）外的所有模块
+        events: 进度事件分发器 EventBus（可选，默认只输出到控制台）
     
     返回：
         {模块名: 报告字典} 的字典
     """
     all_reports = {}
+    events = events or console_event_bus()
+    start_time = time.perf_counter()
     
-    # 如果没有提供配置，默认全部执行
+    # 如果没有提供配置，默认执行除可选模块外的全部模块
     if detection_config is None:
-        detection_config = {module: True for module in DETECTION_ORDER}
+        detection_config = {module: module not in OPTIONAL_MODULES for module in DETECTION_ORDER}
     
     print(f"\n开始检测文档: {docx_path}")
     print("=" * 60)
     
     # 显示启用的检测模块
-    enabled_modules = [m for m in DETECTION_ORDER if detection_config.get(m, True)]
+    enabled_modules = [m for m in DETECTION_ORDER if detection_config.get(m, m not in OPTIONAL_MODULES)]
     print(f"启用的检测模块: {', '.join(enabled_modules)}")
     print("=" * 60)
     
     for module_name in DETECTION_ORDER:
         # 检查模块是否启用
-        if not detection_config.get(module_name, True):
+        if not detection_config.get(module_name, module_name not in OPTIONAL_MODULES):
             print(f"\n【{module_name} 检测】- 已跳过（未启用）")
             continue
-        template_path = TEMPLATE_MAPPING[module_name][2]
-        detection_func = detection_functions[module_name]
-        
-        print(f"\n【{module_name} 检测】")
-        print(f"  使用模板: {template_path}")
-        
-        try:
-            # 调用检测函数
-            # Figure模块特殊处理：根据参数决定是否启用API内容检测
-            if module_name == 'Figure':
-                report = detection_func(docx_path, template_path, enable_content_check=enable_figure_api)
-            else:
-                report = detection_func(docx_path, template_path)
-            all_reports[module_name] = report
-            
-            # 简要显示检测结果
-            if isinstance(report, dict):
-                # 统计ok状态
-                ok_count = sum(1 for key, value in report.items() 
-                              if isinstance(value, dict) and value.get('ok', False))
-                total_count = sum(1 for key, value in report.items() 
-                                 if isinstance(value, dict) and 'ok' in value)
-                print(f"  结果: {ok_count}/{total_count} 项检测通过")
-            else:
-                print(f"  结果: 已完成")
-                
-        except Exception as e:
-            print(f"  ✗ 检测失败: {e}")
-            # 记录错误报告
-            all_reports[module_name] = {
-                'error': True,
-                'error_message': str(e),
-                'summary': [f'{module_name}检测失败: {e}']
-            }
+        all_reports[module_name] = run_module(module_name, detection_functions[module_name],
+                                              docx_path, enable_figure_api, events)
     
     print("\n" + "=" * 60)
     print("所有检测模块执行完成\n")
+    events.emit(RUN_FINISHED, elapsed_seconds=round(time.perf_counter() - start_time, 3))
     
     return all_reports
 
 
+def run_module(module_name, detection_func, docx_path, enable_figure_api=False, events=None,
+               figure_api_options=None, figure_progress=None):
+    """
+    运行单个检测模块，记录耗时并发出进度事件
+    
+    参数：
+        module_name: 模块名
+        detection_func: 检测函数
+        docx_path: 待检测的文档路径
+        enable_figure_api: 是否启用Figure模块的API内容检测
+        events: 进度事件分发器 EventBus 或 ScopedEmitter（可选，默认只输出到控制台）
+        figure_api_options: 仅本次运行使用的 FigureContentDetector 参数，
+                            覆盖 GLOBAL_DETECTION_CONFIG['figure_api_options'] 中的同名项（可选）
+        figure_progress: Figure模块的共享进度字典 {'lock', 'report'}（可选），
+                         截止时间到达时从中取出已完成的部分结果
+    
+    返回：
+        报告字典（检测出错时为错误报告），含 elapsed_seconds
+    """
+    events = events or console_event_bus()
+    template_path = TEMPLATE_MAPPING[module_name][2]
+    events.emit(MODULE_STARTED, module_name, template=template_path)
+    
+    start_time = time.perf_counter()
+    error = None
+    try:
+        # 调用检测函数
+        # Figure模块特殊处理：根据参数决定是否启用API内容检测，每次API请求完成时发出事件
+        if module_name == 'Figure':
+            # 每次运行使用独立的参数副本，不改写全局配置
+            api_options = dict(GLOBAL_DETECTION_CONFIG.get('figure_api_options', {}))
+            api_options.update(figure_api_options or {})
+            api_options['on_api_call'] = lambda record: events.emit(FIGURE_API_CALL, 'Figure', **record)
+            report = detection_func(docx_path, template_path, enable_content_check=enable_figure_api,
+                                    api_options=api_options, progress=figure_progress)
+        else:
+            report = detection_func(docx_path, template_path)
+            
+    except Exception as e:
+        error = str(e)
+        # 记录错误报告
+        report = {
+            'error': True,
+            'error_message': str(e),
+            'summary': [f'{module_name}检测失败: {e}']
+        }
+    
+    finish_module(module_name, report, time.perf_counter() - start_time, events, error)
+    return report
+
+
+def finish_module(module_name, report, elapsed, events, error=None):
+    """
+    记录模块耗时，逐条发出问题，再发出模块完成事件
+    
+    参数：
+        module_name: 模块名
+        report: 模块报告
+        elapsed: 模块耗时（秒）
+        events: 进度事件分发器
+        error: 检测出错时的错误信息（可选）
+    """
+    report['elapsed_seconds'] = round(elapsed, 3)
+    if error is None:
+        for issue in parse_issues_from_reports({module_name: report}):
+            events.emit(ISSUE_FOUND, module_name, issue=issue)
+    events.emit(MODULE_FINISHED, module_name, report=report, elapsed_seconds=round(elapsed, 3), error=error)
+
+
+def _start_daemon_task(func, *args):
+    """
+    在守护线程中执行函数，返回 concurrent.futures.Future
+    
+    截止时间到达后主流程不再等待该线程，进程退出时也不会被其阻塞
+    （asyncio 默认线程池在退出时会等待所有任务完成）。
+    """
+    future = concurrent.futures.Future()
+    
+    def worker():
+        try:
+            future.set_result(func(*args))
+        except BaseException as e:
+            future.set_exception(e)
+    
+    threading.Thread(target=worker, daemon=True).start()
+    return future
+
+
+def mark_figure_content_pending(report, deadline):
+    """
+    把截止时间内未完成的图片内容检测标记为待定（已完成的结果保留）
+    
+    参数：
+        report: Figure模块报告（本地检查与截止时间前完成的内容检测结果）
+        deadline: 截止时间（秒）
+    """
+    message = f"图片内容检测未在截止时间（{deadline:g}s）内完成，结果待定"
+    pending = 0
+    for figure_report in report.get('figures', []):
+        if figure_report.get('content_check') is not None:
+            continue
+        pending += 1
+        figure_report['content_check'] = {
+            'ok': True,
+            'pending': True,
+            'is_chart': False,
+            'messages': [f"⏳ {message}"],
+            'details': {}
+        }
+    # 兼容的captions列表与有标题的图片一一对应
+    captioned = [figure_report for figure_report in report.get('figures', []) if figure_report.get('has_caption')]
+    for caption, figure_report in zip(report.get('captions', []), captioned):
+        caption['content_check'] = figure_report['content_check']
+    if isinstance(report.get('summary'), dict):
+        report['summary']['content_pending'] = {
+            'deadline_seconds': deadline,
+            'completed': len(report.get('figures', [])) - pending,
+            'pending': pending,
+            'message': message
+        }
+
+
+async def run_all_detections_async(docx_path, detection_functions, enable_figure_api=False,
+                                   detection_config=None, deadline=None, events=None):
+    """
+    异步执行所有检测模块：图片API检测与本地模块重叠执行
+    
+    Figure模块（提取图片、调用视觉API）最先在后台线程启动，
+    其余模块（Content、Formula、Table等）在API请求等待期间依次执行，
+    总耗时约为 max(API耗时, 本地耗时)，而不是两者之和。
+    
+    参数：
+        docx_path: 待检测的文档路径
+        detection_functions: 检测函数字典
+        enable_figure_api: 是否启用Figure模块的API内容检测
+        detection_config: 模块启用配置（同 run_all_detections）
+        deadline: 整体截止时间（秒，从开始检测计）；到时API结果仍未返回时，
+                  Figure模块只给出本地检查结果，内容检测标记为待定
+        events: 进度事件分发器 EventBus（可选，默认只输出到控制台）
+    
+    返回：
+        {模块名: 报告字典} 的字典（按 DETECTION_ORDER 排列）
+    """
+    if detection_config is None:
+        detection_config = {module: module not in OPTIONAL_MODULES for module in DETECTION_ORDER}
+    events = events or console_event_bus()
+    
+    start_time = time.perf_counter()
+    print(f"\n开始检测文档: {docx_path}")
+    print("=" * 60)
+    enabled_modules = [m for m in DETECTION_ORDER if detection_config.get(m, m not in OPTIONAL_MODULES)]
+    print(f"启用的检测模块: {', '.join(enabled_modules)}")
+    if deadline:
+        print(f"截止时间: {deadline:g}s（图片API与本地检测并行执行）")
+    print("=" * 60)
+    
+    # 1. 先启动图片API检测
+    #    后台运行的事件经可关闭的发送端转发；截止时间到达后关闭发送端并设置取消标志，
+    #    后台检测不再发起新请求，其后续事件也不会与部分结果重复。
+    #    截止时间同时作为本次运行的API耗时上限，进行中的请求超时也不超过截止时间；
+    #    本地检查与每张图片的内容检测结果随完成写入共享的进度字典
+    figure_future = None
+    figure_events = events.scoped()
+    figure_cancel = threading.Event()
+    figure_progress = {'lock': threading.Lock(), 'report': None}
+    figure_options = {'cancel_event': figure_cancel}
+    if deadline:
+        figure_options['deadline_seconds'] = deadline
+    if 'Figure' in enabled_modules:
+        figure_future = asyncio.wrap_future(_start_daemon_task(
+            run_module, 'Figure', detection_functions['Figure'], docx_path, enable_figure_api, figure_events,
+            figure_options, figure_progress))
+    
+    # 2. API请求等待期间执行本地模块
+    all_reports = {}
+    for module_name in DETECTION_ORDER:
+        if module_name == 'Figure':
+            continue
+        if module_name not in enabled_modules:
+            print(f"\n【{module_name} 检测】- 已跳过（未启用）")
+            continue
+        all_reports[module_name] = await asyncio.to_thread(
+            run_module, module_name, detection_functions[module_name], docx_path, False, events)
+    
+    # 3. 等待图片API结果（不超过剩余的截止时间）
+    if figure_future is not None:
+        remaining = None if not deadline else max(0.0, deadline - (time.perf_counter() - start_time))
+        try:
+            all_reports['Figure'] = await asyncio.wait_for(asyncio.shield(figure_future), timeout=remaining)
+        except asyncio.TimeoutError:
+            figure_cancel.set()
+            figure_events.close()
+            # 取走部分结果，后台线程之后完成的内容检测不再写入
+            with figure_progress['lock']:
+                report = figure_progress['report']
+                figure_progress['report'] = None
+            if report is not None:
+                print(f"\n⏳ 图片API检测未在截止时间内完成，Figure模块输出本地检查与已完成的内容检测结果")
+                mark_figure_content_pending(report, deadline)
+                finish_module('Figure', report, time.perf_counter() - start_time, events)
+            else:
+                # 截止时间到达时本地检查尚未完成，只能重新执行本地检查
+                print(f"\n⏳ 图片API检测未在截止时间内完成，Figure模块先输出本地检查结果")
+                report = await asyncio.to_thread(
+                    run_module, 'Figure', detection_functions['Figure'], docx_path, False, events)
+                mark_figure_content_pending(report, deadline)
+            all_reports['Figure'] = report
+    
+    print("\n" + "=" * 60)
+    print(f"所有检测模块执行完成（总耗时 {time.perf_counter() - start_time:.2f}s）\n")
+    events.emit(RUN_FINISHED, elapsed_seconds=round(time.perf_counter() - start_time, 3))
+    
+    return {module_name: all_reports[module_name] for module_name in DETECTION_ORDER if module_name in all_reports}
+
+
+def iter_detection_events(docx_path, detection_functions, enable_figure_api=False, detection_config=None,
+                          deadline=None):
+    """
+    以生成器形式逐个返回检测进度事件（检测在后台线程中执行）
+    
+    参数：
+        docx_path: 待检测的文档路径
+        detection_functions: 检测函数字典
+        enable_figure_api: 是否启用Figure模块的API内容检测
+        detection_config: 模块启用配置（同 run_all_detections）
+        deadline: 整体截止时间（秒，仅在启用图片API时生效）
+    
+    返回：
+        DetectionEvent 生成器，最后一个事件为 run_finished
+    """
+    events = EventBus()
+    pending = queue.Queue()
+    events.subscribe(pending.put)
+    
+    def worker():
+        try:
+            if enable_figure_api:
+                asyncio.run(run_all_detections_async(docx_path, detection_functions, True,
+                                                     detection_config, deadline, events))
+            else:
+                run_all_detections(docx_path, detection_functions, False, detection_config, events)
+        except Exception as e:
+            events.emit(RUN_FINISHED, error=str(e))
+    
+    threading.Thread(target=worker, daemon=True).start()
+    while True:
+        event = pending.get()
+        yield event
+        if event.type == RUN_FINISHED:
+            break
+
+
 def generate_comprehensive_report(all_reports):
     """
     生成综合文本报告
@@ -332,6 +658,15 @@ def generate_comprehensive_report(all_reports):
         lines.append(f"通过率: {pass_rate:.1f}%")
     lines.append("")
     
+    # 各模块耗时
+    timed_modules = [m for m in DETECTION_ORDER if m in all_reports and 'elapsed_seconds' in all_reports[m]]
+    if timed_modules:
+        lines.append("【耗时统计】")
+        for module_name in timed_modules:
+            lines.append(f"  {module_name}: {all_reports[module_name]['elapsed_seconds']:.2f}s")
+        lines.append(f"  合计: {sum(all_reports[m]['elapsed_seconds'] for m in timed_modules):.2f}s")
+        lines.append("")
+    
     # 各模块详细报告
     for module_name in DETECTION_ORDER:
         if module_name not in all_reports:
@@ -439,6 +774,61 @@ def generate_comprehensive_report(all_reports):
                     if messages and not picture_check.get('ok', False):
                         for msg in messages:
                             lines.append(f"      • {msg}")
+                
+                # 图片内容检测未在截止时间内完成
+                if (fig_report.get('content_check') or {}).get('pending'):
+                    lines.append(f"    图片内容: ⏳ 待定")
+                
+                # 图片分辨率
+                resolution_check = fig_report.get('resolution_check', {})
+                metadata = resolution_check.get('metadata') if isinstance(resolution_check, dict) else None
+                if metadata and metadata.get('effective_dpi') is not None:
+                    ok_status = "✓" if resolution_check.get('ok', False) else "✗"
+                    lines.append(f"    图片分辨率: {ok_status}（有效 {int(metadata['effective_dpi'])} DPI，"
+                                 f"{metadata['width_px']}×{metadata['height_px']} 像素，{metadata['mode']}）")
+                    if not resolution_check.get('ok', False):
+                        for msg in resolution_check.get('messages', []):
+                            lines.append(f"      • {msg}")
+            
+            # 截止时间内未完成的内容检测
+            content_pending = report.get('summary', {}).get('content_pending')
+            if content_pending:
+                lines.append(f"\n  [图片内容检测] ⏳ {content_pending['message']}")
+            
+            # API用量与预算
+            api_usage = report.get('summary', {}).get('api_usage')
+            if api_usage:
+                lines.append(f"\n  [API用量] {api_usage['calls']} 次调用（失败 {api_usage['failed_calls']} 次，重试 {api_usage['retries']} 次）")
+                lines.append(f"    tokens: 输入 {api_usage['prompt_tokens']}，输出 {api_usage['completion_tokens']}；"
+                             f"图片载荷（base64） {api_usage['payload_bytes'] / 1024:.1f} KB；耗时 {api_usage['api_seconds']:.2f}s")
+                if api_usage['budget_exhausted']:
+                    lines.append(f"    ⚠ 预算已用尽（{api_usage['budget_exhausted']}），{api_usage['skipped_checks']} 项检查已跳过")
+            
+            # API录制/回放统计
+            cassette = report.get('summary', {}).get('api_cassette')
+            if cassette:
+                lines.append(f"\n  [API Cassette] {cassette['mode']}: {cassette['path']}")
+                lines.append(f"    录制 {cassette['recorded']} 次，回放 {cassette['replayed']} 次，未命中 {cassette['misses']} 次")
+                lines.append(f"    模型调用累计耗时: {cassette['api_seconds']:.2f}s")
+            
+            # 本地图表预分类统计
+            preclassify = report.get('summary', {}).get('preclassify')
+            if preclassify:
+                lines.append(f"\n  [本地预分类] 图表 {preclassify['chart']} 张，非图表 {preclassify['not_chart']} 张，"
+                             f"不确定 {preclassify['uncertain']} 张")
+                lines.append(f"    节省API调用: {preclassify['api_calls_avoided']} 次")
+            
+            # 模型级联统计
+            cascade = report.get('summary', {}).get('cascade')
+            if cascade:
+                lines.append(f"\n  [模型级联] {cascade['small_model']} → {cascade['large_model']}")
+                lines.append(f"    小模型直接给出结论: {cascade['answered_by_small']} 项，升级到大模型: {cascade['escalated']} 项")
+                
+                # 各图片每项检查由哪个模型给出结论
+                for i, fig_report in enumerate(figures, 1):
+                    answered_by = (fig_report.get('content_check') or {}).get('details', {}).get('answered_by')
+                    if answered_by:
+                        lines.append(f"    图片 {i}: " + ", ".join(f"{key}={model}" for key, model in answered_by.items()))
         
         else:
             # 其他模块的常规处理
@@ -521,7 +911,7 @@ def create_document_copy(original_path):
         return None
 
 
-def find_paragraph_by_keyword(doc, keyword, case_sensitive=False):
+def find_paragraph_by_keyword(doc, keyword, case_sensitive=False, paragraphs=None):
     """
     通过关键字查找段落
     
@@ -529,11 +919,13 @@ def find_paragraph_by_keyword(doc, keyword, case_sensitive=False):
         doc: Document对象
         keyword: 关键字
         case_sensitive: 是否区分大小写
+        paragraphs: 已物化的段落列表（可选，批量查找时避免重复构建 doc.paragraphs）
     
     返回：
         匹配的段落对象，未找到返回None
     """
-    for paragraph in doc.paragraphs:
+    paragraphs = paragraphs if paragraphs is not None else doc.paragraphs
+    for paragraph in paragraphs:
         if not paragraph.text:
             continue
         
@@ -546,7 +938,7 @@ def find_paragraph_by_keyword(doc, keyword, case_sensitive=False):
     return None
 
 
-def find_paragraph_by_index(doc, index, skip_empty=True):
+def find_paragraph_by_index(doc, index, skip_empty=True, paragraphs=None):
     """
     通过索引查找段落
     
@@ -554,19 +946,21 @@ def find_paragraph_by_index(doc, index, skip_empty=True):
         doc: Document对象
         index: 段落索引
         skip_empty: 是否跳过空段落（默认True，兼容旧逻辑）
+        paragraphs: 已物化的段落列表（可选）
     
     返回：
         段落对象，索引无效返回None
     """
+    paragraphs = paragraphs if paragraphs is not None else doc.paragraphs
     try:
         if not skip_empty:
             # 不跳过空行，直接返回
-            if 0 <= index < len(doc.paragraphs):
-                return doc.paragraphs[index]
+            if 0 <= index < len(paragraphs):
+                return paragraphs[index]
         else:
             # 跳过空行，找到第N个非空段落
             non_empty_count = 0
-            for paragraph in doc.paragraphs:
+            for paragraph in paragraphs:
                 if paragraph.text and paragraph.text.strip():
                     if non_empty_count == index:
                         return paragraph
@@ -577,7 +971,7 @@ def find_paragraph_by_index(doc, index, skip_empty=True):
     return None
 
 
-def find_paragraph_by_text(doc, text_fragment, threshold=0.7):
+def find_paragraph_by_text(doc, text_fragment, threshold=0.7, paragraphs=None):
     """
     通过文本片段查找段落（模糊匹配）
     
@@ -585,22 +979,24 @@ def find_paragraph_by_text(doc, text_fragment, threshold=0.7):
         doc: Document对象
         text_fragment: 文本片段
         threshold: 相似度阈值（0-1）
+        paragraphs: 已物化的段落列表（可选）
     
     返回：
         最匹配的段落对象，未找到返回None
     """
+    paragraphs = paragraphs if paragraphs is not None else doc.paragraphs
     best_match = None
     best_score = 0
     
     search_text = text_fragment.lower().strip()
     if len(search_text) < 5:
         # 文本太短，使用精确匹配
-        for paragraph in doc.paragraphs:
+        for paragraph in paragraphs:
             if search_text in paragraph.text.lower():
                 return paragraph
         return None
     
-    for paragraph in doc.paragraphs:
+    for paragraph in paragraphs:
         if not paragraph.text or len(paragraph.text.strip()) < 5:
             continue
         
@@ -1278,6 +1674,11 @@ def parse_issues_from_reports(all_reports):
                 if isinstance(picture_check, dict) and not picture_check.get('ok', False):
                     picture_messages.extend(picture_check.get('messages', []))
                 
+                # 图片分辨率问题
+                resolution_check = fig_report.get('resolution_check', {})
+                if isinstance(resolution_check, dict) and not resolution_check.get('ok', True):
+                    picture_messages.extend(resolution_check.get('messages', []))
+                
                 # 图表内容问题
                 content_check = fig_report.get('content_check', {})
                 if isinstance(content_check, dict) and not content_check.get('ok', False):
@@ -1293,11 +1694,31 @@ def parse_issues_from_reports(all_reports):
                         'locate_method': 'index',
                         'locate_data': para_idx
                     })
+        
+        elif module_name in PARAGRAPH_SECTION_KEYS:
+            # CrossRef/References/Spelling模块：按段落合并问题，批注在引用、图表标题、文献条目或拼写错误所在段落
+            for section_key in PARAGRAPH_SECTION_KEYS[module_name]:
+                section_value = report.get(section_key)
+                if not isinstance(section_value, dict) or section_value.get('ok', True):
+                    continue
+                
+                messages_by_paragraph = {}
+                for item in section_value.get('items', []):
+                    messages_by_paragraph.setdefault(item['paragraph_index'], []).append(item['message'])
+                
+                for para_idx, messages in messages_by_paragraph.items():
+                    issues.append({
+                        'module': module_name,
+                        'section': section_key,
+                        'messages': messages,
+                        'locate_method': 'index',
+                        'locate_data': para_idx
+                    })
     
     return issues
 
 
-def find_content_paragraph_by_number(doc, para_number, hierarchy_report):
+def find_content_paragraph_by_number(doc, para_number, hierarchy_report, paragraphs=None):
     """
     根据段落编号定位具体的正文段落
     
@@ -1305,10 +1726,13 @@ def find_content_paragraph_by_number(doc, para_number, hierarchy_report):
         doc: Document对象
         para_number: 段落编号（1-based，如"正文段落 1"中的1）
         hierarchy_report: 标题层级报告（包含标题段落索引信息）
+        paragraphs: 已物化的段落列表（可选）
     
     返回：
         对应的段落对象，未找到返回None
     """
+    paragraphs = paragraphs if paragraphs is not None else doc.paragraphs
+    
     # 获取所有标题段落的索引
     title_paragraph_indices = set()
     introduction_index = None
@@ -1324,7 +1748,7 @@ def find_content_paragraph_by_number(doc, para_number, hierarchy_report):
     
     # 如果没有找到Introduction，尝试用关键字查找
     if introduction_index is None:
-        for i, para in enumerate(doc.paragraphs):
+        for i, para in enumerate(paragraphs):
             if 'Introduction' in para.text:
                 introduction_index = i
                 break
@@ -1335,8 +1759,8 @@ def find_content_paragraph_by_number(doc, para_number, hierarchy_report):
     # 从Introduction之后开始查找正文段落
     content_paragraph_count = 0
     
-    for i in range(introduction_index + 1, len(doc.paragraphs)):
-        paragraph = doc.paragraphs[i]
+    for i in range(introduction_index + 1, len(paragraphs)):
+        paragraph = paragraphs[i]
         
         # 排除标题段落
         if i in title_paragraph_indices:
@@ -1387,6 +1811,8 @@ def add_all_comments(doc_path, copy_path, issues_list):
     """
     try:
         doc = Document(copy_path)
+        # 只构建一次段落列表（doc.paragraphs 每次访问都会重新创建全部段落对象）
+        paragraphs = doc.paragraphs
         comment_count = 0
         
         print(f"\n正在添加批注...")
@@ -1403,71 +1829,71 @@ def add_all_comments(doc_path, copy_path, issues_list):
             # 根据定位方法查找段落
             paragraph = None
             if locate_method == 'keyword' and locate_data:
-                paragraph = find_paragraph_by_keyword(doc, locate_data)
+                paragraph = find_paragraph_by_keyword(doc, locate_data, paragraphs=paragraphs)
             elif locate_method == 'abstract_title':
                 # 定位到Abstract标题段落（用于structure批注）
                 # 先尝试正确格式
-                paragraph = find_paragraph_by_keyword(doc, 'Abstract:')
+                paragraph = find_paragraph_by_keyword(doc, 'Abstract:', paragraphs=paragraphs)
                 if not paragraph:
                     # 尝试错误格式（Abstract单独成行）
-                    for para in doc.paragraphs:
+                    for para in paragraphs:
                         if para.text and re.match(r'^\s*Abstract\s*$', para.text.strip(), re.IGNORECASE):
                             paragraph = para  # 定位到标题段落本身
                             break
             elif locate_method == 'abstract_content':
                 # 定位到Abstract内容段落（用于paragraphs和format批注）
                 # 先尝试正确格式
-                paragraph = find_paragraph_by_keyword(doc, 'Abstract:')
+                paragraph = find_paragraph_by_keyword(doc, 'Abstract:', paragraphs=paragraphs)
                 if not paragraph:
                     # 尝试错误格式（Abstract单独成行，定位到下一个内容段落）
-                    for i, para in enumerate(doc.paragraphs):
+                    for i, para in enumerate(paragraphs):
                         if para.text and re.match(r'^\s*Abstract\s*$', para.text.strip(), re.IGNORECASE):
                             # 找到Abstract单独一行，定位到下一个非空段落（实际内容）
-                            for j in range(i+1, min(i+3, len(doc.paragraphs))):
-                                if doc.paragraphs[j].text and doc.paragraphs[j].text.strip():
-                                    paragraph = doc.paragraphs[j]
+                            for j in range(i+1, min(i+3, len(paragraphs))):
+                                if paragraphs[j].text and paragraphs[j].text.strip():
+                                    paragraph = paragraphs[j]
                                     break
                             break
             elif locate_method == 'keywords_title':
                 # 定位到Keywords标题段落（用于structure批注）
                 # 先尝试正确格式
-                paragraph = find_paragraph_by_keyword(doc, 'Keywords:')
+                paragraph = find_paragraph_by_keyword(doc, 'Keywords:', paragraphs=paragraphs)
                 if not paragraph:
                     # 尝试错误格式（Keywords单独成行）
-                    for para in doc.paragraphs:
+                    for para in paragraphs:
                         if para.text and re.match(r'^\s*Keywords\s*$', para.text.strip(), re.IGNORECASE):
                             paragraph = para  # 定位到标题段落本身
                             break
             elif locate_method == 'keywords_content':
                 # 灵活定位Keywords：优先找Keywords:，找不到就找Keywords（单独一行）
                 # 先尝试正确格式
-                paragraph = find_paragraph_by_keyword(doc, 'Keywords:')
+                paragraph = find_paragraph_by_keyword(doc, 'Keywords:', paragraphs=paragraphs)
                 if not paragraph:
                     # 尝试错误格式（Keywords单独成行）
-                    for i, para in enumerate(doc.paragraphs):
+                    for i, para in enumerate(paragraphs):
                         if para.text and re.match(r'^\s*Keywords\s*$', para.text.strip(), re.IGNORECASE):
                             # 找到Keywords单独一行，定位到下一个非空段落（实际内容）
-                            for j in range(i+1, min(i+3, len(doc.paragraphs))):
-                                if doc.paragraphs[j].text and doc.paragraphs[j].text.strip():
-                                    paragraph = doc.paragraphs[j]
+                            for j in range(i+1, min(i+3, len(paragraphs))):
+                                if paragraphs[j].text and paragraphs[j].text.strip():
+                                    paragraph = paragraphs[j]
                                     break
                             break
             elif locate_method == 'index':
                 # 判断是否需要跳过空行
-                # 单位段落和Content标题格式批注都不应该跳过空行（使用实际索引）
-                skip_empty = 'affiliation_para' not in section_name and 'Content-format' not in f"{module_name}-{section_name}" and 'Content-case' not in f"{module_name}-{section_name}"
-                paragraph = find_paragraph_by_index(doc, locate_data, skip_empty=skip_empty)
+                # 单位段落、Content标题格式、CrossRef/References/Spelling批注都不应该跳过空行（使用实际索引）
+                skip_empty = 'affiliation_para' not in section_name and 'Content-format' not in f"{module_name}-{section_name}" and 'Content-case' not in f"{module_name}-{section_name}" and module_name not in PARAGRAPH_SECTION_KEYS
+                paragraph = find_paragraph_by_index(doc, locate_data, skip_empty=skip_empty, paragraphs=paragraphs)
             elif locate_method == 'text':
-                paragraph = find_paragraph_by_text(doc, locate_data)
+                paragraph = find_paragraph_by_text(doc, locate_data, paragraphs=paragraphs)
             elif locate_method == 'paragraph_object':
                 paragraph = locate_data  # 直接使用paragraph对象
             elif locate_method == 'content_paragraph':
                 # 定位到具体的正文段落
                 hierarchy_report = extra.get('hierarchy_report', {})
-                paragraph = find_content_paragraph_by_number(doc, locate_data, hierarchy_report)
+                paragraph = find_content_paragraph_by_number(doc, locate_data, hierarchy_report, paragraphs)
             elif locate_method == 'formula_number':
                 # 通过公式编号定位（如 "(2)"）
-                paragraph = find_paragraph_by_keyword(doc, locate_data)
+                paragraph = find_paragraph_by_keyword(doc, locate_data, paragraphs=paragraphs)
             
             if paragraph:
                 # 构建批注内容
@@ -1510,6 +1936,7 @@ def main():
     # 设置全局检测配置（必须在导入模块之前）
     global GLOBAL_DETECTION_CONFIG
     GLOBAL_DETECTION_CONFIG['skip_checks'] = detection_config['skip_checks']
+    GLOBAL_DETECTION_CONFIG['figure_api_options'] = detection_config['figure_api_options']
     
     # 导入检测模块
     print("\n正在加载检测模块...")
@@ -1518,26 +1945,48 @@ def main():
     # 构建模块启用配置
     module_config = {}
     for module_name in DETECTION_ORDER:
-        # 如果模块在skip_modules中，则禁用
-        module_config[module_name] = module_name not in detection_config['skip_modules']
-    
-    # 执行所有检测
-    all_reports = run_all_detections(
-        docx_path, 
-        detection_functions, 
-        enable_figure_api=detection_config['enable_figure_api'],
-        detection_config=module_config
-    )
+        # 如果模块在skip_modules中，则禁用；可选模块需显式启用
+        module_config[module_name] = (module_name not in detection_config['skip_modules'] and
+                                      (module_name not in OPTIONAL_MODULES or
+                                       module_name in detection_config['enable_modules']))
     
-    # 生成综合报告
-    print("\n正在生成综合报告...")
-    report_text = generate_comprehensive_report(all_reports)
-    
-    # 保存报告（放在与原文件相同的目录）
+    # 报告放在与原文件相同的目录
     dir_path = os.path.dirname(docx_path)
     base_name = os.path.splitext(os.path.basename(docx_path))[0]
     report_filename = f"{base_name}_report.txt"
     report_path = os.path.join(dir_path, report_filename) if dir_path else report_filename
+    json_report_path = os.path.splitext(report_path)[0] + '.json'
+    
+    # 进度事件订阅者：控制台输出、增量JSON报告（每个模块完成即更新）、问题收集
+    events = console_event_bus()
+    events.subscribe(JsonReportWriter(json_report_path, docx_path))
+    issue_collector = events.subscribe(IssueCollector())
+    
+    # 执行所有检测（启用图片API时，API等待与本地模块重叠执行）
+    use_async = detection_config['enable_figure_api'] and module_config.get('Figure', True)
+    if detection_config['deadline'] and not use_async:
+        print("警告：--deadline 只在启用图片内容API检测（--enable-figure-api）且执行Figure模块时生效，将忽略")
+    if use_async:
+        all_reports = asyncio.run(run_all_detections_async(
+            docx_path,
+            detection_functions,
+            enable_figure_api=True,
+            detection_config=module_config,
+            deadline=detection_config['deadline'],
+            events=events
+        ))
+    else:
+        all_reports = run_all_detections(
+            docx_path, 
+            detection_functions, 
+            enable_figure_api=detection_config['enable_figure_api'],
+            detection_config=module_config,
+            events=events
+        )
+    
+    # 生成综合报告
+    print("\n正在生成综合报告...")
+    report_text = generate_comprehensive_report(all_reports)
     save_report_to_file(report_text, report_path)
     
     # 创建文档副本
@@ -1545,9 +1994,9 @@ def main():
     copy_path = create_document_copy(docx_path)
     
     if copy_path:
-        # 从报告中提取问题
+        # 问题已在各模块完成时通过 issue_found 事件收集
         print("\n正在分析问题...")
-        issues_list = parse_issues_from_reports(all_reports)
+        issues_list = issue_collector.issues(DETECTION_ORDER)
         print(f"  共识别出 {len(issues_list)} 个问题")
         
         # 添加批注
@@ -1562,7 +2011,7 @@ def main():
     print("检测流程完成")
     print("=" * 60)
     print(f"\n输出文件：")
-    print(f"  1. 检测报告: {report_path}")
+    print(f"  1. 检测报告: {report_path}（JSON: {json_report_path}）")
     if copy_path:
         print(f"  2. 批注文档: {copy_path}")
     print("")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Word 自动编号标题的识别测试
+
+标题使用两级多级列表编号（一级 "%1"、二级 "%1.%2"）时，二级标题的 ilvl 为 1，
+层级与编号应取 Word 实际显示的编号（如 "1.1" 为二级标题），而不是只识别 ilvl 为 0 的段落。
+"""
+
+import json
+import os
+import sys
+
+from docx import Document
+from docx.oxml import parse_xml
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from paper_detect.Content_detect import identify_title_hierarchy
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+NUM_ID = '99'
+
+HEADING_NUMBERING = (
+    f'<w:abstractNum xmlns:w="{W_NS}" w:abstractNumId="{NUM_ID}">'
+    '<w:multiLevelType w:val="multilevel"/>'
+    '<w:lvl w:ilvl="0"><w:start w:val="1"/><w:numFmt w:val="decimal"/><w:lvlText w:val="%1"/></w:lvl>'
+    '<w:lvl w:ilvl="1"><w:start w:val="1"/><w:numFmt w:val="decimal"/><w:lvlText w:val="%1.%2"/></w:lvl>'
+    '</w:abstractNum>'
+)
+HEADING_NUM = (
+    f'<w:num xmlns:w="{W_NS}" w:numId="{NUM_ID}"><w:abstractNumId w:val="{NUM_ID}"/></w:num>'
+)
+
+BODY_TEXT = 'The porous samples were characterized by scanning electron microscopy and X-ray diffraction.'
+
+
+def load_template(name):
+    with open(os.path.join(PROJECT_ROOT, 'templates', name + '.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def add_numbered_heading(doc, text, ilvl):
+    paragraph = doc.add_paragraph(text)
+    paragraph._p.get_or_add_pPr().append(parse_xml(
+        f'<w:numPr xmlns:w="{W_NS}"><w:ilvl w:val="{ilvl}"/><w:numId w:val="{NUM_ID}"/></w:numPr>'
+    ))
+    return paragraph
+
+
+def build_document():
+    """构建正文标题全部使用两级 Word 自动编号的论文"""
+    doc = Document()
+    numbering = doc.part.numbering_part.element
+    # abstractNum 须位于所有 num 之前
+    numbering.insert(0, parse_xml(HEADING_NUMBERING))
+    numbering.append(parse_xml(HEADING_NUM))
+
+    doc.add_paragraph('0 Introduction')
+    doc.add_paragraph(BODY_TEXT)
+    add_numbered_heading(doc, 'Materials and methods', 0)
+    doc.add_paragraph(BODY_TEXT)
+    add_numbered_heading(doc, 'Sample preparation', 1)
+    doc.add_paragraph(BODY_TEXT)
+    add_numbered_heading(doc, 'Measurement setup', 1)
+    doc.add_paragraph(BODY_TEXT)
+    add_numbered_heading(doc, 'Results and discussion', 0)
+    doc.add_paragraph(BODY_TEXT)
+    add_numbered_heading(doc, 'Absorption coefficient', 1)
+    doc.add_paragraph(BODY_TEXT)
+    return doc
+
+
+def test_two_level_word_numbered_headings():
+    report = identify_title_hierarchy(build_document(), load_template('Content'))
+    numbered = [(title['level'], title['number'], title['text'])
+                for title in report['titles'] if title.get('has_auto_numbering')]
+
+    assert numbered == [
+        (1, '1', 'Materials and methods'),
+        (2, '1.1', 'Sample preparation'),
+        (2, '1.2', 'Measurement setup'),
+        (1, '2', 'Results and discussion'),
+        (2, '2.1', 'Absorption coefficient'),
+    ]
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+段落扫描的规模测试
+
+doc.paragraphs 每次访问都会重新构建全部段落对象，在循环里按下标访问会使扫描变成 O(n²)。
+本测试在内存中构建 1k 与 20k 段落的文档，比较各段落扫描函数的耗时：
+线性实现的耗时比约为 20，二次实现约为 400，断言使用宽松上限 80。
+"""
+
+import json
+import os
+import sys
+import time
+
+from docx import Document
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from paper_detect.Abstract_detect import check_abstract_paragraphs
+from paper_detect.Chinese_section_detect import find_chinese_section
+from paper_detect.Content_detect import check_content_text_format
+from paper_detect.Keywords_detect import check_keywords_paragraphs
+from run_all_detections import find_content_paragraph_by_number
+
+SMALL = 1000
+LARGE = 20000
+# 耗时比上限：段落数之比为 20，留出 4 倍余量；O(n²) 时约为 400
+MAX_RATIO = (LARGE / SMALL) * 4
+
+BODY_TEXT = 'The porous samples were characterized by scanning electron microscopy and X-ray diffraction.'
+# 正文中每隔若干段一个完整段落，其余为不超过 20 个字符的短段落（中文部分同样使用短段落）：
+# 短段落同样经过各函数的逐段循环，但不触发耗时的逐段格式检查
+LONG_PARAGRAPH_EVERY = 50
+CHINESE_TEXT = '多孔材料的吸声性能研究'
+
+
+def load_template(name):
+    with open(os.path.join(PROJECT_ROOT, 'templates', name + '.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def build_document(paragraph_count):
+    """
+    构建结构完整的论文：正文与参考文献之后的中文部分各占一半段落
+
+    返回:
+        (Document对象, 标题信息列表, 最后一个完整正文段落的编号)
+    """
+    doc = Document()
+    doc.add_paragraph('Sound absorption of porous materials')
+    doc.add_paragraph('ZHANG San, LI Si')
+    doc.add_paragraph('Abstract: ' + BODY_TEXT)
+    doc.add_paragraph('Keywords: porous material; sound absorption; flow resistivity')
+    introduction_index = len(doc.paragraphs)
+    doc.add_paragraph('Introduction')
+    body_count = paragraph_count // 2
+    long_count = 0
+    for i in range(body_count):
+        if i % LONG_PARAGRAPH_EVERY == 0:
+            doc.add_paragraph(f'{BODY_TEXT} Paragraph {i}.')
+            long_count += 1
+        else:
+            doc.add_paragraph(f'Note {i}.')
+    doc.add_paragraph('References')
+    doc.add_paragraph('[1] WANG P. A study on flow resistivity[D]. Nanjing: Nanjing University, 2013.')
+    for _ in range(paragraph_count - body_count):
+        doc.add_paragraph(CHINESE_TEXT)
+    titles = [{'paragraph_index': introduction_index, 'level': 0, 'text': 'Introduction'}]
+    return doc, titles, long_count
+
+
+def scan_seconds(paragraph_count, repeats=3):
+    """各段落扫描函数的总耗时（取多次运行的最小值）"""
+    doc, titles, last_paragraph = build_document(paragraph_count)
+    content_tpl = load_template('Content')
+    abstract_tpl = load_template('Abstract')
+    keywords_tpl = load_template('Keywords')
+
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        assert find_chinese_section(doc) is not None
+        check_content_text_format(doc, titles, content_tpl)
+        assert find_content_paragraph_by_number(doc, last_paragraph, {'titles': titles}) is not None
+        check_abstract_paragraphs(doc, abstract_tpl)
+        check_keywords_paragraphs(doc, keywords_tpl)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def test_paragraph_scans_scale_linearly(capsys):
+    small = scan_seconds(SMALL)
+    large = scan_seconds(LARGE, repeats=1)
+    ratio = large / small
+    with capsys.disabled():
+        print(f"\n  {SMALL} 段: {small:.3f}s, {LARGE} 段: {large:.3f}s, 耗时比 {ratio:.1f}")
+    assert ratio < MAX_RATIO, (
+        f"段落扫描耗时比 {ratio:.1f} 超过上限 {MAX_RATIO:.0f}，可能重新出现了 O(n²) 的 doc.paragraphs 访问")